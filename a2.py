@@ -1,25 +1,51 @@
 
+import argparse
+import random
+import sys
+import time
+import types
+
 from a2_support import *
 
 
+# Read-only, since every instance of a card shares its modifiers
+NO_MODIFIERS = types.MappingProxyType({})
+
 class Card():
     """
     Class for all cards. Serves as an abstract
-    class for other classes to inherit from later
+    class for other classes to inherit from later.
+
+    Cards are immutable flyweights: a card's stats
+    are class attributes, and calling a card class
+    always returns the one shared instance of it,
+    so every deck reuses the same card objects
     """
-    def __init__(self):
+    __slots__ = ()
+    _instances = {}
+
+    _damage = 0
+    _block = 0
+    _energy_cost = 1
+    _status_modifiers = NO_MODIFIERS
+    _name = 'Card'
+    _description = 'A card.'
+    _requires_target = True
+
+    def __new__(cls):
         """
-        Initialises the instance of 
-        the Card class
+        Returns the shared instance of the card class,
+        creating it the first time it is asked for
 
+        Example:
+        >>> Strike() is Strike()
+        True
         """
-        self._damage = 0
-        self._block = 0
-        self._energy_cost = 1
-        self._status_modifiers = {}
-        self._name = 'Card'
-        self._description = 'A card.'
-        self._requires_target = True
+        instance = Card._instances.get(cls)
+        if instance == None:
+            instance = super().__new__(cls)
+            Card._instances[cls] = instance
+        return instance
 
     def get_damage_amount(self) -> int:
         """
@@ -66,18 +92,19 @@ class Card():
         """
         return self._energy_cost
 
-    def get_status_modifiers(self) -> dict[str, int]:
+    def get_status_modifiers(self) -> types.MappingProxyType:
         """
         This method returns the status modifiers 
         of a card
 
         Returns: 
-            dict: A dictionary containing the status
-                  modifiers 
+            MappingProxyType: A read-only mapping of
+                  the status modifiers, which every
+                  copy of the card shares
 
         Example:
-        >>> card = Card()
-        >>> card.get_status_modifiers()
+        >>> card = Neutralize()
+        >>> dict(card.get_status_modifiers())
         {'weak': 1, 'vulnerable': 2}
         """
         return self._status_modifiers
@@ -160,80 +187,65 @@ class Strike(Card):
     Inherits from the Card class. Class
     for the strike card
 
+    Example:
+    >>> strike = Strike()
+    >>> strike.get_description()
+    'Deal 6 damage.'
+    >>> strike.get_name()
+    'Strike'
+    >>> strike.get_damage_amount()
+    6
     """
-    def __init__(self):
-        """
-        Initialises an instance of the Strike
-        class
-
-        Example:
-        >>> strike = Strike()
-        >>> strike.get_description()
-        'Deal 6 damage.'
-        >>> strike.get_name()
-        'Strike'
-        >>> Strike.get_damage()
-        6
-        """
-        self._damage = 6
-        self._block = 0
-        self._energy_cost = 1
-        self._status_modifiers = {}
-        self._name = 'Strike'
-        self._description = 'Deal 6 damage.'
-        self._requires_target = True
+    __slots__ = ()
+    _damage = 6
+    _block = 0
+    _energy_cost = 1
+    _status_modifiers = NO_MODIFIERS
+    _name = 'Strike'
+    _description = 'Deal 6 damage.'
+    _requires_target = True
 
 class Defend(Card):
     """
     Class for the Defend card which 
     inherits from the Card class
 
+    Example:
+    >>> defend = Defend()
+    >>> defend.get_name()
+    'Defend'
+    >>> defend.get_block()
+    5
     """
-    def __init__(self):
-        """
-        Initialises an instance of the Defend
-        class
-
-        Example:
-        >>> defend = Defend()
-        >>> defend.get_name()
-        'Defend'
-        >>> defend.get_block()
-        5
-        """
-        self._damage = 0
-        self._block = 5
-        self._energy_cost = 1
-        self._status_modifiers = {}
-        self._name = 'Defend'
-        self._description = 'Gain 5 block.'
-        self._requires_target = False
+    __slots__ = ()
+    _damage = 0
+    _block = 5
+    _energy_cost = 1
+    _status_modifiers = NO_MODIFIERS
+    _name = 'Defend'
+    _description = 'Gain 5 block.'
+    _requires_target = False
 
 class Bash(Card):
     """
     Class for the Bash class which
     inherits from Card
 
+    Example:
+    >>> bash = Bash()
+    >>> bash.get_name()
+    'Bash'
+    >>> dict(bash.get_status_modifiers())
+    {}
     """
-    def __init__(self):
-        """
-        Initialises an instance of the 
-        Bash class
-
-        Example:
-        >>> bash = Bash()
-        >>> bash.get_name()
-        'Bash'
-        >>> bash.get_status_modifiers()
-        {}
-        """
-        self._damage = 7
-        self._block = 5
-        self._energy_cost = 2
-        self._status_modifiers = {}
-        self._name = 'Bash'
-        self._description = 'Deal 7 damage. Gain 5 block.'
-        self._requires_target = True
+    __slots__ = ()
+    _damage = 7
+    _block = 5
+    _energy_cost = 2
+    _status_modifiers = NO_MODIFIERS
+    _name = 'Bash'
+    _description = 'Deal 7 damage. Gain 5 block.'
+    _requires_target = True
 
 class Neutralize(Card):
     """
@@ -241,27 +253,21 @@ class Neutralize(Card):
     This class inherits all methods
     from Card
 
-
+    >>> neutralize = Neutralize()
+    >>> neutralize.get_name()
+    'Neutralize'
+    >>> neutralize.get_damage_amount()
+    3
     """
-    def __init__(self):
-        """
-        Initialises an instance of the NeutraliZe
-        class
-
-        >>> neutralize = Neutralize()
-        >>> neutralize.get_name()
-        'Neutralize'
-        >>> neutralize.get_damage()
-        3
-        """
-        self._damage = 3
-        self._block = 0
-        self._energy_cost = 0
-        self._status_modifiers = {'weak': 1, 'vulnerable': 2}
-        self._name = 'Neutralize'
-        self._description = \
-            'Deal 3 damage. Apply 1 weak. Apply 2 vulnerable.'
-        self._requires_target = True
+    __slots__ = ()
+    _damage = 3
+    _block = 0
+    _energy_cost = 0
+    _status_modifiers = types.MappingProxyType({'weak': 1, 'vulnerable': 2})
+    _name = 'Neutralize'
+    _description = \
+        'Deal 3 damage. Apply 1 weak. Apply 2 vulnerable.'
+    _requires_target = True
     
 class Survivor(Card):
     """
@@ -269,35 +275,99 @@ class Survivor(Card):
     inherits all methods from the 
     Card class
 
+    Example:
+    >>> survivor = Survivor()
+    >>> survivor.get_name()
+    'Survivor'
+    >>> survivor.get_block()
+    8
+    """
+    __slots__ = ()
+    _damage = 0
+    _block = 8
+    _energy_cost = 1
+    _status_modifiers = types.MappingProxyType({'strength' : 1})
+    _name = 'Survivor'
+    _description = 'Gain 8 block and 1 strength.'
+    _requires_target = False
+
+# Fields hashed by get_hash, as indices into zobrist_salts
+HASH_HP = 0
+HASH_BLOCK = 1
+HASH_STRENGTH = 2
+HASH_WEAK = 3
+HASH_VULNERABLE = 4
+HASH_ENERGY = 5
+HASH_DAMAGE = 6
+HASH_CALLS = 7
+HASH_DECK = 8
+HASH_HAND = 9
+HASH_DISCARD = 10
+HASH_MAX_HP = 11
+PLAYER_TURN_KEY = stable_key('player turn')
+
+def add_subscriber(events: dict | None, allowed: tuple[str, ...],
+                   event: str, callback) -> dict:
+    """
+    Adds a callback to a table of event subscribers. Each event's
+    callbacks are kept as a tuple, which is replaced rather than
+    changed, so a callback can subscribe or unsubscribe while the
+    event it is handling is being sent
+
     Args:
-        Card (_type_): _description_
+        events: the table, or None if there is nobody subscribed
+        allowed: names of the events that can be subscribed to
+        event: the event to subscribe to
+        callback: called with the event's arguments
+
+    Returns:
+        dict: the updated table
     """
-    def __init__(self):
-        """
-        Initialises an instance of the 
-        Surivor class
+    if event not in allowed:
+        raise ValueError(f'unknown event {event}')
+    events = dict(events) if events != None else {}
+    events[event] = events.get(event, ()) + (callback,)
+    return events
+
+def remove_subscriber(events: dict | None, event: str,
+                      callback) -> dict | None:
+    """
+    Removes a callback from a table of event subscribers
 
-        Example:
-        >>> surivor = Surivor()
-        >>> survivor.get_name()
-        'Survivor'
-        >>> survivor.get_block()
-        8
-        """
-        self._damage = 0
-        self._block = 8
-        self._energy_cost = 1
-        self._status_modifiers = {'strength' : 1}
-        self._name = 'Survivor'
-        self._description = 'Gain 8 block and 1 strength.'
-        self._requires_target = False
+    Args:
+        events: the table, or None if there is nobody subscribed
+        event: the event to unsubscribe from
+        callback: the callback to remove
+
+    Returns:
+        dict: the updated table
+        None: if nobody is subscribed any more, so the
+        hot paths go back to sending nothing
+    """
+    if events == None or callback not in events.get(event, ()):
+        return events
+    callbacks = list(events[event])
+    callbacks.remove(callback)
+    events = dict(events)
+    if callbacks:
+        events[event] = tuple(callbacks)
+    else:
+        del events[event]
+    return events if events else None
 
 class Entity():
     """
     Class for all entity's within the program.
-    This is an abstract class
+    This is an abstract class.
+
+    Entities keep a Zobrist hash of their stats, which is
+    built the first time get_hash is called and from then
+    on updated by every method that changes a stat
 
     """
+    __slots__ = ('_max_hp', '_current_hp', '_block', '_strength',
+                 '_weak', '_vulnerable', '_hash_salts', '_zobrist')
+
     def __init__(self, max_hp: int) -> None:
         """
         Initialises an instance of the Entity class 
@@ -313,6 +383,9 @@ class Entity():
         self._strength = 0
         self._weak = 0
         self._vulnerable = 0
+        self._hash_salts = zobrist_salts(type(self).__name__)
+        # None until get_hash is first called
+        self._zobrist = None
     
     def get_hp(self) -> int:
         """
@@ -430,6 +503,8 @@ class Entity():
         >>> entity.get_hp()
         40
         """
+        old_hp = self._current_hp
+        old_block = self._block
         # Determines block amount remaining
         self._block = self._block - amount 
         if self._block <= 0:
@@ -440,6 +515,9 @@ class Entity():
             self._block = 0
         if self._current_hp < 0: # Ensures the hp cannot go below 0 
             self._current_hp = 0
+        if self._zobrist != None:
+            self._update_hash(HASH_HP, old_hp, self._current_hp)
+            self._update_hash(HASH_BLOCK, old_block, self._block)
 
     
     def is_defeated(self) -> bool:
@@ -479,6 +557,8 @@ class Entity():
         >>> entity.get_block()
         3
         """
+        if self._zobrist != None:
+            self._update_hash(HASH_BLOCK, self._block, self._block + amount)
         self._block = self._block + amount
     
     def add_strength(self, amount: int) -> None:
@@ -496,6 +576,9 @@ class Entity():
         >>> entity.get_strength()
         5
         """
+        if self._zobrist != None:
+            self._update_hash(
+                HASH_STRENGTH, self._strength, self._strength + amount)
         self._strength = self._strength + amount
     
     def add_weak(self, amount: int) -> None:
@@ -513,6 +596,8 @@ class Entity():
         >>> entity.get_weak()
         4
         """
+        if self._zobrist != None:
+            self._update_hash(HASH_WEAK, self._weak, self._weak + amount)
         self._weak = self._weak + amount
     
     def add_vulnerable(self, amount: int) -> None:
@@ -531,6 +616,9 @@ class Entity():
         8
 
         """
+        if self._zobrist != None:
+            self._update_hash(HASH_VULNERABLE, self._vulnerable,
+                              self._vulnerable + amount)
         self._vulnerable =  self._vulnerable + amount
     
     def new_turn(self) -> None:
@@ -551,6 +639,13 @@ class Entity():
         >>> entity.get_weak()
         4
         """
+        if self._zobrist != None:
+            self._update_hash(HASH_BLOCK, self._block, 0)
+            if self._weak > 0:
+                self._update_hash(HASH_WEAK, self._weak, self._weak - 1)
+            if self._vulnerable > 0:
+                self._update_hash(HASH_VULNERABLE, self._vulnerable,
+                                  self._vulnerable - 1)
         self._block = 0
         # Control statements to prevent user's stats 
         # being negative
@@ -558,6 +653,168 @@ class Entity():
             self._weak = self._weak - 1
         if self._vulnerable > 0:
             self._vulnerable = self._vulnerable - 1
+
+    def get_hash(self) -> int:
+        """
+        Returns a 64-bit Zobrist hash of the entity's stats.
+        Equal stats give equal hashes in every process, so the
+        hash can key shared or on disk tables
+
+        Returns:
+            int: the entity's hash
+
+        Example:
+        >>> Entity(30).get_hash() == Entity(30).get_hash()
+        True
+        """
+        if self._zobrist == None:
+            self._zobrist = 0
+            for field, value in self._hash_fields():
+                self._zobrist ^= zobrist_key(self._hash_salts[field], value)
+        return self._zobrist
+
+    def set_hash_label(self, label: str) -> None:
+        """
+        Sets the label the entity's hash is derived from, so
+        entities of the same type in different slots of an
+        encounter hash differently
+
+        Args:
+            label (str): the entity's label, such as 'Louse:0'
+
+        """
+        self._hash_salts = zobrist_salts(label)
+        self._zobrist = None
+
+    def _hash_fields(self) -> tuple[tuple[int, int], ...]:
+        """
+        Returns the hashed fields of the entity
+
+        Returns:
+            tuple: (field, value) pairs
+        """
+        # Max HP never changes, but a jaw worm's moves depend on it
+        return ((HASH_MAX_HP, self._max_hp), (HASH_HP, self._current_hp),
+                (HASH_BLOCK, self._block), (HASH_STRENGTH, self._strength),
+                (HASH_WEAK, self._weak), (HASH_VULNERABLE, self._vulnerable))
+
+    def _update_hash(self, field: int, old: int, new: int) -> None:
+        """
+        Updates the hash for a field changing from old to new
+
+        Args:
+            field (int): the field that changed
+            old (int): its previous value
+            new (int): its new value
+
+        """
+        salt = self._hash_salts[field]
+        self._zobrist ^= zobrist_key(salt, old) ^ zobrist_key(salt, new)
+
+    def get_state(self) -> tuple:
+        """
+        Returns the entity's changeable stats as a tuple,
+        which set_state can later put back
+
+        Returns:
+            tuple: current HP, block, strength, weak
+            and vulnerable
+
+        Example:
+        >>> entity = Entity(30)
+        >>> entity.add_block(4)
+        >>> entity.get_state()
+        (30, 4, 0, 0, 0)
+        """
+        return (self._current_hp, self._block, self._strength,
+                self._weak, self._vulnerable)
+
+    def set_state(self, state: tuple) -> None:
+        """
+        Puts back stats returned by get_state
+
+        Args:
+            state (tuple): stats from get_state
+
+        """
+        self._current_hp = state[0]
+        self._block = state[1]
+        self._strength = state[2]
+        self._weak = state[3]
+        self._vulnerable = state[4]
+        self._zobrist = None
+
+    def _record_stats(self, log: list) -> None:
+        """
+        Pushes the stats an action can change, and the hash
+        they give, onto an undo log
+
+        Args:
+            log (list): the undo log to push onto
+
+        """
+        log.extend((self._current_hp, self._block, self._strength,
+                    self._weak, self._vulnerable, self._zobrist))
+
+    def _restore_stats(self, log: list) -> None:
+        """
+        Pops stats pushed by _record_stats off an undo log
+
+        Args:
+            log (list): the undo log to pop from
+
+        """
+        self._zobrist = log.pop()
+        self._vulnerable = log.pop()
+        self._weak = log.pop()
+        self._strength = log.pop()
+        self._block = log.pop()
+        self._current_hp = log.pop()
+
+    @classmethod
+    def from_state(cls, max_hp: int, state: tuple) -> 'Entity':
+        """
+        Builds an entity straight from stats returned by
+        get_state. __init__ is skipped, so no monster ID is
+        used up and no random damage is drawn
+
+        Args:
+            max_hp (int): the maximum hp the entity can have
+            state (tuple): stats from get_state
+
+        Returns:
+            Entity: an entity with those stats
+
+        Example:
+        >>> louse = Louse.from_state(10, (4, 0, 0, 0, 0, 6))
+        >>> louse.action()
+        {'damage': 6}
+        """
+        entity = object.__new__(cls)
+        entity._max_hp = max_hp
+        entity._hash_salts = zobrist_salts(cls.__name__)
+        entity.set_state(state)
+        return entity
+
+    def clone(self) -> 'Entity':
+        """
+        Returns an independent copy of the entity
+
+        Returns:
+            Entity: a copy with the same stats
+
+        Example:
+        >>> entity = Entity(30)
+        >>> twin = entity.clone()
+        >>> twin.reduce_hp(10)
+        >>> entity.get_hp(), twin.get_hp()
+        (30, 20)
+        """
+        twin = object.__new__(type(self))
+        twin._max_hp = self._max_hp
+        twin._hash_salts = self._hash_salts
+        twin.set_state(self.get_state())
+        return twin
     
     def __str__(self) -> str:
         """
@@ -603,7 +860,19 @@ class Player(Entity):
     all methods from the Entity class
 
     """
-    def __init__(self, max_hp: int, cards: list[Card] | None = None) -> None:
+    __slots__ = ('_rng', '_original_deck', '_user_energy',
+                 '_player_discard_pile', '_player_deck', '_player_hand',
+                 '_hand_index', '_deck_sum', '_hand_sum', '_discard_sum',
+                 '_events', '_stats')
+    # Events that can be subscribed to, and the arguments
+    # their callbacks are called with:
+    # turn_started(player) once the new hand is drawn
+    # card_played(player, card) once the card is paid for
+    # turn_ended(player) once the hand is discarded
+    EVENTS = ('turn_started', 'card_played', 'turn_ended')
+
+    def __init__(self, max_hp: int, cards: list[Card] | None = None,
+                 rng=None) -> None:
         """
         Initialises an instance of the Player class
 
@@ -611,12 +880,15 @@ class Player(Entity):
             max_hp (int): maximum HP a player can have
             cards (list[Card] | None, optional): list of cards
             the Player has 
+            rng (optional): random stream used for drawing
+            cards. Defaults to the global random module
         
         Example:
         >>> player = Player(20, [Strike, Defend])
 
         """
         super().__init__(max_hp)
+        self._rng = rng if rng != None else random
         self._original_deck = cards
         self._user_energy = 3 
         self._player_discard_pile = []
@@ -627,6 +899,13 @@ class Player(Entity):
             self._player_deck = []
 
         self._player_hand = []
+        # Cards in the hand grouped by name, so a card can be
+        # found without scanning the hand
+        self._hand_index = {}
+        # Event subscribers, None while nobody is subscribed
+        self._events = None
+        # Where draws are timed, None while stats are switched off
+        self._stats = None
     
     def get_energy(self) -> int:
         """
@@ -659,6 +938,29 @@ class Player(Entity):
         """
         return self._player_hand
 
+    def get_card(self, card_name: str) -> Card | None:
+        """
+        Finds a card in the player's hand by name
+
+        Args:
+            card_name (str): name of the card to find
+
+        Returns:
+            Card: a card in the hand with that name
+            None: if no card in the hand has that name
+        
+        Example:
+        >>> player = Player(30, [Strike(), Strike(), Strike(),
+        ...                      Defend(), Defend()])
+        >>> player.new_turn()
+        >>> player.get_card('Strike')
+        Strike()
+        """
+        cards = self._hand_index.get(card_name)
+        if cards:
+            return cards[-1]
+        return None
+
     def get_deck(self) -> list[Card]:
         """
         Returns the player's current deck
@@ -687,39 +989,125 @@ class Player(Entity):
 
         """
         return self._player_discard_pile
+
+    def get_rng(self):
+        """
+        Returns the random stream the player
+        draws cards with
+
+        Returns:
+            the player's random stream
+        
+        Example:
+        >>> player = Player(80, [Strike], random.Random(1))
+        >>> player.get_rng().randint(1, 6)
+        2
+        """
+        return self._rng
+
+    def subscribe(self, event: str, callback) -> None:
+        """
+        Calls a callback every time an event in EVENTS happens.
+        While nobody is subscribed the player sends no events
+        at all, so subscribing is the only cost
+
+        Args:
+            event (str): name of the event
+            callback: called with the event's arguments
+
+        Example:
+        >>> played = []
+        >>> player = Player(30, [Strike(), Strike(), Strike(),
+        ...                      Strike(), Strike()])
+        >>> player.subscribe('card_played',
+        ...                  lambda player, card: played.append(card))
+        >>> player.new_turn()
+        >>> player.play_card('Strike')
+        Strike()
+        >>> played
+        [Strike()]
+        """
+        self._events = add_subscriber(self._events, Player.EVENTS,
+                                      event, callback)
+
+    def unsubscribe(self, event: str, callback) -> None:
+        """
+        Stops calling a callback for an event
+
+        Args:
+            event (str): name of the event
+            callback: the callback given to subscribe
+
+        """
+        self._events = remove_subscriber(self._events, event, callback)
+
+    def set_stats(self, stats: 'EncounterStats | None') -> None:
+        """
+        Switches timing of the player's card draws on or off.
+        Encounters switch it along with their own stats
+
+        Args:
+            stats (EncounterStats | None): where to record, or
+            None to switch timing off
+
+        """
+        self._stats = stats
     
     def start_new_encounter(self) -> None:
         """
         Starts a new encounter for the player
-        for when new monsters are presented
+        for when new monsters are presented.
+        A hand left over from winning the last
+        encounter mid-turn goes back into the
+        deck along with the discard pile
 
         Example:
-        >>> player = Player(80, [Strike, Strike, Defend])
-        >>> player.get_discarded()
-        []
+        >>> player = Player(80, [Strike(), Strike(), Strike(),
+        ...                      Strike(), Defend(), Defend()])
+        >>> player.new_turn()
         >>> player.start_new_encounter()
-        >>> player.get_discarded()
-        [Strike, Strike, Defend]
+        >>> len(player.get_deck())
+        6
         """
+        self._discard_hand()
         self._player_deck.extend(self._player_discard_pile)
         self._player_discard_pile = []
+        if self._zobrist != None:
+            self._deck_sum += self._discard_sum
+            self._discard_sum = 0
+
+    def _discard_hand(self) -> None:
+        """
+        Moves every card in the hand to the
+        end of the discard pile
 
+        """
+        self._player_discard_pile.extend(self._player_hand)
+        self._player_hand = []
+        self._hand_index = {}
+        if self._zobrist != None:
+            self._discard_sum += self._hand_sum
+            self._hand_sum = 0
     
     def end_turn(self) -> None:
         """
         Method for when the user turn is ended.
         Resets the player's hand and adds all
-        cards from the deck to the end of the
+        cards from the hand to the end of the
         discarded pile 
 
         Example:
+        >>> player = Player(80, [Strike(), Strike(), Strike(),
+        ...                      Strike(), Strike()])
         >>> player.new_turn()
         >>> player.end_turn()
         >>> player.get_discarded()
-        [Strike, Strike]
+        [Strike(), Strike(), Strike(), Strike(), Strike()]
         """
-        self._player_discard_pile.extend(self._player_hand)
-        self._player_hand = []
+        self._discard_hand()
+        if self._events != None:
+            for callback in self._events.get('turn_ended', ()):
+                callback(self)
 
     def new_turn(self) -> None:
         """
@@ -740,10 +1128,32 @@ class Player(Entity):
         
         """
         super().new_turn()
+        if self._zobrist != None:
+            self._update_hash(HASH_ENERGY, self._user_energy, 3)
+            # Cards still in the hand are dropped by draw_cards
+            kept = self._deck_sum + self._discard_sum
         self._user_energy = 3
+        stats = self._stats
+        if stats != None:
+            start = time.perf_counter()
         # Every new turn a new set of cards is given to the player
-        draw_cards(self._player_deck, 
-                   self._player_hand, self._player_discard_pile)
+        draw_cards(self._player_deck, self._player_hand,
+                   self._player_discard_pile, self._rng)
+        if stats != None:
+            stats.add_time('draw_cards', time.perf_counter() - start)
+        self._index_hand()
+        if self._zobrist != None:
+            # Only the drawn cards are hashed, since the discard
+            # pile either stayed put or became the deck
+            self._hand_sum = 0
+            for card in self._player_hand:
+                self._hand_sum += stable_key(card.get_name())
+            if not self._player_discard_pile:
+                self._discard_sum = 0
+            self._deck_sum = kept - self._hand_sum - self._discard_sum
+        if self._events != None:
+            for callback in self._events.get('turn_started', ()):
+                callback(self)
     
     def play_card(self, card_name: str) -> Card | None:
         """
@@ -769,127 +1179,391 @@ class Player(Entity):
         >>> player.play_card('Bash')
         Bash()
         """
-        enum = enumerate(self._player_hand)
-        # Loops until the user's played card is found in their hand
-        for index, card in enum:
-            if card.get_name() == card_name:
-                # Ensures user has enough energy to play card
-                if card.get_energy_cost() <= self._user_energy:
-                    self._player_hand.pop(index) # Removes card from hand
-                    self._user_energy = \
-                        self._user_energy - card.get_energy_cost()
-                    self._player_discard_pile.append(card)
-                    return card
-    
-    def __repr__(self) -> str:
-        """
-        Creates a string representation
-        of the player
+        cards = self._hand_index.get(card_name)
+        if not cards:
+            return None
+        card = cards[-1]
+        # Ensures user has enough energy to play card
+        if card.get_energy_cost() > self._user_energy:
+            return None
+        cards.pop()
+        if not cards:
+            del self._hand_index[card_name]
+        # The hand keeps its order, since it is shown to the
+        # player and policies play the first card they can
+        # afford, so later cards must close up behind this one.
+        # With at most five shared flyweight cards, remove finds
+        # the first card with that name by identity, which costs
+        # no more than the shift itself
+        self._player_hand.remove(card)
+        if self._zobrist != None:
+            self._update_hash(HASH_ENERGY, self._user_energy,
+                              self._user_energy - card.get_energy_cost())
+            key = stable_key(card_name)
+            self._hand_sum -= key
+            self._discard_sum += key
+        self._user_energy = self._user_energy - card.get_energy_cost()
+        self._player_discard_pile.append(card)
+        if self._events != None:
+            for callback in self._events.get('card_played', ()):
+                callback(self, card)
+        return card
+
+    def get_hash(self) -> int:
+        """
+        Returns a 64-bit Zobrist hash of the player's stats,
+        energy and card piles. Piles are hashed as multisets,
+        so the order of cards within a pile does not matter
 
         Returns:
-            str: exact command required to create 
-            an identical instance of this player
+            int: the player's hash
         """
-        return f"{self.get_name()}({self._max_hp}, {self._original_deck})"
+        if self._zobrist == None:
+            self._deck_sum = self._sum_cards(self._player_deck)
+            self._hand_sum = self._sum_cards(self._player_hand)
+            self._discard_sum = self._sum_cards(self._player_discard_pile)
+        salts = self._hash_salts
+        return (super().get_hash()
+                ^ zobrist_key(salts[HASH_DECK], self._deck_sum)
+                ^ zobrist_key(salts[HASH_HAND], self._hand_sum)
+                ^ zobrist_key(salts[HASH_DISCARD], self._discard_sum))
 
+    def _hash_fields(self) -> tuple[tuple[int, int], ...]:
+        """
+        Returns the hashed fields of the player
 
-class IronClad(Player):
-    """
-    The ironclad class is for the IronClad
-    type of player. This inherits from the
-    Player class
+        Returns:
+            tuple: (field, value) pairs
+        """
+        return super()._hash_fields() + ((HASH_ENERGY, self._user_energy),)
 
-    """
-    def __init__(self):
-        super().__init__(80)
-        self._player_deck = [Strike(), Strike(), Strike(), Strike(), Strike(), 
-                            Defend(), Defend(), Defend(), Defend(), Bash()]
-    
-    def __repr__(self) -> str:
+    @staticmethod
+    def _sum_cards(cards: list[Card]) -> int:
         """
-        returns a string representation of the 
-        IronClad class which is the exact command
-        required to create an identical instance 
+        Returns the multiset hash of a pile of cards, the sum
+        of each card's key. Moving a card between piles moves
+        its key between the sums
+
+        Args:
+            cards (list[Card]): the pile to hash
 
         Returns:
-            str: representation of IronClad instance
-        
-        Example:
-        >>> player = Ironclad()
-        >>> player.__repr__()
-        'Ironclad()'
+            int: the sum of the cards' keys
         """
-        return f"{self.get_name()}()"
-        
-class Silent(Player):
-    """
-    The ironclad class is for the IronClad
-    type of player. This inherits from the
-    Player class
+        total = 0
+        for card in cards:
+            total += stable_key(card.get_name())
+        return total
 
-    """
-    def __init__(self):
-        super().__init__(70)
-        self._player_deck = [Strike(), Strike(), Strike(), Strike(), Strike(),
-                              Defend(), Defend(), Defend(), Defend(), Defend(), 
-                              Neutralize(), Survivor()]
-    
-    def __repr__(self) -> str:
+    def get_state(self) -> tuple:
         """
-        returns a string representation of the 
-        Silent class which is the exact command
-        required to create an identical instance 
+        Returns the player's changeable stats and card
+        piles as a tuple, which set_state can later put back.
+        Piles are stored as tuples, since cards are shared
 
         Returns:
-            str: representation of IronClad instance
-        
-        Example:
-        >>> player = Silent()
-        >>> player.__repr__()
-        'Silent()'
-
+            tuple: the entity stats followed by energy,
+            deck, hand and discard pile
         """
-        return f"{self.get_name()}()"
-    
-class Monster(Entity):
-    """
-    Abstract class for all monsters
-    within the game
-    """
-    _id_counter = 0
-    def __init__(self, max_hp: int) -> None:
+        return super().get_state() + (
+            self._user_energy, tuple(self._player_deck),
+            tuple(self._player_hand), tuple(self._player_discard_pile))
+
+    def set_state(self, state: tuple) -> None:
         """
-        Initialises an instance of the 
-        monster class
+        Puts back stats and card piles returned by get_state
 
         Args:
-            max_hp (int): maximum HP the monster
-            can have
+            state (tuple): stats from get_state
 
         """
-        super().__init__(max_hp)
-        self._monster_id = Monster._id_counter
-        # Every new monster recieves a unique ID 
-        Monster._id_counter = Monster._id_counter + 1
-    
-    def get_id(self) -> int:
+        super().set_state(state)
+        self._user_energy = state[5]
+        self._player_deck = list(state[6])
+        self._player_hand = list(state[7])
+        self._player_discard_pile = list(state[8])
+        self._index_hand()
+
+    def _index_hand(self) -> None:
         """
-        Returns the unique ID of a monster
+        Rebuilds the lookup of cards in the hand by name
 
-        Returns:
-            int: the ID of the instance
-        
-        Example:
-        >>> monster1 = Monster(40)
-        >>> monster2 = Monster(30)
-        >>> monster1.get_id()
-        0
-        >>> monster2.get_id()
-        1
         """
-        return self._monster_id 
+        self._hand_index = {}
+        for card in self._player_hand:
+            self._hand_index.setdefault(card.get_name(), []).append(card)
 
-    def action(self) -> dict[str, int]:
+    def _record_stats(self, log: list) -> None:
+        """
+        Pushes the stats an action can change onto an undo
+        log, with the energy and, once hashing has started,
+        the pile hashes
+
+        Args:
+            log (list): the undo log to push onto
+
+        """
+        if self._zobrist != None:
+            log.extend((self._deck_sum, self._hand_sum, self._discard_sum))
+        log.append(self._user_energy)
+        super()._record_stats(log)
+
+    def _restore_stats(self, log: list) -> None:
+        """
+        Pops stats pushed by _record_stats off an undo log
+
+        Args:
+            log (list): the undo log to pop from
+
+        """
+        super()._restore_stats(log)
+        self._user_energy = log.pop()
+        if self._zobrist != None:
+            self._discard_sum = log.pop()
+            self._hand_sum = log.pop()
+            self._deck_sum = log.pop()
+
+    def _unplay_card(self, card: Card, position: int) -> None:
+        """
+        Moves a card played with play_card from the end of
+        the discard pile back to its place in the hand. The
+        energy is put back with the rest of the stats
+
+        Args:
+            card (Card): the card that was played
+            position (int): where it was in the hand
+
+        """
+        self._player_discard_pile.pop()
+        self._player_hand.insert(position, card)
+        self._index_hand()
+
+    def _undiscard_hand(self, count: int) -> None:
+        """
+        Moves the cards end_turn discarded back into the hand
+
+        Args:
+            count (int): how many cards the hand held
+
+        """
+        discarded = self._player_discard_pile
+        self._player_hand = discarded[len(discarded) - count:]
+        del discarded[len(discarded) - count:]
+        self._index_hand()
+
+    def _record_draw(self, log: list) -> None:
+        """
+        Pushes what new_turn needs to undo its draw onto an
+        undo log: the hand it drops, how many cards a short
+        deck carries into the hand, whether the discard pile
+        becomes the deck and the random state the draw starts
+        from, since the cards it picks come from that stream
+
+        Args:
+            log (list): the undo log to push onto
+
+        """
+        log.append(tuple(self._player_hand))
+        reshuffled = len(self._player_deck) < 5
+        log.append(len(self._player_deck) if reshuffled else 0)
+        log.append(reshuffled)
+        log.append(self._rng.getstate())
+
+    def _undo_draw(self, log: list) -> None:
+        """
+        Pops what _record_draw pushed off an undo log and puts
+        the cards and random stream back as they were before
+        the draw. The stats are put back separately
+
+        Args:
+            log (list): the undo log to pop from
+
+        """
+        rng_state = log.pop()
+        reshuffled = log.pop()
+        carried = log.pop()
+        undraw_cards(self._player_deck, self._player_hand,
+                     self._player_discard_pile, carried, reshuffled,
+                     self._rng, rng_state)
+        self._player_hand.extend(log.pop())
+        self._index_hand()
+
+    @classmethod
+    def from_state(cls, max_hp: int, state: tuple, rng=None) -> 'Player':
+        """
+        Builds a player straight from stats and card piles
+        returned by get_state, as Entity.from_state does for
+        other entities. The cards in the piles are taken as the
+        player's starting deck
+
+        Args:
+            max_hp (int): the maximum hp the player can have
+            state (tuple): stats and piles from get_state
+            rng (optional): random stream used for drawing
+            cards. Defaults to the global random module
+
+        Returns:
+            Player: a player with those stats and piles
+
+        Example:
+        >>> player = IronClad.from_state(80, IronClad().get_state())
+        >>> player.get_energy()
+        3
+        """
+        player = super().from_state(max_hp, state)
+        player._rng = rng if rng != None else random
+        player._original_deck = list(state[6] + state[7] + state[8])
+        player._events = None
+        player._stats = None
+        return player
+
+    def clone(self, rng=None) -> 'Player':
+        """
+        Returns an independent copy of the player. The copy
+        shares the player's cards, and its random stream unless
+        another is given
+
+        Args:
+            rng (optional): random stream for the copy
+
+        Returns:
+            Player: a copy with the same stats and piles
+        """
+        twin = super().clone()
+        twin._rng = rng if rng != None else self._rng
+        twin._original_deck = self._original_deck
+        # Copies made for searching must not reach the subscribers
+        # or the stats
+        twin._events = None
+        twin._stats = None
+        return twin
+    
+    def __repr__(self) -> str:
+        """
+        Creates a string representation
+        of the player
+
+        Returns:
+            str: exact command required to create 
+            an identical instance of this player
+        """
+        return f"{self.get_name()}({self._max_hp}, {self._original_deck})"
+
+
+# Starting decks, shared by every player since cards are flyweights
+IRONCLAD_DECK = (Strike(),) * 5 + (Defend(),) * 4 + (Bash(),)
+SILENT_DECK = (Strike(),) * 5 + (Defend(),) * 5 + (Neutralize(), Survivor())
+
+class IronClad(Player):
+    """
+    The ironclad class is for the IronClad
+    type of player. This inherits from the
+    Player class
+
+    """
+    __slots__ = ()
+
+    def __init__(self, rng=None):
+        super().__init__(80, list(IRONCLAD_DECK), rng)
+    
+    def __repr__(self) -> str:
+        """
+        returns a string representation of the 
+        IronClad class which is the exact command
+        required to create an identical instance 
+
+        Returns:
+            str: representation of IronClad instance
+        
+        Example:
+        >>> player = Ironclad()
+        >>> player.__repr__()
+        'Ironclad()'
+        """
+        return f"{self.get_name()}()"
+        
+class Silent(Player):
+    """
+    The ironclad class is for the IronClad
+    type of player. This inherits from the
+    Player class
+
+    """
+    __slots__ = ()
+
+    def __init__(self, rng=None):
+        super().__init__(70, list(SILENT_DECK), rng)
+    
+    def __repr__(self) -> str:
+        """
+        returns a string representation of the 
+        Silent class which is the exact command
+        required to create an identical instance 
+
+        Returns:
+            str: representation of IronClad instance
+        
+        Example:
+        >>> player = Silent()
+        >>> player.__repr__()
+        'Silent()'
+
+        """
+        return f"{self.get_name()}()"
+    
+class Monster(Entity):
+    """
+    Abstract class for all monsters
+    within the game
+    """
+    __slots__ = ('_monster_id',)
+    _id_counter = 0
+
+    def __init__(self, max_hp: int) -> None:
+        """
+        Initialises an instance of the 
+        monster class
+
+        Args:
+            max_hp (int): maximum HP the monster
+            can have
+
+        """
+        super().__init__(max_hp)
+        self._monster_id = Monster._id_counter
+        # Every new monster recieves a unique ID 
+        Monster._id_counter = Monster._id_counter + 1
+    
+    def get_id(self) -> int:
+        """
+        Returns the unique ID of a monster
+
+        Returns:
+            int: the ID of the instance
+        
+        Example:
+        >>> monster1 = Monster(40)
+        >>> monster2 = Monster(30)
+        >>> monster1.get_id()
+        0
+        >>> monster2.get_id()
+        1
+        """
+        return self._monster_id 
+
+    def clone(self) -> 'Monster':
+        """
+        Returns an independent copy of the monster, with
+        the same ID
+
+        Returns:
+            Monster: a copy with the same stats
+        """
+        twin = super().clone()
+        twin._monster_id = self._monster_id
+        return twin
+
+    def action(self) -> dict[str, int]:
         """
         returns the action a monster can perform
 
@@ -916,9 +1590,21 @@ class Louse(Monster):
     Monster class
 
     """
-    def __init__(self, max_hp):
+    __slots__ = ('_damage',)
+
+    def __init__(self, max_hp, rng=None):
         super().__init__(max_hp)
-        self._damage = random_louse_amount()
+        self._damage = random_louse_amount(
+            rng if rng != None else random)
+
+    def _hash_fields(self) -> tuple[tuple[int, int], ...]:
+        """
+        Returns the hashed fields of the louse
+
+        Returns:
+            tuple: (field, value) pairs
+        """
+        return super()._hash_fields() + ((HASH_DAMAGE, self._damage),)
 
     def action(self) -> dict[str, int]:
         """
@@ -935,6 +1621,26 @@ class Louse(Monster):
         """
         return {'damage': self._damage}
 
+    def get_state(self) -> tuple:
+        """
+        Returns the louse's changeable stats as a tuple
+
+        Returns:
+            tuple: the entity stats followed by its damage
+        """
+        return super().get_state() + (self._damage,)
+
+    def set_state(self, state: tuple) -> None:
+        """
+        Puts back stats returned by get_state
+
+        Args:
+            state (tuple): stats from get_state
+
+        """
+        super().set_state(state)
+        self._damage = state[5]
+
 class Cultist(Monster):
     """
     Class for the Cultist monster type.
@@ -942,6 +1648,8 @@ class Cultist(Monster):
     Monster class
 
     """
+    __slots__ = ('_damage', '_calls')
+
     def __init__(self, max_hp):
         super().__init__(max_hp)
         self._damage = 0
@@ -963,27 +1671,90 @@ class Cultist(Monster):
         {'damage': 8, 'weak': 1}
 
         """
+        if self._zobrist != None:
+            self._update_hash(HASH_CALLS, self._calls, self._calls + 1)
         # Handles first time action is called
         if self._calls == 0:
             self._calls += 1
             return {'damage': self._damage, 'weak': self._weak}
         
         # Determines if the number of calls is even
+        old_weak = self._weak
         if self._calls % 2 != 0:
             self._weak = 1
         else:
             self._weak = 0
+        if self._zobrist != None:
+            self._update_hash(HASH_WEAK, old_weak, self._weak)
 
         self._damage = 6 + self._calls
         self._calls = self._calls + 1
         return {'damage': self._damage, 'weak': self._weak}
 
+    def _hash_fields(self) -> tuple[tuple[int, int], ...]:
+        """
+        Returns the hashed fields of the cultist
+
+        Returns:
+            tuple: (field, value) pairs
+        """
+        return super()._hash_fields() + ((HASH_CALLS, self._calls),)
+
+    def get_state(self) -> tuple:
+        """
+        Returns the cultist's changeable stats as a tuple
+
+        Returns:
+            tuple: the entity stats followed by its damage
+            and number of actions taken
+        """
+        return super().get_state() + (self._damage, self._calls)
+
+    def set_state(self, state: tuple) -> None:
+        """
+        Puts back stats returned by get_state
+
+        Args:
+            state (tuple): stats from get_state
+
+        """
+        super().set_state(state)
+        self._damage = state[5]
+        self._calls = state[6]
+
+    def _record_stats(self, log: list) -> None:
+        """
+        Pushes the stats an action can change onto an undo
+        log, with the cultist's damage and actions taken
+
+        Args:
+            log (list): the undo log to push onto
+
+        """
+        log.append(self._damage)
+        log.append(self._calls)
+        super()._record_stats(log)
+
+    def _restore_stats(self, log: list) -> None:
+        """
+        Pops stats pushed by _record_stats off an undo log
+
+        Args:
+            log (list): the undo log to pop from
+
+        """
+        super()._restore_stats(log)
+        self._calls = log.pop()
+        self._damage = log.pop()
+
 class JawWorm(Monster):
     """
     Class for the JawWorm monster type.
     This inherits all methods from the 
     Monster class
     """
+    __slots__ = ('_damage', '_difference_in_hp')
+
     def __init__(self, max_hp: int) -> None:
         super().__init__(max_hp)
         self._damage = 0 
@@ -1005,7 +1776,7 @@ class JawWorm(Monster):
         """
 
         self._difference_in_hp = (self._max_hp - self._current_hp) / 2
-
+        old_block = self._block
         
         if self._difference_in_hp.is_integer() != True:
             # If the difference in HP of the JawWorm is 
@@ -1016,15 +1787,83 @@ class JawWorm(Monster):
         else:
             self._block = int(self._difference_in_hp)
             self._damage = int(self._difference_in_hp)
+        if self._zobrist != None:
+            self._update_hash(HASH_BLOCK, old_block, self._block)
 
         return {'damage': self._damage}
 
+    def get_state(self) -> tuple:
+        """
+        Returns the jaw worm's changeable stats as a tuple
+
+        Returns:
+            tuple: the entity stats followed by its damage
+        """
+        return super().get_state() + (self._damage,)
+
+    def set_state(self, state: tuple) -> None:
+        """
+        Puts back stats returned by get_state
+
+        Args:
+            state (tuple): stats from get_state
+
+        """
+        super().set_state(state)
+        self._damage = state[5]
+
+    def _record_stats(self, log: list) -> None:
+        """
+        Pushes the stats an action can change onto an undo
+        log, with the jaw worm's damage
+
+        Args:
+            log (list): the undo log to push onto
+
+        """
+        log.append(self._damage)
+        super()._record_stats(log)
+
+    def _restore_stats(self, log: list) -> None:
+        """
+        Pops stats pushed by _record_stats off an undo log
+
+        Args:
+            log (list): the undo log to pop from
+
+        """
+        super()._restore_stats(log)
+        self._damage = log.pop()
+
+# Tags closing each entry of an encounter's undo log
+UNDO_PLAY = 0
+UNDO_END_TURN = 1
+UNDO_ENEMY_TURN = 2
+
 class Encounter():
     """
     This class is for all encounters the user
     will face whilst playing the game
     """
-    def __init__(self, player: Player, monsters: list[tuple[str, int]]) -> None:
+    # Events that can be subscribed to, and the arguments
+    # their callbacks are called with:
+    # turn_started(encounter) once the player has a new hand
+    # card_played(encounter, card, target) once the card is
+    # paid for, before it takes effect. target is None for
+    # untargeted cards
+    # damage_dealt(encounter, monster, amount) for HP a card took
+    # monster_defeated(encounter, monster) once it is removed
+    # encounter_won(encounter) once the last monster is removed
+    # turn_ended(encounter) once the monsters are ready to act
+    # damage_taken(encounter, monster, amount) for HP a monster
+    # took from the player
+    EVENTS = ('turn_started', 'card_played', 'damage_dealt',
+              'monster_defeated', 'encounter_won', 'turn_ended',
+              'damage_taken')
+
+    def __init__(self, player: Player, monsters: list[tuple[str, int]],
+                 rng=None, subscribers: dict | None = None,
+                 stats: 'EncounterStats | None' = None) -> None:
         """
         Initialises an instance of the encounter class
 
@@ -1032,21 +1871,44 @@ class Encounter():
             player: the current player instance
             monsters: list of tuples of monsters.
             Each tuple contains its name and ID 
+            rng (optional): random stream for the monsters.
+            Defaults to the player's random stream
+            subscribers (dict | None, optional): event name ->
+            callbacks to subscribe before the first turn starts
+            stats (EncounterStats | None, optional): where to
+            record stats, switched on before the first hand is
+            drawn so that draw is timed too
         
         """
         self._monster = []
-        self._monster_ids = []
+        # Living monsters keyed by ID, kept in step with self._monster
+        self._monster_index = {}
         self._player = player
+        self._rng = rng if rng != None else player.get_rng()
         for monster in monsters:
             if monster[0] == 'Louse':
-                self._monster.append(Louse(monster[1]))
+                self._monster.append(Louse(monster[1], self._rng))
             elif monster[0] == 'JawWorm':
                 self._monster.append(JawWorm(monster[1]))
             elif monster[0] == 'Cultist':
-                self._monster.append(Cultist([monster[1]]))
-        for creatures in self._monster:
-            existing_monster_id = creatures.get_id()
-            self._monster_ids.append(existing_monster_id)
+                self._monster.append(Cultist(monster[1]))
+        for position, creatures in enumerate(self._monster):
+            self._monster_index[creatures.get_id()] = creatures
+            # Hashes by spawn slot, which is the same in every
+            # process, rather than by the global monster ID
+            creatures.set_hash_label(f'{creatures.get_name()}:{position}')
+        # Undo log, None while undo is switched off
+        self._undo_log = None
+        # Counters and timers, None while stats are switched off
+        self._stats = None
+        if stats != None:
+            self.set_stats(stats)
+        # Event subscribers, None while nobody is subscribed
+        self._events = None
+        if subscribers:
+            for event, callbacks in subscribers.items():
+                for callback in callbacks:
+                    self.subscribe(event, callback)
 
         self._player.start_new_encounter()
         self.start_new_turn()
@@ -1081,6 +1943,27 @@ class Encounter():
         """
         return self._monster
 
+    def get_monster(self, monster_id: int) -> Monster | None:
+        """
+        Finds a living monster in the encounter by its ID
+
+        Args:
+            monster_id (int): ID of the monster to find
+
+        Returns:
+            Monster: the monster with that ID
+            None: if no living monster has that ID
+        
+        Example:
+        >>> encounter = Encounter(IronClad(), [('Louse', 20)])
+        >>> louse = encounter.get_monsters()[0]
+        >>> encounter.get_monster(louse.get_id())
+        Louse(20)
+        >>> encounter.get_monster(-1) == None
+        True
+        """
+        return self._monster_index.get(monster_id)
+
     def start_new_turn(self) -> None:
         """
         Method for starting a new turn for the user.
@@ -1091,6 +1974,9 @@ class Encounter():
         """
         self._player_turn = True
         self._player.new_turn()
+        if self._events != None:
+            for callback in self._events.get('turn_started', ()):
+                callback(self)
     
     def end_player_turn(self) -> None:
         """
@@ -1098,6 +1984,14 @@ class Encounter():
         This sets it to no longer being the player's
         turn
         """
+        log = self._undo_log
+        if log != None:
+            log.append(self._player_turn)
+            log.append(len(self._player.get_hand()))
+            self._player._record_stats(log)
+            for creatures in self._monster:
+                creatures._record_stats(log)
+            log.append(UNDO_END_TURN)
         self._player_turn = False
         self._player.end_turn()
 
@@ -1105,6 +1999,9 @@ class Encounter():
         # have their turn
         for creatures in self._monster:
             creatures.new_turn()
+        if self._events != None:
+            for callback in self._events.get('turn_ended', ()):
+                callback(self)
 
     def is_active(self) -> bool:
         """
@@ -1140,73 +2037,437 @@ class Encounter():
         >>> encounter.player_apply_card('Destroy', 5)
         False
         """
-        self._card_valid = True
-        self._target_monster = None
-
+        if self._player_turn == False:
+            return False
         # Checks if the card is in the player's hand
-        for cards in self._player.get_hand():
-            if card_name == cards.get_name():
-                self._card_valid = True
-                self._current_card = cards
-                break
-            else:
-                self._card_valid = False
-        
-
-        if self._card_valid == False or self._player_turn == False:
+        card = self._player.get_card(card_name)
+        if card == None:
             return False
-        elif self._current_card.requires_target() == True:
+
+        target = None
+        if card.requires_target() == True:
             if target_id == None:
                 return False
             # Determines the monster the user's attack is targetting
-            for creatures in self._monster_ids:
-                if target_id == creatures:
-                    self._target_monster = creatures
-            if self._target_monster == None:
+            target = self._monster_index.get(target_id)
+            if target == None:
                 return False
-            
-        if self._player.get_energy() < self._current_card.get_energy_cost():
+
+        log = self._undo_log
+        if log != None:
+            # Only the card's place in the hand and the stats it
+            # can change are kept, since the card itself ends up
+            # on top of the discard pile
+            start = len(log)
+            self._player._record_stats(log)
+            log.append(self._player.get_hand().index(card))
+            log.append(card)
+            if target != None:
+                target._record_stats(log)
+            log.append(target)
+            defeated = len(log)
+        # Takes the card from the hand and spends its energy,
+        # failing if the player cannot afford it
+        if self._player.play_card(card_name) == None:
+            if log != None:
+                del log[start:]
             return False
+        events = self._events
+        if events != None:
+            for callback in events.get('card_played', ()):
+                callback(self, card, target)
+
+        self._player.add_block(card.get_block())
+        modifiers = card.get_status_modifiers()
+        if modifiers:
+            if 'strength' in modifiers:
+                self._player.add_strength(modifiers['strength'])
+            if target != None:
+                if 'weak' in modifiers:
+                    target.add_weak(modifiers['weak'])
+                if 'vulnerable' in modifiers:
+                    target.add_vulnerable(modifiers['vulnerable'])
+
+        if target != None:
+            if events != None:
+                hp = target.get_hp()
+            # The game has never scaled damage by weak or
+            # vulnerable: the original multiplied it and threw
+            # the result away, so a card deals its listed damage
+            target.reduce_hp(card.get_damage_amount())
+            if events != None:
+                for callback in events.get('damage_dealt', ()):
+                    callback(self, target, hp - target.get_hp())
+            # Only a monster that was hit can have died
+            if target.is_defeated():
+                self._remove_defeated()
+
+        if log != None:
+            # _remove_defeated pushed a position and monster per
+            # monster removed
+            log.append((len(log) - defeated) // 2)
+            log.append(UNDO_PLAY)
+        return True
     
-        self._player.add_block(self._current_card.get_block())
-        self._dict_of_modifiers = self._current_card.get_status_modifiers()
+    def get_hash(self) -> int:
+        """
+        Returns a 64-bit hash of the encounter's state: the
+        player's stats and card piles, every living monster's
+        stats and counters, and whose turn it is. The hashes of
+        the player and monsters are kept up to date as they
+        change, so this only combines them. Equal states hash
+        equally in every process
 
-        if 'strength' in self._current_card.get_status_modifiers():
-            self._player.add_strength(
-                self._current_card.get_status_modifiers().get('strength'))
-        
-        # Determine targetted monster
-        if self._target_monster != None:
-            for monsters in self._monster:
-                if self._target_monster == monsters.get_id():
-                    self._targetted = monsters
-            
-            if 'weak' in self._current_card.get_status_modifiers():
-                self._targetted.add_weak(
-                    self._current_card.get_status_modifiers().get('weak'))
-
-            if 'vulnerable' in self._current_card.get_status_modifiers():
-                self._targetted.add_vulnerable(
-                self._current_card.get_status_modifiers().get('vulnerable'))
-
-            # calculates damage applied to the player
-            self._damage = self._current_card.get_damage_amount()
-            if self._targetted.get_vulnerable() > 0:
-                self._damage*1.25
-            if self._player.get_weak() > 0:
-                self._damage*0.75
-            self._targetted.reduce_hp(int(self._damage))
-
-        # After an attack determines if any monters have died
+        Returns:
+            int: the encounter's hash
+        """
+        value = self._player.get_hash()
         for monster in self._monster:
-            if monster.get_hp() <= 0:
-                self._monster.remove(monster)
+            value ^= monster.get_hash()
+        if self._player_turn:
+            value ^= PLAYER_TURN_KEY
+        return value
 
-        self._player.play_card(self._current_card.get_name()) 
-    
+    def snapshot(self, include_rng: bool = True) -> tuple:
+        """
+        Captures the state of the encounter so restore can
+        return to it later. Only scalars and the structure of
+        the card piles are copied, since cards are shared
+
+        Args:
+            include_rng (bool): whether to also capture the
+            state of the player's random stream
+
+        Returns:
+            tuple: the captured state
+        
+        Example:
+        >>> encounter = Encounter(IronClad(), [('Louse', 20)])
+        >>> saved = encounter.snapshot()
+        >>> louse = encounter.get_monsters()[0]
+        >>> louse.reduce_hp(5)
+        >>> encounter.restore(saved)
+        >>> louse.get_hp()
+        20
+        """
+        rng_state = self._player.get_rng().getstate() if include_rng else None
+        return (self._player.get_state(),
+                tuple([(monster, monster.get_state())
+                       for monster in self._monster]),
+                self._player_turn, rng_state)
+
+    def restore(self, snapshot: tuple) -> None:
+        """
+        Returns the encounter to a state captured by snapshot.
+        A snapshot can be restored any number of times. The undo
+        log is emptied, since it only knows how to step back from
+        the state being replaced, and hashes kept up to date
+        before stay kept up to date
+
+        Args:
+            snapshot (tuple): state from snapshot
+
+        """
+        hashing = self._player._zobrist != None
+        player_state, monsters, player_turn, rng_state = snapshot
+        self._player.set_state(player_state)
+        self._monster[:] = [monster for monster, _ in monsters]
+        self._monster_index = {}
+        for monster, state in monsters:
+            monster.set_state(state)
+            self._monster_index[monster.get_id()] = monster
+        self._player_turn = player_turn
+        if rng_state != None:
+            self._player.get_rng().setstate(rng_state)
+        if self._undo_log != None:
+            self._undo_log = []
+        if hashing:
+            # set_state drops the hashes, so work them out again
+            # from the restored stats and piles
+            self.get_hash()
+
+    def clone(self, rng=None) -> 'Encounter':
+        """
+        Returns an independent copy of the encounter, with
+        copies of the player and monsters. The copy shares
+        the cards, and the player's random stream unless
+        another is given
+
+        Args:
+            rng (optional): random stream for the copy
+
+        Returns:
+            Encounter: a copy of the encounter
+        """
+        twin = object.__new__(Encounter)
+        twin._player = self._player.clone(rng)
+        twin._rng = rng if rng != None else self._rng
+        twin._monster = [monster.clone() for monster in self._monster]
+        twin._monster_index = {monster.get_id(): monster
+                               for monster in twin._monster}
+        twin._player_turn = self._player_turn
+        twin._undo_log = None
+        twin._stats = None
+        # Copies made for searching must not reach the subscribers
+        twin._events = None
+        if self._player._zobrist != None:
+            # The copy keeps its hashes up to date like the original
+            twin.get_hash()
+        return twin
+
+    def set_undo(self, enabled: bool) -> None:
+        """
+        Switches the undo log on or off. While it is on, every
+        player_apply_card, end_player_turn and enemy_turn records
+        how to reverse itself, so undo can step back through them.
+        The log is one flat list of the values each action changes,
+        closed by a tag naming the action, and an enemy turn keeps
+        the random state only because its draw uses the stream.
+        Switching it off discards the log
+
+        Args:
+            enabled (bool): whether to record actions
+
+        """
+        if not enabled:
+            self._undo_log = None
+        elif self._undo_log == None:
+            self._undo_log = []
+
+    def undo(self) -> bool:
+        """
+        Reverses the most recent recorded action
+
+        Returns:
+            bool: False if there was nothing to undo
         
+        Example:
+        >>> encounter = Encounter(IronClad(), [('JawWorm', 40)])
+        >>> encounter.set_undo(True)
+        >>> encounter.end_player_turn()
+        >>> encounter.get_player().get_hand()
+        []
+        >>> encounter.undo()
+        True
+        >>> len(encounter.get_player().get_hand())
+        5
+        >>> encounter.undo()
+        False
+        """
+        log = self._undo_log
+        if not log:
+            return False
+        tag = log.pop()
+        player = self._player
+        if tag == UNDO_PLAY:
+            count = log.pop()
+            if count:
+                # Put back in the order removed, so every monster
+                # returns to its old position
+                removed = log[len(log) - 2 * count:]
+                del log[len(log) - 2 * count:]
+                for i in range(0, len(removed), 2):
+                    monster = removed[i + 1]
+                    self._monster.insert(removed[i], monster)
+                    self._monster_index[monster.get_id()] = monster
+            target = log.pop()
+            if target != None:
+                target._restore_stats(log)
+            card = log.pop()
+            player._unplay_card(card, log.pop())
+            player._restore_stats(log)
+            return True
+        if tag == UNDO_ENEMY_TURN:
+            player._undo_draw(log)
+        # Both turn entries hold every monster's stats
+        for monster in reversed(self._monster):
+            monster._restore_stats(log)
+        player._restore_stats(log)
+        if tag == UNDO_END_TURN:
+            player._undiscard_hand(log.pop())
+        self._player_turn = log.pop()
         return True
-    
+
+    def set_stats(self, stats: 'EncounterStats | None') -> None:
+        """
+        Switches counters and timers on or off. While they are
+        on, start_new_turn, player_apply_card and enemy_turn are
+        replaced on this encounter by timed versions recording
+        into stats, and the player's card draws and each
+        monster's action are timed where they happen. Switching
+        them off puts the plain methods back, so an encounter
+        without stats only pays for a None check per draw and
+        per enemy turn
+
+        Args:
+            stats (EncounterStats | None): where to record, or
+            None to switch stats off. One EncounterStats can be
+            shared by many encounters
+
+        Example:
+        >>> encounter = Encounter(IronClad(), [('JawWorm', 40)])
+        >>> stats = EncounterStats()
+        >>> encounter.set_stats(stats)
+        >>> encounter.end_player_turn()
+        >>> encounter.enemy_turn()
+        >>> stats.get_calls('monster_actions'), stats.get_calls('draw_cards')
+        (1, 1)
+        """
+        self._stats = stats
+        self._player.set_stats(stats)
+        if stats == None:
+            for name in ('start_new_turn', 'player_apply_card',
+                         'enemy_turn'):
+                self.__dict__.pop(name, None)
+            return
+        self.start_new_turn = self._timed_start_new_turn
+        self.player_apply_card = self._timed_player_apply_card
+        self.enemy_turn = self._timed_enemy_turn
+
+    def subscribe(self, event: str, callback) -> None:
+        """
+        Calls a callback every time an event in EVENTS happens.
+        While nobody is subscribed the encounter sends no events
+        at all, so the hot paths only pay for a None check.
+        Copies made by clone start with no subscribers
+
+        Args:
+            event (str): name of the event
+            callback: called with the event's arguments
+
+        Example:
+        >>> player = Player(30, [Strike(), Strike(), Strike(),
+        ...                      Strike(), Strike()])
+        >>> encounter = Encounter(player, [('Louse', 5)])
+        >>> defeated = []
+        >>> encounter.subscribe('monster_defeated',
+        ...                     lambda encounter, monster:
+        ...                     defeated.append(monster))
+        >>> louse = encounter.get_monsters()[0]
+        >>> encounter.player_apply_card('Strike', louse.get_id())
+        True
+        >>> defeated
+        [Louse(5)]
+        """
+        self._events = add_subscriber(self._events, Encounter.EVENTS,
+                                      event, callback)
+
+    def unsubscribe(self, event: str, callback) -> None:
+        """
+        Stops calling a callback for an event
+
+        Args:
+            event (str): name of the event
+            callback: the callback given to subscribe
+
+        """
+        self._events = remove_subscriber(self._events, event, callback)
+
+    def get_stats(self) -> 'EncounterStats | None':
+        """
+        Returns where the encounter records its stats
+
+        Returns:
+            EncounterStats: the stats being recorded
+            None: if stats are switched off
+        """
+        return self._stats
+
+    def _timed_start_new_turn(self) -> None:
+        """
+        start_new_turn while stats are on. When called by
+        enemy_turn it also counts the damage the monsters did
+        before the player's block is reset
+
+        """
+        stats = self._stats
+        pending = stats._pending
+        if pending != None:
+            stats._pending = None
+            hp, block = pending
+            stats.add_count('damage_taken', hp - self._player.get_hp())
+            stats.add_count('block_absorbed',
+                            block - self._player.get_block())
+        start = time.perf_counter()
+        Encounter.start_new_turn(self)
+        stats.add_time('start_new_turn', time.perf_counter() - start)
+
+    def _timed_player_apply_card(
+            self, card_name: str, target_id: int | None = None) -> bool:
+        """
+        player_apply_card while stats are on, counting cards
+        played, failed plays and the damage the card did
+
+        Args:
+            card_name (str): Name of card being applied
+            target_id (int | None, optional): ID of monster
+            being targetted by user's move
+
+        Returns:
+            bool: if the card application was valid
+        """
+        stats = self._stats
+        target = (self._monster_index.get(target_id)
+                  if target_id != None else None)
+        if target != None:
+            hp, block = target.get_hp(), target.get_block()
+        start = time.perf_counter()
+        played = Encounter.player_apply_card(self, card_name, target_id)
+        stats.add_time('player_apply_card', time.perf_counter() - start)
+        if not played:
+            stats.add_count('failed_plays')
+            return False
+        stats.add_count('cards_played')
+        if target != None:
+            stats.add_count('damage_dealt', hp - target.get_hp())
+            stats.add_count('block_absorbed', block - target.get_block())
+        return True
+
+    def _timed_enemy_turn(self) -> None:
+        """
+        enemy_turn while stats are on, noting the player's HP
+        and block for the damage counts. Nothing happens on the
+        player's turn, so nothing is recorded
+
+        """
+        if self._player_turn == True:
+            return
+        stats = self._stats
+        stats._pending = (self._player.get_hp(), self._player.get_block())
+        start = time.perf_counter()
+        Encounter.enemy_turn(self)
+        stats.add_time('enemy_turn', time.perf_counter() - start)
+        stats.maybe_dump()
+
+    def _remove_defeated(self) -> None:
+        """
+        Removes every defeated monster from the encounter
+        in a single pass, keeping the rest in order. While
+        undo is on, the position of each removed monster and
+        the monster are pushed onto the undo log
+
+        """
+        survivors = []
+        defeated = []
+        for position, monster in enumerate(self._monster):
+            if monster.get_hp() > 0:
+                survivors.append(monster)
+            else:
+                del self._monster_index[monster.get_id()]
+                defeated.append(monster)
+                if self._undo_log != None:
+                    self._undo_log.append(position)
+                    self._undo_log.append(monster)
+        # Compacts in place so lists from get_monsters stay current
+        self._monster[:] = survivors
+        if self._events != None:
+            for monster in defeated:
+                for callback in self._events.get('monster_defeated', ()):
+                    callback(self, monster)
+            if not survivors:
+                for callback in self._events.get('encounter_won', ()):
+                    callback(self)
+
     def enemy_turn(self) -> None:
         """
         Method for handling the enemies in 
@@ -1228,10 +2489,28 @@ class Encounter():
         """
         if self._player_turn == True:
             return False
+        log = self._undo_log
+        if log != None:
+            log.append(self._player_turn)
+            self._player._record_stats(log)
+            for creatures in self._monster:
+                creatures._record_stats(log)
+            # The turn ends by drawing, the only action using
+            # the random stream
+            self._player._record_draw(log)
+            log.append(UNDO_ENEMY_TURN)
         
+        events = self._events
+        stats = self._stats
         # Applies all status modifies to user and applies damage
         for creatures in self._monster:
-            self._moves = creatures.action()
+            if stats != None:
+                start = time.perf_counter()
+                self._moves = creatures.action()
+                stats.add_time('monster_actions',
+                               time.perf_counter() - start)
+            else:
+                self._moves = creatures.action()
             if 'weak' in self._moves:
                 self._player.add_weak(self._moves.get('weak'))
             if 'vulnerable' in self._moves:
@@ -1246,10 +2525,501 @@ class Encounter():
                 self._base_damage*0.75
             if creatures.get_strength() > 0:
                 self._base_damage = self._base_damage + creatures.get_strength()
-            self._player.reduce_hp(int(self._base_damage))            
+            if events != None:
+                hp = self._player.get_hp()
+            self._player.reduce_hp(int(self._base_damage))
+            if events != None:
+                for callback in events.get('damage_taken', ()):
+                    callback(self, creatures, hp - self._player.get_hp())
         self.start_new_turn()
 
-def inspect_command(cards: str, player: Player):
+class EncounterStats():
+    """
+    Counters and timers recorded by encounters with stats on.
+    Times are kept per phase with the number of calls, and
+    counts cover cards played, failed plays, damage dealt and
+    taken, and damage absorbed by block. A summary can be
+    written out periodically while a long run goes on
+    """
+    PHASES = ('start_new_turn', 'player_apply_card', 'enemy_turn',
+              'draw_cards', 'monster_actions')
+    COUNTS = ('cards_played', 'failed_plays', 'damage_dealt',
+              'damage_taken', 'block_absorbed')
+
+    def __init__(self, dump_interval: float | None = None,
+                 stream=None) -> None:
+        """
+        Initialises empty stats
+
+        Args:
+            dump_interval (float | None, optional): seconds between
+            summaries written by maybe_dump, or None to never write
+            stream (optional): file summaries are written to.
+            Defaults to whatever sys.stderr is at the time
+
+        """
+        self._dump_interval = dump_interval
+        self._stream = stream
+        self._next_dump = (time.perf_counter() + dump_interval
+                           if dump_interval != None else None)
+        # Player HP and block before the monsters act
+        self._pending = None
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Sets every counter and timer back to zero
+
+        """
+        self._times = dict.fromkeys(self.PHASES, 0.0)
+        self._calls = dict.fromkeys(self.PHASES, 0)
+        self._counts = dict.fromkeys(self.COUNTS, 0)
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        """
+        Records one call of a phase
+
+        Args:
+            phase (str): one of PHASES
+            seconds (float): how long the call took
+
+        """
+        self._times[phase] += seconds
+        self._calls[phase] += 1
+
+    def add_count(self, name: str, amount: int = 1) -> None:
+        """
+        Adds to a counter
+
+        Args:
+            name (str): one of COUNTS
+            amount (int): how much to add
+
+        """
+        self._counts[name] += amount
+
+    def get_time(self, phase: str) -> float:
+        """
+        Returns the total time spent in a phase
+
+        Args:
+            phase (str): one of PHASES
+
+        Returns:
+            float: seconds spent in the phase
+        """
+        return self._times[phase]
+
+    def get_calls(self, phase: str) -> int:
+        """
+        Returns how many times a phase ran
+
+        Args:
+            phase (str): one of PHASES
+
+        Returns:
+            int: calls of the phase
+        """
+        return self._calls[phase]
+
+    def get_count(self, name: str) -> int:
+        """
+        Returns the value of a counter
+
+        Args:
+            name (str): one of COUNTS
+
+        Returns:
+            int: the counter's value
+        """
+        return self._counts[name]
+
+    def as_dict(self) -> dict:
+        """
+        Returns every counter and timer, for example to
+        save as JSON
+
+        Returns:
+            dict: times and calls per phase, and the counts
+        """
+        return {'times': dict(self._times), 'calls': dict(self._calls),
+                'counts': dict(self._counts)}
+
+    def merge(self, other: 'EncounterStats') -> None:
+        """
+        Adds another set of stats to this one
+
+        Args:
+            other (EncounterStats): the stats to add
+
+        """
+        for phase in self.PHASES:
+            self._times[phase] += other._times[phase]
+            self._calls[phase] += other._calls[phase]
+        for name in self.COUNTS:
+            self._counts[name] += other._counts[name]
+
+    def maybe_dump(self) -> None:
+        """
+        Writes a summary if the dump interval has passed
+        since the last one
+
+        """
+        if self._next_dump == None or time.perf_counter() < self._next_dump:
+            return
+        self._next_dump = time.perf_counter() + self._dump_interval
+        stream = self._stream if self._stream != None else sys.stderr
+        stream.write(f'{self}\n')
+        stream.flush()
+
+    def __str__(self) -> str:
+        """
+        Returns a human readable summary
+
+        Returns:
+            str: time and calls per phase, then the counts
+        """
+        lines = []
+        for phase in self.PHASES:
+            calls = self._calls[phase]
+            mean = self._times[phase] / calls * 1e6 if calls else 0.0
+            lines.append(f'{phase}: {self._times[phase]:.6f}s '
+                         f'{calls} calls {mean:.2f}us/call')
+        lines.append(' '.join(f'{name}: {self._counts[name]}'
+                              for name in self.COUNTS))
+        return '\n'.join(lines)
+
+class GameResult():
+    """
+    Summary of a single game played headlessly
+    by simulate_game
+    """
+    def __init__(self, won: bool, turns: int, hp: int, cards_played: int,
+                 encounters_won: int, failed_plays: int) -> None:
+        """
+        Initialises an instance of the GameResult class
+
+        Args:
+            won (bool): whether every encounter was won
+            turns (int): number of player turns taken
+            hp (int): the player's HP when the game ended
+            cards_played (int): number of cards successfully played
+            encounters_won (int): number of encounters cleared
+            failed_plays (int): number of moves the encounter rejected
+
+        """
+        self._won = won
+        self._turns = turns
+        self._hp = hp
+        self._cards_played = cards_played
+        self._encounters_won = encounters_won
+        self._failed_plays = failed_plays
+
+    def is_won(self) -> bool:
+        """
+        Returns whether the game was won
+
+        Returns:
+            bool: True if every encounter was won
+        """
+        return self._won
+
+    def get_turns(self) -> int:
+        """
+        Returns the number of player turns taken
+
+        Returns:
+            int: player turns across all encounters
+        """
+        return self._turns
+
+    def get_hp(self) -> int:
+        """
+        Returns the player's HP when the game ended
+
+        Returns:
+            int: HP left at the end of the game
+        """
+        return self._hp
+
+    def get_cards_played(self) -> int:
+        """
+        Returns the number of cards successfully played
+
+        Returns:
+            int: cards played across all encounters
+        """
+        return self._cards_played
+
+    def get_encounters_won(self) -> int:
+        """
+        Returns the number of encounters cleared
+
+        Returns:
+            int: encounters won before the game ended
+        """
+        return self._encounters_won
+
+    def get_failed_plays(self) -> int:
+        """
+        Returns the number of moves the encounter rejected
+
+        Returns:
+            int: failed card applications
+        """
+        return self._failed_plays
+
+    def __repr__(self) -> str:
+        """
+        Returns the exact command required to create
+        an identical instance of this result
+
+        Returns:
+            str: representation of the result
+        """
+        return (f"GameResult({self._won}, {self._turns}, {self._hp}, "
+                f"{self._cards_played}, {self._encounters_won}, "
+                f"{self._failed_plays})")
+
+def first_playable_policy(encounter: Encounter) -> tuple[str, int | None] | None:
+    """
+    A simple policy for simulate_game. Plays the first card in
+    the player's hand they have enough energy for, aimed at the
+    first monster, and ends the turn once nothing can be played
+
+    Args:
+        encounter: the encounter being played
+
+    Returns:
+        tuple[str, int | None]: the card name and target ID to play
+        None: if the player should end their turn
+
+    Example:
+    >>> encounter = Encounter(IronClad(), [('Louse', 20)])
+    >>> move = first_playable_policy(encounter)
+    >>> move == (encounter.get_player().get_hand()[0].get_name(),
+    ...          encounter.get_monsters()[0].get_id())
+    True
+    """
+    player = encounter.get_player()
+    target_id = encounter.get_monsters()[0].get_id()
+    for card in player.get_hand():
+        if card.get_energy_cost() <= player.get_energy():
+            return card.get_name(), target_id
+    return None
+
+def simulate_game(player: Player, encounters: list[list[tuple[str, int]]],
+                  policy, max_turns: int = 1000,
+                  stats: EncounterStats | None = None,
+                  subscribers: dict | None = None) -> GameResult:
+    """
+    Plays a full game without any console input or output.
+    The policy is called with the current encounter whenever
+    the player has to make a move, and returns either a
+    (card_name, target_id) pair to play or None to end the turn.
+    A move the encounter rejects counts as a failed play and
+    ends the player's turn, so a confused policy cannot stall
+    the game. Moves are played through a GameSession
+
+    Args:
+        player: the player instance playing the game
+        encounters: monsters in each encounter, as
+        returned by read_game_file
+        policy: callable choosing the player's moves
+        max_turns: turns after which the game counts as lost
+        stats: where every encounter records its counters
+        and timers, or None to leave stats off
+        subscribers: event name -> callbacks subscribed
+        to every encounter, or None for none
+
+    Returns:
+        GameResult: summary of how the game went
+
+    Example:
+    >>> result = simulate_game(IronClad(random.Random(0)),
+    ...                        read_game_file('games/game1.txt'),
+    ...                        first_playable_policy)
+    >>> result.is_won()
+    True
+    """
+    session = GameSession(player, encounters, subscribers, stats)
+    # The session plays each move, so the rules are the same as
+    # for a game played one command at a time
+    while not session.is_over() and session.get_turns() <= max_turns:
+        move = policy(session.get_encounter())
+        if move != None and session.play_card(*move):
+            continue
+        session.end_turn()
+    return session.get_result()
+
+class GameSession():
+    """
+    A whole game played one command at a time, for callers that
+    get their moves from somewhere other than a policy, and the
+    engine simulate_game plays its policy's moves with. A rejected
+    card only counts as a failed play and leaves the turn going,
+    as in the interactive game, so callers decide what follows it
+    """
+    def __init__(self, player: Player,
+                 encounters: list[list[tuple[str, int]]],
+                 subscribers: dict | None = None,
+                 stats: EncounterStats | None = None) -> None:
+        """
+        Starts a game at its first encounter
+
+        Args:
+            player: the player instance playing the game
+            encounters: monsters in each encounter, as returned
+            by read_game_file. Any iterable of encounters works,
+            and is only read as each encounter is reached
+            subscribers: event name -> callbacks subscribed
+            to every encounter, or None for none
+            stats: where every encounter records its counters
+            and timers, or None to leave stats off
+
+        """
+        self._player = player
+        self._subscribers = subscribers
+        self._stats = stats
+        self._encounters = iter(encounters)
+        self._encounter = None
+        self._turns = 0
+        self._cards_played = 0
+        self._failed_plays = 0
+        self._encounters_won = 0
+        self._next_encounter()
+
+    def get_player(self) -> Player:
+        """
+        Returns the player instance
+
+        Returns:
+            Player: the player playing the game
+        """
+        return self._player
+
+    def get_encounter(self) -> Encounter | None:
+        """
+        Returns the encounter being played
+
+        Returns:
+            Encounter: the current encounter
+            None: if every encounter has been won
+        """
+        return self._encounter
+
+    def get_turns(self) -> int:
+        """
+        Returns the number of turns counted so far
+
+        Returns:
+            int: turns taken, counted as in simulate_game
+        """
+        return self._turns
+
+    def is_over(self) -> bool:
+        """
+        Returns whether the game has finished
+
+        Returns:
+            bool: True if the player is defeated or
+            every encounter has been won
+        """
+        return self._encounter == None or self._player.is_defeated()
+
+    def is_won(self) -> bool:
+        """
+        Returns whether the game has been won
+
+        Returns:
+            bool: True if every encounter was won
+        """
+        return self._encounter == None and not self._player.is_defeated()
+
+    def play_card(self, card_name: str, target_id: int | None = None) -> bool:
+        """
+        Plays a card in the current encounter, moving on to the
+        next encounter if it defeats the last monster
+
+        Args:
+            card_name (str): name of the card to play
+            target_id (int | None, optional): ID of the
+            targeted monster
+
+        Returns:
+            bool: if the card was played
+
+        Example:
+        >>> player = Player(30, [Strike(), Strike(), Strike(),
+        ...                      Strike(), Strike()])
+        >>> session = GameSession(player, [[('JawWorm', 40)]])
+        >>> target = session.get_encounter().get_monsters()[0].get_id()
+        >>> session.play_card('Strike', target)
+        True
+        >>> session.play_card('Bash', target)
+        False
+        """
+        if self.is_over():
+            return False
+        if not self._encounter.player_apply_card(card_name, target_id):
+            self._failed_plays += 1
+            return False
+        self._cards_played += 1
+        if not self._encounter.is_active():
+            self._win_encounter()
+        return True
+
+    def end_turn(self) -> bool:
+        """
+        Ends the player's turn and lets the monsters act
+
+        Returns:
+            bool: False if the game is already over
+        """
+        if self.is_over():
+            return False
+        self._encounter.end_player_turn()
+        self._encounter.enemy_turn()
+        self._turns += 1
+        return True
+
+    def get_result(self) -> GameResult:
+        """
+        Summarises the game so far
+
+        Returns:
+            GameResult: the game's result, not won
+            while the game is still going
+        """
+        return GameResult(self.is_won(), self._turns, self._player.get_hp(),
+                          self._cards_played, self._encounters_won,
+                          self._failed_plays)
+
+    def _win_encounter(self) -> None:
+        """
+        Records a won encounter and starts the next one
+
+        """
+        self._encounters_won += 1
+        self._next_encounter()
+
+    def _next_encounter(self) -> None:
+        """
+        Starts the next encounter, skipping any that are
+        won as soon as they start
+
+        """
+        for monsters in self._encounters:
+            self._encounter = Encounter(self._player, monsters,
+                                        subscribers=self._subscribers,
+                                        stats=self._stats)
+            self._turns += 1
+            if self._encounter.is_active():
+                return
+            self._encounters_won += 1
+        self._encounter = None
+
+def inspect_command(cards: str, player: Player, output=print):
     """
     Handles the user inspecting
     their deck or discard pile
@@ -1257,17 +3027,18 @@ def inspect_command(cards: str, player: Player):
     Args:
         cards: the pile being inspected
         player: the current player instance
+        output: callable printing a line of text
     
     Example:
     >>> inspect_command('deck', player)
     [Strike(), Strike(), Defend()]
     """
     if cards == 'deck':
-        print(f'\n{player.get_deck()}\n')
+        output(f'\n{player.get_deck()}\n')
     elif cards == 'discard':
-        print(f'\n{player.get_discarded()}\n')
+        output(f'\n{player.get_discarded()}\n')
 
-def describe_command(card: Card, cards_possible: list[Card]):
+def describe_command(card: Card, cards_possible: list[Card], output=print):
     """
     Handles the user's move for describing
     a card
@@ -1275,6 +3046,7 @@ def describe_command(card: Card, cards_possible: list[Card]):
     Args:
         card: the card being described
         cards_possible: list of possible cards
+        output: callable printing a line of text
     
     Example:
     >>> describe_command('Strike', cards_possible)
@@ -1283,11 +3055,12 @@ def describe_command(card: Card, cards_possible: list[Card]):
     # Loops to find specified card
     for cards in cards_possible:
         if card == cards.get_name():
-                print(f'\n{cards.get_description()}\n')
+                output(f'\n{cards.get_description()}\n')
 
 def play_command(
     monster_found: bool, current_encounter: Encounter, 
-    cards_possible: list[Card], player_move_seperated: list[str]):
+    cards_possible: list[Card], player_move_seperated: list[str],
+    render=display_encounter, output=print):
     """
     Determines if the user attempt at playing a card is valid.
     If it is not, then an error message is displayed. Otherwise,
@@ -1301,20 +3074,25 @@ def play_command(
         user can play
         player_move_seperated: list of the user's
         input splitup
+        render: callable drawing the encounter, such as
+        display_encounter or a renderer's render method
+        output: callable printing a line of text
 
     """
+    # A target that is not a number cannot name a monster
+    if (len(player_move_seperated) > 2
+            and not player_move_seperated[2].isdecimal()):
+        output(CARD_FAILURE_MESSAGE)
+        return
     try:
-        for monster in current_encounter.get_monsters():
-            if int(player_move_seperated[2]) == monster.get_id():
-                monster_found = True
-                if current_encounter.player_apply_card(
-                    player_move_seperated[1], monster.get_id()) == False:
-                    print(CARD_FAILURE_MESSAGE)
-                    break
-                display_encounter(current_encounter)
-            if monster_found == False:
-                print(CARD_FAILURE_MESSAGE)
-                            
+        monster = current_encounter.get_monster(int(player_move_seperated[2]))
+        monster_found = monster != None
+        if monster_found == False or current_encounter.player_apply_card(
+                player_move_seperated[1], monster.get_id()) == False:
+            output(CARD_FAILURE_MESSAGE)
+        else:
+            render(current_encounter)
+
     except IndexError:
         card_found = False
         for card in cards_possible:
@@ -1322,16 +3100,120 @@ def play_command(
                 card_found = True
                 target = card.requires_target()
         if card_found == False:
-            print(CARD_FAILURE_MESSAGE)
+            output(CARD_FAILURE_MESSAGE)
         elif target == True:
-            print(CARD_FAILURE_MESSAGE)
+            output(CARD_FAILURE_MESSAGE)
         else:
             current_encounter.player_apply_card(
                 player_move_seperated[1].strip(), None)
-            display_encounter(current_encounter)
+            render(current_encounter)
+
+def end_turn_command(
+    player: Player, current_encounter: Encounter,
+    cards_possible: list[Card], player_move_seperated: list[str],
+    render=display_encounter, output=print):
+    """
+    Handles the user ending their turn, letting the
+    monsters act and redrawing the encounter
+
+    Args:
+        player: the current player instance
+        current_encounter: the encounter being played
+        cards_possible: list of cards the user can play
+        player_move_seperated: list of the user's input splitup
+        render: callable drawing the encounter
+        output: callable printing a line of text, unused
+
+    """
+    current_encounter.end_player_turn()
+    current_encounter.enemy_turn()
+
+    if player.get_hp() > 0:
+        render(current_encounter)
+
+# Handlers for the first word of a move, all called as
+# handler(player, encounter, cards_possible, move_split_up,
+#         render, output)
+MOVE_COMMANDS = {
+    'inspect': lambda player, encounter, cards, move, render, output:
+        inspect_command(move[1], player, output),
+    'describe': lambda player, encounter, cards, move, render, output:
+        describe_command(move[1], cards, output),
+    'play': lambda player, encounter, cards, move, render, output:
+        play_command(False, encounter, cards, move, render, output),
+}
+MAX_COMPILED_MOVES = 4096
+_compiled_moves = {}
+
+def compile_move(player_move: str) -> tuple | None:
+    """
+    Turns a move into its handler and split up words. Scripts
+    repeat the same few moves many times, so each distinct move
+    is only parsed once
+
+    Args:
+        player_move: the move as typed
+
+    Returns:
+        tuple: the handler and the move split up
+        None: if the move is not a command, and is ignored
+
+    Example:
+    >>> handler, move = compile_move('end turn')
+    >>> handler is end_turn_command, move
+    (True, ['end', 'turn'])
+    >>> compile_move('hello') == None
+    True
+    """
+    compiled = _compiled_moves.get(player_move, False)
+    if compiled is not False:
+        return compiled
+    player_move_seperated = player_move.split(' ')
+    if player_move == 'end turn':
+        compiled = (end_turn_command, player_move_seperated)
+    else:
+        handler = MOVE_COMMANDS.get(player_move_seperated[0])
+        compiled = None
+        if handler != None and len(player_move_seperated) > 1:
+            compiled = (handler, player_move_seperated)
+    if len(_compiled_moves) >= MAX_COMPILED_MOVES:
+        _compiled_moves.clear()
+    _compiled_moves[player_move] = compiled
+    return compiled
+
+def play_move(player: Player, current_encounter: Encounter,
+              cards_possible: list[Card], player_move: str,
+              render=display_encounter, output=print) -> None:
+    """
+    Plays one move as typed, ignoring anything that is not
+    a command
+
+    Args:
+        player: the current player instance
+        current_encounter: the encounter being played
+        cards_possible: list of cards the user can play
+        player_move: the move as typed
+        render: callable drawing the encounter
+        output: callable printing a line of text
+
+    Example:
+    >>> player = IronClad()
+    >>> encounter = Encounter(player, [('Louse', 20)])
+    >>> lines = []
+    >>> play_move(player, encounter, [Strike(), Bash()], 'describe Bash',
+    ...           output=lines.append)
+    >>> lines
+    ['\\nDeal 7 damage. Gain 5 block.\\n']
+    """
+    compiled = compile_move(player_move)
+    if compiled != None:
+        handler, player_move_seperated = compiled
+        handler(player, current_encounter, cards_possible,
+                player_move_seperated, render, output)
 
 def execute_encounter(player: Player, 
-                current_encounter: Encounter, cards_possible: list[Card]):
+                current_encounter: Encounter, cards_possible: list[Card],
+                render=display_encounter, read_move=input) -> bool:
     """
     This function handles the user playing 
     moves 
@@ -1340,66 +3222,90 @@ def execute_encounter(player: Player,
         player: The current player instance
         current_encounter: the monsters present
         cards_possible: list of cards the user can play
+        render: callable drawing the encounter
+        read_move: callable taking a prompt and returning the
+        next move, or None once there are no moves left
 
     Returns:
-        None if the user's HP is below zero or below
+        False if the moves ran out before the encounter
+        ended, otherwise True
     """
     while len(current_encounter.get_monsters()) != 0:
         if player.get_hp() > 0:
-            player_move = input('Enter a move: ')
-            player_move_seperated = player_move.split(' ')
-
-            if player_move == 'end turn':
-                current_encounter.end_player_turn()
-                current_encounter.enemy_turn()
-
-                if player.get_hp() > 0:
-                    display_encounter(current_encounter)
+            player_move = read_move('Enter a move: ')
+            if player_move == None:
+                return False
+            play_move(player, current_encounter, cards_possible,
+                      player_move, render)
+        else:
+            return True
+    return True
 
-            elif player_move_seperated[0] == 'inspect':
-                inspect_command(player_move_seperated[1], player)
+def read_script(script):
+    """
+    Makes a read_move callable that takes moves from a script
+    instead of prompting for them. The script is read in large
+    chunks rather than a line at a time, and no prompts are shown
 
-            elif player_move_seperated[0] == 'describe':
-                describe_command(player_move_seperated[1], cards_possible)
+    Args:
+        script: a file object holding one command per line
 
-            elif player_move_seperated[0] == 'play':
-                monster_found = False
-                play_command(
-    monster_found, current_encounter, cards_possible, player_move_seperated)
-        else:
-            return None
+    Returns:
+        callable: takes a prompt and returns the next line,
+        or None at the end of the script
+    """
+    lines = iter_script(script)
+    return lambda prompt: next(lines, None)
 
-def main():
+def main(render=None, script=None):
     """
     This function is for the main loop of the 
     program. This handles all cases where the game
     may end (player dies, monsters die )
+
+    Args:
+        render (optional): callable drawing the encounter, such
+        as display_encounter or a renderer's render method.
+        Defaults to a BufferedRenderer, which draws the same
+        frames
+        script (optional): a file object holding the player
+        type, the game file and then the moves, one per line.
+        When given nothing is prompted for, and the game stops
+        quietly if the script ends early
     """
+    if render == None:
+        # Imported here, as render imports this module
+        from render import BufferedRenderer
+        render = BufferedRenderer().render
+    read_move = input if script == None else read_script(script)
 
     CARDS_POSSIBLE = [Strike(), Bash(), Neutralize(), Survivor(), Defend()]
-    wanted_player = input('Enter a player type: ')
+    wanted_player = read_move('Enter a player type: ')
     if wanted_player == 'ironclad':
         player = IronClad()
     elif wanted_player == 'silent':
         player = Silent()
-    game_file = input('Enter a game file: ')
-    encounters = read_game_file(game_file)
-    # Tracks number of encounters the user has won
-    encounter_number = 0 
-
-    while player.get_hp() > 0:
-        # Loops til the user has won all encounters
-        while encounter_number != len(encounters):
-            print('New encounter!\n')
-            current_encounter = Encounter(player, encounters[encounter_number])
-            f'/n{display_encounter(current_encounter)}'
-            encounter_number += 1
-
-            execute_encounter(player, current_encounter, CARDS_POSSIBLE)
-            # Checks if there are monsters remaining
-            if len(current_encounter.get_monsters()) == 0:
-                print(ENCOUNTER_WIN_MESSAGE)
-        break
+    elif script != None:
+        return
+    game_file = read_move('Enter a game file: ')
+    if game_file == None:
+        return
+
+    # Encounters are read from the file as they are reached, so
+    # the game starts without loading the whole file
+    for monsters in iter_game_file(game_file):
+        if player.get_hp() <= 0:
+            break
+        print('New encounter!\n')
+        current_encounter = Encounter(player, monsters)
+        render(current_encounter)
+
+        if not execute_encounter(player, current_encounter, CARDS_POSSIBLE,
+                                 render, read_move):
+            return
+        # Checks if there are monsters remaining
+        if len(current_encounter.get_monsters()) == 0:
+            print(ENCOUNTER_WIN_MESSAGE)
 
     if player.get_hp() <= 0:
         print(GAME_LOSE_MESSAGE)
@@ -1408,5 +3314,56 @@ def main():
     print(GAME_WIN_MESSAGE)
     return
 
+def cli(argv: list[str] | None = None) -> None:
+    """
+    Command line entry point. With no arguments the game is
+    played interactively, exactly as before
+
+    Args:
+        argv: the command line arguments, defaulting to sys.argv
+
+    """
+    parser = argparse.ArgumentParser(description='Play the game.')
+    parser.add_argument('--script', default=None,
+                        help='file of commands to play, or - for stdin')
+    parser.add_argument('--renderer', default='buffered',
+                        choices=('buffered', 'diff', 'null'),
+                        help='how encounters are drawn: buffered prints '
+                             'each frame, diff redraws changed lines on '
+                             'the terminal and null draws nothing')
+    parser.add_argument('--quiet', action='store_true',
+                        help='do not display the encounters, the same '
+                             'as --renderer null')
+    parser.add_argument('--profile', default=None, metavar='PREFIX',
+                        help='sample the game, writing PREFIX.collapsed')
+    parser.add_argument('--trace', action='store_true',
+                        help='with --profile, trace every call with '
+                             'cProfile instead, writing PREFIX.pstats')
+    args = parser.parse_args(argv)
+
+    def play(*main_args):
+        if args.profile == None:
+            main(*main_args)
+        else:
+            # Only profiled games pay for loading the profilers
+            from profiling import profile_call
+            profile_call(args.profile, main, *main_args, tracing=args.trace)
+
+    # Imported here, as render imports this module
+    from render import RENDERERS
+    renderer = RENDERERS['null' if args.quiet else args.renderer]()
+    try:
+        if args.script == None:
+            play(renderer.render)
+        elif args.script == '-':
+            play(renderer.render, sys.stdin)
+        else:
+            with open(args.script, 'r') as script:
+                play(renderer.render, script)
+    finally:
+        # Gives the terminal back its normal screen, however the
+        # game ends
+        renderer.close()
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    cli()
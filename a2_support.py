@@ -1,4 +1,7 @@
+import hashlib
 import random
+import sys
+from typing import Iterator
 random.seed(10012023)
 
 ENCOUNTER_WIN_MESSAGE = '\nYou have won the encounter!\n'
@@ -8,27 +11,117 @@ CARD_FAILURE_MESSAGE = '\nCard application failed.\n'
 
 def display_encounter(encounter: 'Encounter') -> None:
     """ Displays the current state of an encounter is a user friendly format.
+        The whole display is written with a single call.
     
         Parameters:
             encounter (Encounter): The encounter to display.
     """
-    print('MONSTERS')
-    for monster in encounter.get_monsters():
-        border = len(str(monster)) * '-'
-        print(f'{border}\nMonster {monster.get_id()}\n{monster}\n{border}')
-    print('\n\n')
-    print('PLAYER')
-    player = encounter.get_player()
-    border = len(f'Hand: {str(player.get_hand())}') * '-'
-    print(
+    sys.stdout.write(format_encounter(encounter))
+
+def format_monster(monster: 'Monster') -> str:
+    """ (str) Returns the lines display_encounter shows for one monster. """
+    border = len(str(monster)) * '-'
+    return f'{border}\nMonster {monster.get_id()}\n{monster}\n{border}\n'
+
+def format_player(player: 'Player') -> str:
+    """ (str) Returns the lines display_encounter shows for the player. """
+    hand = f'Hand: {str(player.get_hand())}'
+    border = len(hand) * '-'
+    return (
         f'{border}\n{player.get_name()}\nHP: {player.get_hp()}/' + \
         f'{player.get_max_hp()}\nEnergy: {player.get_energy()}\n' + \
-        f'Hand: {player.get_hand()}\nBlock: {player.get_block()} ' + \
+        f'{hand}\nBlock: {player.get_block()} ' + \
         f'Strength: {player.get_strength()} ' + \
         f'Vulnerable: {player.get_vulnerable()} ' + \
-        f'Weak: {player.get_weak()}\n{border}'
+        f'Weak: {player.get_weak()}\n{border}\n'
     )
 
+def format_encounter(encounter: 'Encounter') -> str:
+    """ Builds the text display_encounter shows for an encounter.
+    
+        Parameters:
+            encounter (Encounter): The encounter to display.
+        
+        Returns:
+            str: The display, ending in a newline.
+    """
+    parts = ['MONSTERS\n']
+    for monster in encounter.get_monsters():
+        parts.append(format_monster(monster))
+    parts.append('\n\n\nPLAYER\n')
+    parts.append(format_player(encounter.get_player()))
+    return ''.join(parts)
+
+def iter_game_file(filename: str) -> Iterator[list[tuple[str, int]]]:
+    """ Reads a game file one encounter at a time, yielding the information
+        about the monsters in each encounter as soon as it has been read. Only
+        one encounter is held in memory at once, so very large files can be
+        played without loading them first.
+    
+        Parameters:
+            filename (str): The name of the file to read.
+        
+        Yields:
+            list[tuple[str, int]]: The monsters in the next encounter, as
+                                   (monster_type, start_hp) tuples.
+        
+        Raises:
+            ValueError: If a line is malformed. The message gives the file name
+                        and line number.
+    """
+    encounter = None
+    with open(filename, 'r') as file:
+        for line_number, line in enumerate(file, start=1):
+            if line.startswith('Encounter'):
+                if encounter is not None:
+                    yield encounter
+                encounter = []
+                continue
+
+            fields = line.split()
+            if not fields:
+                continue
+            if encounter is None:
+                raise ValueError(f'{filename}:{line_number}: monster listed '
+                                 f'before the first encounter: {line.strip()!r}')
+            if len(fields) != 2 or not fields[1].isdecimal():
+                raise ValueError(f'{filename}:{line_number}: expected '
+                                 f'"<monster_type> <start_hp>", got '
+                                 f'{line.strip()!r}')
+            encounter.append((fields[0], int(fields[1])))
+
+    if encounter is not None:
+        yield encounter
+
+def iter_script(file, chunk_size: int = 1 << 16) -> Iterator[str]:
+    """ Yields the lines of a command script one at a time. The file is read
+        in large chunks rather than a line at a time, so long scripts fed
+        through a pipe cost few reads.
+    
+        Parameters:
+            file: The file object holding the script.
+            chunk_size (int): The number of characters read at once.
+        
+        Yields:
+            str: Each line, without its line ending.
+    """
+    # The pieces of a line running across chunks are only joined once it
+    # ends, so a long line costs time linear in its length.
+    parts = []
+    for chunk in iter(lambda: file.read(chunk_size), ''):
+        lines = chunk.split('\n')
+        if len(lines) == 1:
+            parts.append(chunk)
+            continue
+        parts.append(lines[0])
+        lines[0] = ''.join(parts)
+        parts = [lines.pop()]
+        for line in lines:
+            yield line[:-1] if line.endswith('\r') else line
+    pending = ''.join(parts)
+    if pending:
+        yield pending[:-1] if pending.endswith('\r') else pending
+
 def read_game_file(filename: str) -> list[list[tuple[str, int]]]:
     """ Reads a game file and returns a list of information about the monsters
         in each encounter. The elements of this list are lists of tuples, where
@@ -42,38 +135,38 @@ def read_game_file(filename: str) -> list[list[tuple[str, int]]]:
             list[list[tuple[str, int]]]: A list of information about the
                                          monsters in each encounter (in order).
     """
-    encounters = []
-    with open(filename, 'r') as file:
-        for line in file:
-            if line.startswith('Encounter'):
-                encounters.append([])
-            elif line.strip() != '':
-                monster_type, start_hp = line.strip().split(' ')
-                encounters[-1].append((monster_type, int(start_hp)))
-
-    return encounters
+    return list(iter_game_file(filename))
 
-def select_cards(cards: list, amount: int) -> list['Card']:
+def select_cards(cards: list, amount: int, rng=random) -> list['Card']:
     """ Selects an amount of cards from the cards list, removes those cards from
         the original cards list, and returns the selected cards.
     
         Parameters:
             cards (list): The list of cards to select from.
             amount (int): The amount of cards to select.
+            rng: The random stream to select with (defaults to the global
+                 random module).
         
         Returns:
             list[Card]: The selected cards.
     """
-    selected_indices = random.sample(range(len(cards)), k=amount)
-    selected_cards = [cards[i] for i in selected_indices]
-    for i in sorted(selected_indices, reverse=True):
-        cards.pop(i)
+    # A partial Fisher-Yates shuffle swaps each selected card to the end of
+    # the list, so selecting costs O(amount) and nothing after the selected
+    # cards has to be shifted when they are removed.
+    size = len(cards)
+    for i in range(amount):
+        last = size - 1 - i
+        j = rng.randrange(last + 1)
+        cards[j], cards[last] = cards[last], cards[j]
+    selected_cards = cards[size - amount:]
+    del cards[size - amount:]
     return selected_cards
 
 def draw_cards(
     deck: list['Card'],
     hand: list['Card'],
-    discarded: list['Card']
+    discarded: list['Card'],
+    rng=random
 ) -> None:
     """ Handles drawing cards from the deck to the hand at the beginning of a
         turn.
@@ -83,6 +176,8 @@ def draw_cards(
             hand (list[Card]): The hand to draw into.
             discard (list[Card]): The discard pile used to replenish the deck if
                                   there aren't enough cards available.
+            rng: The random stream to draw with (defaults to the global random
+                 module).
     """
     hand.clear()
     if len(deck) < 5:
@@ -90,8 +185,127 @@ def draw_cards(
         deck.clear()
         deck.extend(discarded)
         discarded.clear()
-    hand.extend(select_cards(deck, 5 - len(hand)))
+    hand.extend(select_cards(deck, 5 - len(hand), rng))
+
+def undraw_cards(
+    deck: list['Card'],
+    hand: list['Card'],
+    discarded: list['Card'],
+    carried: int,
+    reshuffled: bool,
+    rng,
+    rng_state: tuple
+) -> None:
+    """ Reverses draw_cards, putting the cards back where they were. The picks
+        select_cards made are found again by replaying the random stream from
+        the state it was in before the draw, so nothing else has to be kept.
+    
+        Parameters:
+            deck (list[Card]): The deck that was drawn from.
+            hand (list[Card]): The hand that was drawn into.
+            discard (list[Card]): The discard pile of the draw.
+            carried (int): The number of cards a short deck put into the hand.
+            reshuffled (bool): Whether the discard pile became the deck.
+            rng: The random stream that was drawn with.
+            rng_state (tuple): The stream's state before the draw, which it is
+                               left in.
+    """
+    drawn = len(hand) - carried
+    size = len(deck) + drawn
+    deck.extend(hand[carried:])
+    rng.setstate(rng_state)
+    picks = [rng.randrange(size - i) for i in range(drawn)]
+    for i in reversed(range(drawn)):
+        last = size - 1 - i
+        deck[picks[i]], deck[last] = deck[last], deck[picks[i]]
+    if reshuffled:
+        discarded.extend(deck)
+        deck[:] = hand[:carried]
+    hand.clear()
+    rng.setstate(rng_state)
+
+def random_louse_amount(rng=random) -> int:
+    """ (int) Returns a random amount of damage for a louse to give, drawn from
+        rng (defaults to the global random module).
+    """
+    return rng.randint(5, 7)
+
+_MASK_64 = (1 << 64) - 1
+
+def _splitmix64(value: int) -> int:
+    """ (int) Returns the next output of the SplitMix64 generator for value. """
+    value = (value + 0x9E3779B97F4A7C15) & _MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return value ^ (value >> 31)
+
+def spawn_seed(seed: int, index: int) -> int:
+    """ Derives the seed of the index'th game from a batch seed. Derived seeds
+        are well mixed, so neighbouring games get independent streams, and only
+        depend on their arguments, so they are the same in every process.
+    
+        Parameters:
+            seed (int): The seed of the whole batch.
+            index (int): The position of the game within the batch.
+        
+        Returns:
+            int: The seed for that game.
+    """
+    return _splitmix64(_splitmix64(seed & _MASK_64) ^ (index & _MASK_64))
+
+def spawn_rng(seed: int, index: int) -> random.Random:
+    """ Returns an independent, reproducible random stream for the index'th game
+        of a batch seeded with seed.
+    
+        Parameters:
+            seed (int): The seed of the whole batch.
+            index (int): The position of the game within the batch.
+        
+        Returns:
+            random.Random: The random stream for that game.
+    """
+    return random.Random(spawn_seed(seed, index))
 
-def random_louse_amount() -> int:
-    """ (int) Returns a random amount of damage for a louse to give. """
-    return random.randint(5, 7)
+_stable_keys = {}
+_zobrist_salts = {}
+
+def stable_key(label: str) -> int:
+    """ Returns a 64-bit key for label that is the same in every process (unlike
+        hash(), which is salted per process for strings).
+    
+        Parameters:
+            label (str): The text to derive a key from.
+        
+        Returns:
+            int: The key for label.
+    """
+    key = _stable_keys.get(label)
+    if key is None:
+        digest = hashlib.blake2b(label.encode('utf-8'), digest_size=8).digest()
+        key = _stable_keys[label] = int.from_bytes(digest, 'little')
+    return key
+
+def zobrist_salts(label: str) -> tuple[int, ...]:
+    """ Returns one salt per hashed field for the entity described by label.
+        Entities with the same label hash their fields identically.
+    
+        Parameters:
+            label (str): Identifies the entity, e.g. 'Player' or 'Louse:0'.
+        
+        Returns:
+            tuple[int, ...]: The salt of each hashed field.
+    """
+    salts = _zobrist_salts.get(label)
+    if salts is None:
+        base = stable_key(label)
+        salts = _zobrist_salts[label] = tuple(
+            _splitmix64(base + field) for field in range(16))
+    return salts
+
+def zobrist_key(salt: int, value: int) -> int:
+    """ (int) Returns the Zobrist key of a field with the given salt holding
+        value. A field's contribution to a hash is its key, so changing the
+        field from old to new updates the hash by XOR-ing out the old key and
+        XOR-ing in the new one.
+    """
+    return _splitmix64(salt ^ (value & _MASK_64))
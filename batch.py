@@ -0,0 +1,351 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from a2 import *
+from game_cache import load_game_file
+from mcts import MCTSPolicy
+
+PLAYER_TYPES = {'ironclad': IronClad, 'silent': Silent}
+POLICIES = {'first': first_playable_policy, 'mcts': MCTSPolicy()}
+# Index of the search stream spawned from a game's seed, keeping
+# it apart from the stream the game itself draws cards with
+SEARCH_STREAM = 1
+
+
+class BatchResult():
+    """
+    Totals for a batch of headless games. Results from
+    separate chunks of work can be merged together
+    """
+    def __init__(self) -> None:
+        """
+        Initialises an empty BatchResult
+
+        """
+        self._games = 0
+        self._wins = 0
+        self._turns = 0
+        self._hp = 0
+        self._cards_played = 0
+        self._encounters_won = 0
+        self._failed_plays = 0
+        # Counters and timers, None unless stats were collected
+        self._stats = None
+
+    def add(self, result: GameResult) -> None:
+        """
+        Adds the result of a single game to the totals
+
+        Args:
+            result (GameResult): the game to add
+
+        Example:
+        >>> batch = BatchResult()
+        >>> batch.add(GameResult(True, 7, 70, 17, 2, 0))
+        >>> batch.get_wins()
+        1
+        """
+        self._games += 1
+        self._wins += result.is_won()
+        self._turns += result.get_turns()
+        self._hp += result.get_hp()
+        self._cards_played += result.get_cards_played()
+        self._encounters_won += result.get_encounters_won()
+        self._failed_plays += result.get_failed_plays()
+
+    def merge(self, other: 'BatchResult') -> None:
+        """
+        Adds the totals of another batch to this one
+
+        Args:
+            other (BatchResult): the batch to merge in
+        """
+        self._games += other._games
+        self._wins += other._wins
+        self._turns += other._turns
+        self._hp += other._hp
+        self._cards_played += other._cards_played
+        self._encounters_won += other._encounters_won
+        self._failed_plays += other._failed_plays
+        if other._stats != None:
+            if self._stats == None:
+                self._stats = EncounterStats()
+            self._stats.merge(other._stats)
+
+    def set_stats(self, stats: EncounterStats | None) -> None:
+        """
+        Attaches the counters and timers recorded by the batch
+
+        Args:
+            stats (EncounterStats | None): the recorded stats
+
+        """
+        self._stats = stats
+
+    def get_stats(self) -> EncounterStats | None:
+        """
+        Returns the counters and timers recorded by the batch
+
+        Returns:
+            EncounterStats: stats merged across every chunk
+            None: if stats were not collected
+        """
+        return self._stats
+
+    def get_games(self) -> int:
+        """
+        Returns the number of games in the batch
+
+        Returns:
+            int: games played
+        """
+        return self._games
+
+    def get_wins(self) -> int:
+        """
+        Returns the number of games won
+
+        Returns:
+            int: games where every encounter was won
+        """
+        return self._wins
+
+    def get_win_rate(self) -> float:
+        """
+        Returns the fraction of games won
+
+        Returns:
+            float: wins divided by games, or 0 for an empty batch
+        """
+        return self._wins / self._games if self._games else 0.0
+
+    def get_mean_turns(self) -> float:
+        """
+        Returns the average number of turns per game
+
+        Returns:
+            float: mean player turns per game
+        """
+        return self._turns / self._games if self._games else 0.0
+
+    def get_mean_hp(self) -> float:
+        """
+        Returns the average HP left at the end of a game
+
+        Returns:
+            float: mean final HP per game
+        """
+        return self._hp / self._games if self._games else 0.0
+
+    def get_cards_played(self) -> int:
+        """
+        Returns the total number of cards played
+
+        Returns:
+            int: cards played across every game
+        """
+        return self._cards_played
+
+    def get_encounters_won(self) -> int:
+        """
+        Returns the total number of encounters won
+
+        Returns:
+            int: encounters cleared across every game
+        """
+        return self._encounters_won
+
+    def get_failed_plays(self) -> int:
+        """
+        Returns the total number of rejected moves
+
+        Returns:
+            int: failed plays across every game
+        """
+        return self._failed_plays
+
+    def __str__(self) -> str:
+        """
+        Returns a short human readable summary of the batch
+
+        Returns:
+            str: games, win rate, mean turns and mean HP
+        """
+        return (f"Games: {self._games} "
+                f"Win rate: {self.get_win_rate():.3f} "
+                f"Mean turns: {self.get_mean_turns():.2f} "
+                f"Mean HP: {self.get_mean_hp():.2f}")
+
+
+def policy_for_game(policy, seed: int):
+    """
+    Returns the policy to play one game with. An MCTSPolicy keeps
+    a table and random stream between moves, so every game gets a
+    fresh one searching with a stream spawned from the game's seed,
+    and plays the same whichever games ran before it
+
+    Args:
+        policy: callable choosing the player's moves
+        seed: seed of the game's random stream
+
+    Returns:
+        the policy for the game
+
+    Example:
+    >>> policy_for_game(first_playable_policy, 3) is first_playable_policy
+    True
+    """
+    if isinstance(policy, MCTSPolicy):
+        return policy.spawn(spawn_seed(seed, SEARCH_STREAM))
+    return policy
+
+
+def _run_chunk(encounters: list[list[tuple[str, int]]], player_class,
+               policy, seed: int, start: int, games: int,
+               stats: bool = False,
+               stats_interval: float | None = None) -> BatchResult:
+    """
+    Plays one chunk of games inside a worker process. Every game
+    gets its own random stream spawned from the batch seed and the
+    game's index, so a game plays out the same no matter which
+    chunk or worker runs it
+
+    Args:
+        encounters: monsters in each encounter of the game file
+        player_class: the Player subclass to play as
+        policy: callable choosing the player's moves
+        seed: the seed of the whole batch
+        start: index of the first game in this chunk
+        games: number of games in this chunk
+        stats: whether to record counters and timers
+        stats_interval: seconds between summaries the worker
+        writes to stderr, or None for none
+
+    Returns:
+        BatchResult: totals for the chunk
+    """
+    totals = BatchResult()
+    recorded = EncounterStats(stats_interval) if stats else None
+    for index in range(start, start + games):
+        player = player_class(spawn_rng(seed, index))
+        game_policy = policy_for_game(policy, spawn_seed(seed, index))
+        totals.add(simulate_game(player, encounters, game_policy,
+                                 stats=recorded))
+    totals.set_stats(recorded)
+    return totals
+
+
+def run_batch(game_file: str, player_class, policy, games: int,
+              seed: int = 0, workers: int | None = None,
+              chunk_size: int = 250,
+              cache_dir: str | None = None, stats: bool = False,
+              stats_interval: float | None = None) -> BatchResult:
+    """
+    Plays many headless games of one game file across a pool
+    of worker processes and merges the results. Each game is
+    seeded from the batch seed and its index, so the totals only
+    depend on the seed and never on the chunk size or number
+    of workers
+
+    Args:
+        game_file: path of the game file or binary
+        campaign file to play
+        player_class: the Player subclass to play as
+        policy: picklable callable choosing the player's moves
+        games: number of games to play
+        seed: seed for the whole batch
+        workers: number of worker processes (defaults to CPU count),
+        or 0 to play every chunk in this process
+        chunk_size: number of games in each unit of work
+        cache_dir: directory for the on disk parse cache, or
+        None to only cache parsed files in memory
+        stats: whether to record counters and timers, which
+        are then available from the result's get_stats
+        stats_interval: seconds between summaries each worker
+        writes to stderr while stats are recorded
+
+    Returns:
+        BatchResult: totals across every game
+
+    Example:
+    >>> batch = run_batch('games/game1.txt', IronClad,
+    ...                   first_playable_policy, 100, workers=0)
+    >>> batch.get_games()
+    100
+    """
+    encounters = load_game_file(game_file, cache_dir)
+    totals = BatchResult()
+    if workers == 0:
+        for start in range(0, games, chunk_size):
+            totals.merge(_run_chunk(encounters, player_class, policy, seed,
+                                    start, min(chunk_size, games - start),
+                                    stats, stats_interval))
+        return totals
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_chunk, encounters, player_class,
+                                   policy, seed, start,
+                                   min(chunk_size, games - start),
+                                   stats, stats_interval)
+                   for start in range(0, games, chunk_size)]
+        # Merges in submission order so the totals are reproducible
+        for future in futures:
+            totals.merge(future.result())
+    return totals
+
+
+def main():
+    """
+    Command line entry point for running a batch of games
+    """
+    parser = argparse.ArgumentParser(
+        description='Play many headless games of a game file.')
+    parser.add_argument('game_file')
+    parser.add_argument('player', choices=PLAYER_TYPES)
+    parser.add_argument('games', type=int)
+    parser.add_argument('--policy', choices=POLICIES, default='first')
+    parser.add_argument('--iterations', type=int, default=None,
+                        help='search iterations per move for the mcts '
+                             'policy, replacing its time limit so results '
+                             'do not depend on machine speed')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=250)
+    parser.add_argument('--cache-dir', default=None,
+                        help='directory for caching parsed game files')
+    parser.add_argument('--stats', action='store_true',
+                        help='report where simulation time went')
+    parser.add_argument('--stats-interval', type=float, default=None,
+                        help='seconds between progress summaries')
+    parser.add_argument('--profile', default=None, metavar='PREFIX',
+                        help='sample the batch in this process, writing '
+                             'PREFIX.collapsed')
+    parser.add_argument('--trace', action='store_true',
+                        help='with --profile, trace every call with '
+                             'cProfile instead, writing PREFIX.pstats')
+    args = parser.parse_args()
+    policy = POLICIES[args.policy]
+    if args.iterations != None:
+        if not isinstance(policy, MCTSPolicy):
+            parser.error('--iterations needs --policy mcts')
+        policy = MCTSPolicy(iterations=args.iterations)
+
+    batch_args = (args.game_file, PLAYER_TYPES[args.player],
+                  policy, args.games, args.seed,
+                  args.workers, args.chunk_size, args.cache_dir,
+                  args.stats or args.stats_interval != None,
+                  args.stats_interval)
+    if args.profile == None:
+        totals = run_batch(*batch_args)
+    else:
+        # Only profiled runs pay for loading the profilers
+        from profiling import profile_call
+        # Worker processes would hide the games from the profilers
+        batch_args = batch_args[:5] + (0,) + batch_args[6:]
+        totals = profile_call(args.profile, run_batch, *batch_args,
+                              tracing=args.trace)
+    print(totals)
+    if totals.get_stats() != None:
+        print(totals.get_stats())
+
+if __name__ == '__main__':
+    main()
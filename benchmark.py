@@ -0,0 +1,354 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from a2 import *
+
+GAMES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'games')
+# Huge HP so entities survive however long a benchmark runs
+ENDLESS_HP = 10 ** 12
+
+
+def bench_reduce_hp(ops: int) -> tuple[float, int]:
+    """
+    Times Entity.reduce_hp, with the first half of the hits
+    absorbed by block and the rest taken from HP
+
+    Args:
+        ops: number of operations to time
+
+    Returns:
+        tuple[float, int]: seconds taken and operations timed
+    """
+    entity = Entity(ENDLESS_HP)
+    entity.add_block(ops)
+    reduce_hp = entity.reduce_hp
+    start = time.perf_counter()
+    for _ in range(ops):
+        reduce_hp(2)
+    return time.perf_counter() - start, ops
+
+
+def bench_select_cards(ops: int) -> tuple[float, int]:
+    """
+    Times select_cards drawing five of the Silent's twelve cards
+
+    Args:
+        ops: number of operations to time
+
+    Returns:
+        tuple[float, int]: seconds taken and operations timed
+    """
+    rng = spawn_rng(0, 0)
+    cards = list(SILENT_DECK)
+    elapsed = 0.0
+    for _ in range(ops):
+        start = time.perf_counter()
+        selected = select_cards(cards, 5, rng)
+        elapsed += time.perf_counter() - start
+        cards.extend(selected)
+    return elapsed, ops
+
+
+def bench_draw_cards(ops: int) -> tuple[float, int]:
+    """
+    Times draw_cards over a deck cycling through the discard pile
+
+    Args:
+        ops: number of operations to time
+
+    Returns:
+        tuple[float, int]: seconds taken and operations timed
+    """
+    rng = spawn_rng(0, 0)
+    deck = list(SILENT_DECK)
+    hand = []
+    discarded = []
+    elapsed = 0.0
+    for _ in range(ops):
+        discarded.extend(hand)
+        start = time.perf_counter()
+        draw_cards(deck, hand, discarded, rng)
+        elapsed += time.perf_counter() - start
+    return elapsed, ops
+
+
+def bench_new_turn(ops: int) -> tuple[float, int]:
+    """
+    Times Player.new_turn, ending each turn untimed
+
+    Args:
+        ops: number of operations to time
+
+    Returns:
+        tuple[float, int]: seconds taken and operations timed
+    """
+    player = IronClad(spawn_rng(0, 0))
+    elapsed = 0.0
+    for _ in range(ops):
+        player.end_turn()
+        start = time.perf_counter()
+        player.new_turn()
+        elapsed += time.perf_counter() - start
+    return elapsed, ops
+
+
+def bench_player_apply_card(ops: int) -> tuple[float, int]:
+    """
+    Times Encounter.player_apply_card playing Strikes at a monster
+    that cannot die. Energy is refilled between plays, untimed
+
+    Args:
+        ops: number of operations to time
+
+    Returns:
+        tuple[float, int]: seconds taken and operations timed
+    """
+    player = Player(ENDLESS_HP, [Strike()] * 10, spawn_rng(0, 0))
+    encounter = Encounter(player, [('Louse', ENDLESS_HP)])
+    target_id = encounter.get_monsters()[0].get_id()
+    apply_card = encounter.player_apply_card
+    elapsed = 0.0
+    played = 0
+    while played < ops:
+        encounter.end_player_turn()
+        encounter.start_new_turn()
+        # Three Strikes use up the turn's energy
+        start = time.perf_counter()
+        apply_card('Strike', target_id)
+        apply_card('Strike', target_id)
+        apply_card('Strike', target_id)
+        elapsed += time.perf_counter() - start
+        played += 3
+    return elapsed, played
+
+
+def bench_enemy_turn(ops: int) -> tuple[float, int]:
+    """
+    Times Encounter.enemy_turn with one of each monster,
+    ending the player's turn untimed
+
+    Args:
+        ops: number of operations to time
+
+    Returns:
+        tuple[float, int]: seconds taken and operations timed
+    """
+    player = Player(ENDLESS_HP, list(IRONCLAD_DECK), spawn_rng(0, 0))
+    encounter = Encounter(player, [('Louse', 100), ('Cultist', 100),
+                                   ('JawWorm', 100)])
+    elapsed = 0.0
+    for _ in range(ops):
+        encounter.end_player_turn()
+        start = time.perf_counter()
+        encounter.enemy_turn()
+        elapsed += time.perf_counter() - start
+    return elapsed, ops
+
+
+def bench_read_game_file(ops: int) -> tuple[float, int]:
+    """
+    Times read_game_file parsing every file in games/
+
+    Args:
+        ops: number of files to parse
+
+    Returns:
+        tuple[float, int]: seconds taken and files parsed
+    """
+    files = game_files()
+    start = time.perf_counter()
+    for index in range(ops):
+        read_game_file(files[index % len(files)])
+    return time.perf_counter() - start, ops
+
+
+def game_benchmark(game_file: str):
+    """
+    Makes a benchmark of full headless games of one game file,
+    alternating between the player types
+
+    Args:
+        game_file: path of the game file to play
+
+    Returns:
+        callable: the benchmark
+    """
+    encounters = read_game_file(game_file)
+
+    def bench_game(ops: int) -> tuple[float, int]:
+        start = time.perf_counter()
+        for index in range(ops):
+            player_class = IronClad if index % 2 == 0 else Silent
+            simulate_game(player_class(spawn_rng(0, index)), encounters,
+                          first_playable_policy)
+        return time.perf_counter() - start, ops
+    return bench_game
+
+
+def game_files() -> list[str]:
+    """
+    Lists the game files benchmarked
+
+    Returns:
+        list[str]: paths of every game file in games/
+    """
+    return sorted(glob.glob(os.path.join(GAMES_DIR, '*.txt')))
+
+
+def benchmarks() -> dict:
+    """
+    Returns every benchmark by name
+
+    Returns:
+        dict: benchmark name -> callable taking a number of
+        operations and returning (seconds, operations)
+    """
+    suite = {
+        'reduce_hp': bench_reduce_hp,
+        'select_cards': bench_select_cards,
+        'draw_cards': bench_draw_cards,
+        'new_turn': bench_new_turn,
+        'player_apply_card': bench_player_apply_card,
+        'enemy_turn': bench_enemy_turn,
+        'read_game_file': bench_read_game_file,
+    }
+    for game_file in game_files():
+        name = os.path.splitext(os.path.basename(game_file))[0]
+        suite[f'game:{name}'] = game_benchmark(game_file)
+    return suite
+
+
+def measure(benchmark, min_time: float = 0.2, repeat: int = 5) -> dict:
+    """
+    Measures one benchmark's speed and memory use. The number of
+    operations is scaled until a run takes min_time, and the fastest
+    of the repeated runs is kept. Memory is measured in a separate,
+    shorter run under tracemalloc, which would distort the timing
+
+    Args:
+        benchmark: the benchmark to measure
+        min_time: seconds each timed run should take at least
+        repeat: number of timed runs
+
+    Returns:
+        dict: operations per second, bytes still allocated per
+        operation and the peak bytes allocated during the run
+    """
+    ops = 1
+    while True:
+        elapsed, done = benchmark(ops)
+        if elapsed >= min_time / 10 or ops >= 10 ** 8:
+            break
+        ops *= 10
+    ops = max(1, int(ops * min_time / max(elapsed, 1e-9)))
+    best = float('inf')
+    for _ in range(repeat):
+        elapsed, done = benchmark(ops)
+        best = min(best, elapsed / done)
+
+    memory_ops = max(1, min(ops, 1000))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    _, done = benchmark(memory_ops)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'ops_per_sec': 1 / best,
+            'net_bytes_per_op': (after - before) / done,
+            'peak_bytes': peak - before}
+
+
+def run_suite(names: list[str] | None = None, min_time: float = 0.2,
+              repeat: int = 5) -> dict:
+    """
+    Measures benchmarks and reports each as it finishes
+
+    Args:
+        names: benchmarks to run, or None for all of them
+        min_time: seconds each timed run should take at least
+        repeat: number of timed runs per benchmark
+
+    Returns:
+        dict: the results, in the form saved as a baseline
+    """
+    suite = benchmarks()
+    results = {}
+    print(f"{'benchmark':<20} {'ops/sec':>14} {'net B/op':>10} "
+          f"{'peak KiB':>10}")
+    for name, benchmark in suite.items():
+        if names and name not in names:
+            continue
+        result = results[name] = measure(benchmark, min_time, repeat)
+        print(f"{name:<20} {result['ops_per_sec']:>14,.0f} "
+              f"{result['net_bytes_per_op']:>10.1f} "
+              f"{result['peak_bytes'] / 1024:>10.1f}")
+    return {'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': results}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Compares results against a saved baseline and reports each
+    benchmark's change in speed
+
+    Args:
+        results: results from run_suite
+        baseline: results loaded from a baseline file
+        tolerance: fraction slower than the baseline a
+        benchmark may be before it counts as a regression
+
+    Returns:
+        list[str]: names of the benchmarks that regressed
+    """
+    regressions = []
+    print(f"\n{'benchmark':<20} {'baseline':>14} {'now':>14} {'change':>8}")
+    for name, result in results['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        ratio = result['ops_per_sec'] / old['ops_per_sec']
+        flag = ''
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<20} {old['ops_per_sec']:>14,.0f} "
+              f"{result['ops_per_sec']:>14,.0f} {ratio - 1:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    """
+    Command line entry point for running the benchmarks
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the engine's hot paths and full games.")
+    parser.add_argument('names', nargs='*',
+                        help='benchmarks to run, all by default')
+    parser.add_argument('--min-time', type=float, default=0.2)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', default=None,
+                        help='write the results to this JSON baseline')
+    parser.add_argument('--compare', default=None,
+                        help='compare against this JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='slowdown allowed before a regression')
+    args = parser.parse_args()
+
+    results = run_suite(args.names, args.min_time, args.repeat)
+    if args.save is not None:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.compare is not None:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+import argparse
+import mmap
+import struct
+from typing import Iterable, Iterator
+
+from a2_support import iter_game_file
+
+# File layout, all little endian:
+#   header      magic, version, encounter count, offset of the monster
+#               type table, offset of the encounter offset table
+#   records     per encounter: monster count, then (type, hp) per monster
+#   type table  type count, then a length prefixed UTF-8 name per type
+#   offsets     one offset per encounter record, plus the end of the records
+MAGIC = b'STSC'
+VERSION = 1
+HEADER = struct.Struct('<4sHxxQQQ')
+COUNT = struct.Struct('<I')
+MONSTER = struct.Struct('<HI')
+NAME_LENGTH = struct.Struct('<H')
+OFFSET = struct.Struct('<Q')
+
+
+def write_campaign(filename: str,
+                   encounters: Iterable[list[tuple[str, int]]]) -> int:
+    """
+    Writes encounters to a binary campaign file. Encounters
+    are written as they are produced, so a streamed game file
+    can be converted without holding it in memory
+
+    Args:
+        filename: path of the campaign file to write
+        encounters: monsters in each encounter, as
+        yielded by iter_game_file
+
+    Returns:
+        int: the number of encounters written
+
+    Example:
+    >>> write_campaign('game1.stsc', iter_game_file('games/game1.txt'))
+    2
+    """
+    type_ids = {}
+    offsets = []
+    with open(filename, 'wb') as file:
+        file.write(bytes(HEADER.size))
+        for monsters in encounters:
+            offsets.append(file.tell())
+            record = bytearray(COUNT.pack(len(monsters)))
+            for monster_type, start_hp in monsters:
+                type_id = type_ids.setdefault(monster_type, len(type_ids))
+                record += MONSTER.pack(type_id, start_hp)
+            file.write(record)
+        offsets.append(file.tell())
+
+        types_offset = file.tell()
+        file.write(COUNT.pack(len(type_ids)))
+        for monster_type in type_ids:
+            name = monster_type.encode('utf-8')
+            file.write(NAME_LENGTH.pack(len(name)) + name)
+
+        index_offset = file.tell()
+        for offset in offsets:
+            file.write(OFFSET.pack(offset))
+
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, VERSION, len(offsets) - 1,
+                               types_offset, index_offset))
+    return len(offsets) - 1
+
+
+def convert_game_file(game_file: str, filename: str) -> int:
+    """
+    Converts a text game file into a binary campaign file
+
+    Args:
+        game_file: path of the text game file to read
+        filename: path of the campaign file to write
+
+    Returns:
+        int: the number of encounters converted
+    """
+    return write_campaign(filename, iter_game_file(game_file))
+
+
+def is_campaign_file(filename: str) -> bool:
+    """
+    Checks whether a file is a binary campaign file
+
+    Args:
+        filename: path of the file to check
+
+    Returns:
+        bool: True if the file starts with the campaign magic
+    """
+    with open(filename, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class Campaign():
+    """
+    Read only view of a binary campaign file. The file is
+    memory mapped and only the header and type table are
+    read up front, so any encounter can be fetched directly
+    by its index without parsing the ones before it
+    """
+    def __init__(self, filename: str) -> None:
+        """
+        Opens a campaign file
+
+        Args:
+            filename (str): path of the campaign file
+
+        Raises:
+            ValueError: if the file is not a campaign file
+            of a supported version, or is cut short
+        """
+        self._file = open(filename, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f'{filename}: not a campaign file')
+
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(f'{filename}: not a campaign file')
+        magic, version, count, types_offset, index_offset = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(
+                f'{filename}: not a version {VERSION} campaign file')
+        self._count = count
+        self._index_offset = index_offset
+
+        # Records are only read on demand, so make sure every offset
+        # they are found through lies inside the file
+        if (types_offset > index_offset
+                or index_offset + (count + 1) * OFFSET.size > len(self._map)):
+            self.close()
+            raise ValueError(f'{filename}: damaged campaign file')
+        self._types = []
+        position = types_offset + COUNT.size
+        try:
+            for _ in range(COUNT.unpack_from(self._map, types_offset)[0]):
+                length = NAME_LENGTH.unpack_from(self._map, position)[0]
+                position += NAME_LENGTH.size
+                if position + length > index_offset:
+                    raise ValueError('type name runs past the type table')
+                self._types.append(bytes(
+                    self._map[position:position + length]).decode('utf-8'))
+                position += length
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError(f'{filename}: damaged campaign file')
+
+    def __len__(self) -> int:
+        """
+        Returns the number of encounters in the campaign
+
+        Returns:
+            int: number of encounters
+        """
+        return self._count
+
+    def __getitem__(self, index: int) -> list[tuple[str, int]]:
+        """
+        Reads a single encounter by its position
+
+        Args:
+            index (int): position of the encounter, negative
+            indices count from the end
+
+        Returns:
+            list[tuple[str, int]]: the monsters in that encounter
+
+        Example:
+        >>> convert_game_file('games/game3.txt', 'game3.stsc')
+        3
+        >>> campaign = Campaign('game3.stsc')
+        >>> campaign[1]
+        [('Cultist', 30), ('Louse', 20), ('Louse', 20)]
+        """
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('campaign index out of range')
+        offset = OFFSET.unpack_from(
+            self._map, self._index_offset + index * OFFSET.size)[0]
+        amount = COUNT.unpack_from(self._map, offset)[0]
+        return [(self._types[type_id], start_hp)
+                for type_id, start_hp in MONSTER.iter_unpack(
+                    self._map[offset + COUNT.size:
+                              offset + COUNT.size + amount * MONSTER.size])]
+
+    def __iter__(self) -> Iterator[list[tuple[str, int]]]:
+        """
+        Yields every encounter in order
+
+        Yields:
+            list[tuple[str, int]]: the monsters in each encounter
+        """
+        return self.encounters(0, self._count)
+
+    def encounters(self, start: int,
+                   stop: int) -> Iterator[list[tuple[str, int]]]:
+        """
+        Yields a slice of the campaign's encounters, so each
+        worker of a distributed run can read only its share
+
+        Args:
+            start (int): index of the first encounter
+            stop (int): index one past the last encounter
+
+        Yields:
+            list[tuple[str, int]]: the monsters in each encounter
+        """
+        for index in range(max(start, 0), min(stop, self._count)):
+            yield self[index]
+
+    def close(self) -> None:
+        """
+        Closes the memory map and the underlying file
+
+        """
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> 'Campaign':
+        """
+        Returns the campaign for use in a with statement
+
+        """
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Closes the campaign at the end of a with statement
+
+        """
+        self.close()
+
+
+def read_encounters(filename: str) -> list[list[tuple[str, int]]]:
+    """
+    Reads every encounter from either a text game file
+    or a binary campaign file
+
+    Args:
+        filename: path of the file to read
+
+    Returns:
+        list[list[tuple[str, int]]]: monsters in each encounter
+    """
+    if is_campaign_file(filename):
+        with Campaign(filename) as campaign:
+            return list(campaign)
+    return list(iter_game_file(filename))
+
+
+def main():
+    """
+    Command line entry point for converting a text game file
+    into a binary campaign file
+    """
+    parser = argparse.ArgumentParser(
+        description='Convert a game file into a binary campaign file.')
+    parser.add_argument('game_file')
+    parser.add_argument('campaign_file')
+    args = parser.parse_args()
+    count = convert_game_file(args.game_file, args.campaign_file)
+    print(f'Wrote {count} encounters to {args.campaign_file}')
+
+if __name__ == '__main__':
+    main()
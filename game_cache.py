@@ -0,0 +1,353 @@
+import hashlib
+import itertools
+import os
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+
+from campaign import NAME_LENGTH, read_encounters
+
+ENTRY_MAGIC = b'STSG'
+ENTRY_VERSION = 1
+ENTRY_SUFFIX = '.entry'
+# magic, version, monster names, encounters, monsters
+ENTRY_HEADER = struct.Struct('<4sHxxIII')
+
+
+class GameFileCache():
+    """
+    Cache of parsed game files. Parsed encounters are kept in
+    memory in a bounded LRU keyed by path, and optionally on
+    disk keyed by the SHA-256 of the file's contents, so a new
+    process can skip parsing any file an earlier one read, even
+    if it has since been touched, copied or moved. Hashing a
+    file takes about a hundredth of the time parsing it does.
+    A file whose modification time changed is re-hashed and only
+    re-parsed if its contents actually changed
+    """
+    def __init__(self, max_entries: int = 32, cache_dir: str | None = None,
+                 max_disk_entries: int = 256) -> None:
+        """
+        Initialises an empty cache
+
+        Args:
+            max_entries (int): files kept in memory at once
+            cache_dir (str | None, optional): directory for the on
+            disk cache, or None to only cache in memory
+            max_disk_entries (int): files kept in the on disk cache
+
+        """
+        self._max_entries = max_entries
+        self._cache_dir = cache_dir
+        self._max_disk_entries = max_disk_entries
+        # path -> (mtime_ns, size, content digest, encounters)
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def load(self, filename: str) -> list[list[tuple[str, int]]]:
+        """
+        Returns the parsed encounters of a game file or binary
+        campaign file, parsing it only if no cache has it. The
+        returned list is shared, so it must not be modified
+
+        Args:
+            filename (str): path of the file to load
+
+        Returns:
+            list[list[tuple[str, int]]]: monsters in each encounter
+
+        Example:
+        >>> cache = GameFileCache()
+        >>> cache.load('games/game4.txt')
+        [[('Louse', 5), ('Louse', 5)], [('Louse', 5)]]
+        """
+        path = os.path.realpath(filename)
+        stat = os.stat(path)
+        entry = self._entries.get(path)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            self._entries.move_to_end(path)
+            self._hits += 1
+            return entry[3]
+
+        digest = file_digest(path)
+        if entry is not None and entry[2] == digest:
+            # Touched but unchanged, so the old parse still holds
+            encounters = entry[3]
+            self._hits += 1
+        else:
+            encounters = self._read_disk(digest)
+            if encounters is not None:
+                self._hits += 1
+            else:
+                encounters = read_encounters(path)
+                self._misses += 1
+                self._write_disk(digest, encounters)
+
+        self._entries[path] = (stat.st_mtime_ns, stat.st_size, digest,
+                               encounters)
+        self._entries.move_to_end(path)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        return encounters
+
+    def get_hits(self) -> int:
+        """
+        Returns how many loads were served without parsing
+
+        Returns:
+            int: cache hits
+        """
+        return self._hits
+
+    def get_misses(self) -> int:
+        """
+        Returns how many loads had to parse the file
+
+        Returns:
+            int: cache misses
+        """
+        return self._misses
+
+    def set_cache_dir(self, cache_dir: str | None) -> None:
+        """
+        Changes the directory of the on disk cache
+
+        Args:
+            cache_dir (str | None): directory for the on disk
+            cache, or None to only cache in memory
+
+        """
+        self._cache_dir = cache_dir
+
+    def clear(self) -> None:
+        """
+        Empties the in memory cache. The on disk cache
+        is left as it is
+
+        """
+        self._entries.clear()
+
+    def _entry_path(self, digest: str) -> str | None:
+        """
+        Returns the path of the on disk entry for a file
+
+        Args:
+            digest: SHA-256 of the file's contents
+
+        Returns:
+            str | None: the entry's path, or None when there
+            is no on disk cache
+        """
+        if self._cache_dir is None:
+            return None
+        return os.path.join(self._cache_dir, digest + ENTRY_SUFFIX)
+
+    def _read_disk(self, digest: str) -> list[list[tuple[str, int]]] | None:
+        """
+        Reads an entry from the on disk cache. An entry that
+        cannot be decoded is deleted and counts as missing
+
+        Args:
+            digest: SHA-256 of the file's contents
+
+        Returns:
+            list[list[tuple[str, int]]] | None: the encounters,
+            or None if there is no usable entry
+        """
+        entry_path = self._entry_path(digest)
+        if entry_path is None:
+            return None
+        try:
+            with open(entry_path, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+        try:
+            encounters = decode_entry(data)
+        except ValueError:
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+            return None
+        try:
+            # Marks the entry as recently used for eviction
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return encounters
+
+    def _write_disk(self, digest: str,
+                    encounters: list[list[tuple[str, int]]]) -> None:
+        """
+        Writes an entry to the on disk cache, evicting the least
+        recently used entries once there are too many. An entry
+        that cannot be written is skipped, so the file is simply
+        parsed again next time
+
+        Args:
+            digest: SHA-256 of the file's contents
+            encounters: the parsed encounters
+
+        """
+        entry_path = self._entry_path(digest)
+        if entry_path is None:
+            return
+        temporary = f'{entry_path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            with open(temporary, 'wb') as file:
+                file.write(encode_entry(encounters))
+            # Replaces atomically so concurrent jobs never see half
+            # an entry
+            os.replace(temporary, entry_path)
+        except OSError:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return
+
+        entries = []
+        for entry in os.scandir(self._cache_dir):
+            if not entry.name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                entries.append((entry.stat().st_mtime_ns, entry.path))
+            except OSError:
+                # Evicted by a concurrent job since it was listed
+                continue
+        if len(entries) > self._max_disk_entries:
+            entries.sort()
+            for _, entry in entries[:len(entries) - self._max_disk_entries]:
+                try:
+                    os.remove(entry)
+                except OSError:
+                    pass
+
+
+def encode_entry(encounters: list[list[tuple[str, int]]]) -> bytes:
+    """
+    Packs parsed encounters into an on disk cache entry. Monster
+    names are stored once in a table, and the encounters as flat
+    arrays of name codes, HPs and encounter sizes, so decoding
+    needs no per-monster parsing
+
+    Args:
+        encounters: monsters in each encounter
+
+    Returns:
+        bytes: the entry
+    """
+    names = {}
+    codes = array('H')
+    hps = array('q')
+    sizes = array('I')
+    for monsters in encounters:
+        sizes.append(len(monsters))
+        for monster_type, start_hp in monsters:
+            codes.append(names.setdefault(monster_type, len(names)))
+            hps.append(start_hp)
+    if sys.byteorder != 'little':
+        for column in (codes, hps, sizes):
+            column.byteswap()
+    parts = [ENTRY_HEADER.pack(ENTRY_MAGIC, ENTRY_VERSION, len(names),
+                               len(sizes), len(codes))]
+    for name in names:
+        encoded = name.encode('utf-8')
+        parts.append(NAME_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    parts.extend([sizes.tobytes(), codes.tobytes(), hps.tobytes()])
+    return b''.join(parts)
+
+
+def decode_entry(data: bytes) -> list[list[tuple[str, int]]]:
+    """
+    Unpacks an on disk cache entry made by encode_entry. Every
+    length and name code is checked, so only an entry holding
+    well formed encounters is returned
+
+    Args:
+        data: the entry
+
+    Returns:
+        list[list[tuple[str, int]]]: monsters in each encounter
+
+    Raises:
+        ValueError: if the entry is damaged or not an entry
+    """
+    try:
+        magic, version, name_count, encounter_count, monster_count = \
+            ENTRY_HEADER.unpack_from(data)
+        if magic != ENTRY_MAGIC or version != ENTRY_VERSION:
+            raise ValueError('not a game file cache entry')
+        offset = ENTRY_HEADER.size
+        names = []
+        for _ in range(name_count):
+            length, = NAME_LENGTH.unpack_from(data, offset)
+            offset += NAME_LENGTH.size
+            names.append(data[offset:offset + length].decode('utf-8'))
+            offset += length
+
+        sizes = array('I')
+        codes = array('H')
+        hps = array('q')
+        for column, count in ((sizes, encounter_count),
+                              (codes, monster_count), (hps, monster_count)):
+            end = offset + count * column.itemsize
+            column.frombytes(data[offset:end])
+            offset = end
+    except (struct.error, UnicodeDecodeError) as error:
+        raise ValueError(f'damaged game file cache entry: {error}') from None
+    if offset != len(data) or len(hps) != monster_count \
+            or sum(sizes) != monster_count \
+            or (codes and max(codes) >= name_count):
+        raise ValueError('damaged game file cache entry')
+    if sys.byteorder != 'little':
+        for column in (codes, hps, sizes):
+            column.byteswap()
+
+    monsters = list(zip([names[code] for code in codes], hps.tolist()))
+    ends = itertools.accumulate(sizes)
+    return [monsters[end - size:end] for size, end in zip(sizes, ends)]
+
+
+def file_digest(path: str) -> str:
+    """
+    Returns the SHA-256 of a file's contents
+
+    Args:
+        path: path of the file
+
+    Returns:
+        str: hex digest of the contents
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_default_cache = GameFileCache()
+
+
+def load_game_file(filename: str,
+                   cache_dir: str | None = None) -> list[list[tuple[str, int]]]:
+    """
+    Loads a game file or binary campaign file through the
+    process wide cache
+
+    Args:
+        filename: path of the file to load
+        cache_dir: directory for the on disk cache, or None
+        to keep the cache's current setting
+
+    Returns:
+        list[list[tuple[str, int]]]: monsters in each encounter
+    """
+    if cache_dir is not None:
+        _default_cache.set_cache_dir(cache_dir)
+    return _default_cache.load(filename)
@@ -0,0 +1,359 @@
+import math
+import random
+import time
+from collections import OrderedDict
+
+from a2 import *
+
+
+class _Node():
+    """
+    Search statistics for one encounter state
+    """
+    __slots__ = ('depth', 'visits', 'actions')
+
+    def __init__(self, depth: int) -> None:
+        """
+        Initialises an unvisited node
+
+        Args:
+            depth (int): moves from the root where it was found
+
+        """
+        self.depth = depth
+        self.visits = 0
+        # action -> [visits, total value]
+        self.actions = {}
+
+
+class TranspositionTable():
+    """
+    Bounded table of search nodes keyed by Encounter.get_hash,
+    so states reached by different move orders share their
+    statistics. When full, the least recently used entries are
+    candidates for eviction and the deepest of them is evicted,
+    keeping the nodes near the root that searches reuse most
+    """
+    def __init__(self, max_entries: int = 100000, candidates: int = 4) -> None:
+        """
+        Initialises an empty table
+
+        Args:
+            max_entries (int): nodes kept at once
+            candidates (int): least recently used nodes
+            considered for each eviction
+
+        """
+        self._max_entries = max_entries
+        self._candidates = candidates
+        self._entries = OrderedDict()
+
+    def get(self, key: int) -> _Node | None:
+        """
+        Finds the node for a state, marking it recently used
+
+        Args:
+            key (int): the state's hash
+
+        Returns:
+            _Node | None: the node, or None if it is not stored
+        """
+        node = self._entries.get(key)
+        if node is not None:
+            self._entries.move_to_end(key)
+        return node
+
+    def add(self, key: int, depth: int) -> _Node:
+        """
+        Stores a new node for a state, evicting one if full
+
+        Args:
+            key (int): the state's hash
+            depth (int): moves from the root
+
+        Returns:
+            _Node: the new node
+        """
+        if len(self._entries) >= self._max_entries:
+            oldest = iter(self._entries.items())
+            candidates = [next(oldest)
+                          for _ in range(min(self._candidates,
+                                             len(self._entries)))]
+            victim = max(candidates, key=lambda entry: entry[1].depth)
+            del self._entries[victim[0]]
+        node = self._entries[key] = _Node(depth)
+        return node
+
+    def clear(self) -> None:
+        """
+        Removes every node
+
+        """
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of stored nodes
+
+        Returns:
+            int: nodes in the table
+        """
+        return len(self._entries)
+
+
+def legal_actions(encounter: Encounter) -> list[tuple[str, int | None] | None]:
+    """
+    Lists the distinct moves available to the player. Cards
+    with the same name are one move, and None ends the turn
+
+    Args:
+        encounter: the encounter being played
+
+    Returns:
+        list: (card_name, target_id) pairs followed by None
+    """
+    player = encounter.get_player()
+    actions = []
+    seen = set()
+    for card in player.get_hand():
+        name = card.get_name()
+        if name in seen or card.get_energy_cost() > player.get_energy():
+            continue
+        seen.add(name)
+        if card.requires_target():
+            for monster in encounter.get_monsters():
+                actions.append((name, monster.get_id()))
+        else:
+            actions.append((name, None))
+    actions.append(None)
+    return actions
+
+
+class MCTSPolicy():
+    """
+    Monte Carlo tree search policy for simulate_game. Each
+    decision searches copies of the encounter with its own
+    random stream, so searching never disturbs the real game.
+    Card draws are chance events: ending the turn samples a
+    new hand, and every resulting state is its own node in
+    the transposition table, so the end turn move's value is
+    averaged over the draws seen. Hashes cover the whole state,
+    so the table carries over from one encounter to the next.
+    A policy is meant for one game at a time, and spawn makes
+    fresh ones
+    """
+    def __init__(self, time_limit: float = 0.035,
+                 iterations: int | None = None,
+                 exploration: float = 0.7, rollout_turns: int = 3,
+                 table_size: int = 100000, seed: int = 0) -> None:
+        """
+        Initialises the policy
+
+        Args:
+            time_limit (float): seconds each decision may take,
+            copying the encounter and choosing the move included
+            iterations (int | None, optional): iterations per move,
+            which replaces the time limit when given
+            exploration (float): UCT exploration constant
+            rollout_turns (int): turns played out before a
+            state is scored heuristically
+            table_size (int): nodes kept in the transposition table
+            seed (int): seed of the search's random stream
+
+        """
+        self._time_limit = time_limit
+        self._iterations = iterations
+        self._exploration = exploration
+        self._rollout_turns = rollout_turns
+        self._table_size = table_size
+        self._table = TranspositionTable(table_size)
+        self._rng = random.Random(seed)
+
+    def spawn(self, seed: int) -> 'MCTSPolicy':
+        """
+        Returns a new policy with the same settings, an empty
+        table and its own random stream
+
+        Args:
+            seed (int): seed of the new policy's random stream
+
+        Returns:
+            MCTSPolicy: the new policy
+
+        Example:
+        >>> policy = MCTSPolicy(iterations=200).spawn(7)
+        >>> len(policy.get_table())
+        0
+        """
+        return MCTSPolicy(self._time_limit, self._iterations,
+                          self._exploration, self._rollout_turns,
+                          self._table_size, seed)
+
+    def __call__(self, encounter: Encounter) -> tuple[str, int | None] | None:
+        """
+        Chooses the player's next move. Searching stops early
+        enough that the slowest iteration so far would still
+        finish within the time limit
+
+        Args:
+            encounter: the encounter being played
+
+        Returns:
+            tuple[str, int | None]: the card name and target to play
+            None: if the player should end their turn
+        """
+        deadline = time.perf_counter() + self._time_limit
+        actions = legal_actions(encounter)
+        if len(actions) == 1:
+            return None
+
+        state = encounter.clone(self._rng)
+        root = state.snapshot(include_rng=False)
+        max_hp = sum(monster.get_max_hp() for monster in state.get_monsters())
+        iteration = 0
+        slowest = 0.0
+        now = time.perf_counter()
+        while True:
+            if self._iterations is not None:
+                if iteration >= self._iterations:
+                    break
+            elif now + slowest >= deadline:
+                break
+            state.restore(root)
+            self._iterate(state, max_hp)
+            iteration += 1
+            started, now = now, time.perf_counter()
+            slowest = max(slowest, now - started)
+
+        node = self._table.get(encounter.get_hash())
+        if node is None or not node.actions:
+            return actions[0]
+        return max(node.actions.items(), key=lambda item: item[1][0])[0]
+
+    def get_table(self) -> TranspositionTable:
+        """
+        Returns the policy's transposition table
+
+        Returns:
+            TranspositionTable: the table shared by every search
+        """
+        return self._table
+
+    def _iterate(self, state: Encounter, max_hp: int) -> None:
+        """
+        Runs one select, expand, roll out and back up pass
+
+        Args:
+            state: a copy of the encounter at the root
+            max_hp: total max HP of the root's monsters
+
+        """
+        path = []
+        depth = 0
+        while True:
+            if not state.is_active() or state.get_player().is_defeated():
+                value = self._score(state, max_hp)
+                break
+            key = state.get_hash()
+            node = self._table.get(key)
+            if node is None:
+                self._table.add(key, depth)
+                value = self._rollout(state, max_hp)
+                break
+            action = self._select(node, legal_actions(state))
+            path.append((node, action))
+            _apply(state, action)
+            depth += 1
+
+        for node, action in path:
+            node.visits += 1
+            stats = node.actions.setdefault(action, [0, 0.0])
+            stats[0] += 1
+            stats[1] += value
+
+    def _select(self, node: _Node, actions: list) -> tuple | None:
+        """
+        Picks a move by UCT, trying unvisited moves first
+
+        Args:
+            node: statistics of the current state
+            actions: moves available in the current state
+
+        Returns:
+            the chosen move
+        """
+        best = None
+        best_score = -1.0
+        log_visits = math.log(node.visits + 1)
+        for action in actions:
+            stats = node.actions.get(action)
+            if stats is None:
+                return action
+            score = stats[1] / stats[0] + self._exploration * math.sqrt(
+                log_visits / stats[0])
+            if score > best_score:
+                best, best_score = action, score
+        return best
+
+    def _rollout(self, state: Encounter, max_hp: int) -> float:
+        """
+        Plays random affordable cards for a few turns and
+        scores the state reached
+
+        Args:
+            state: the state to play out
+            max_hp: total max HP of the root's monsters
+
+        Returns:
+            float: the state's value between 0 and 1
+        """
+        rng = self._rng
+        turns = 0
+        while state.is_active() and not state.get_player().is_defeated():
+            actions = legal_actions(state)
+            if len(actions) == 1:
+                if turns == self._rollout_turns:
+                    break
+                turns += 1
+                _apply(state, None)
+            else:
+                _apply(state, actions[rng.randrange(len(actions) - 1)])
+        return self._score(state, max_hp)
+
+    def _score(self, state: Encounter, max_hp: int) -> float:
+        """
+        Scores a state: 0 if the player is defeated, above 0.5
+        if the encounter is won, and otherwise a blend of the
+        player's HP and the damage dealt to the monsters
+
+        Args:
+            state: the state to score
+            max_hp: total max HP of the root's monsters
+
+        Returns:
+            float: the state's value between 0 and 1
+        """
+        player = state.get_player()
+        if player.is_defeated():
+            return 0.0
+        health = player.get_hp() / player.get_max_hp()
+        if not state.is_active():
+            return 0.5 + 0.5 * health
+        remaining = sum(monster.get_hp() for monster in state.get_monsters())
+        return 0.25 * health + 0.25 * (1 - remaining / max(max_hp, 1))
+
+
+def _apply(state: Encounter, action: tuple[str, int | None] | None) -> None:
+    """
+    Plays a move, with None ending the turn
+
+    Args:
+        state: the encounter to play the move in
+        action: the move to play
+
+    """
+    if action is None:
+        state.end_player_turn()
+        state.enemy_turn()
+    else:
+        state.player_apply_card(*action)
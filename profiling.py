@@ -0,0 +1,219 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+
+# Functions marking an engine phase, by qualified name. A sample
+# belongs to the phase of the innermost of these on its stack, so
+# the draw at the end of the enemy turn counts as drawing
+PHASE_FUNCTIONS = {
+    'Encounter.player_apply_card': 'card_play',
+    'Encounter.enemy_turn': 'enemy_turn',
+    'draw_cards': 'draw',
+    'first_playable_policy': 'policy',
+    'MCTSPolicy.__call__': 'policy',
+    'iter_game_file': 'parse',
+    'display_encounter': 'render',
+    'BufferedRenderer.render': 'render',
+    'DiffRenderer.render': 'render',
+}
+# Phases owning everything beneath them, so cards a policy plays
+# out while searching count as policy time
+ENCLOSING_PHASES = {'policy', 'render'}
+OTHER_PHASE = 'other'
+
+
+class SamplingProfiler():
+    """
+    Low rate sampling profiler. A background thread looks at one
+    thread's stack at a fixed interval and counts each distinct
+    stack, so the profiled code runs at full speed between samples.
+    Every stack is filed under the engine phase it was in
+    """
+    def __init__(self, interval: float = 0.01,
+                 thread_id: int | None = None) -> None:
+        """
+        Initialises a profiler that is not yet sampling
+
+        Args:
+            interval (float): seconds between samples
+            thread_id (int | None, optional): thread to sample,
+            defaulting to the thread that calls start
+
+        """
+        self._interval = interval
+        self._thread_id = thread_id
+        self._samples = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Starts sampling in a background thread
+
+        """
+        if self._thread_id == None:
+            self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops sampling and waits for the background thread
+
+        """
+        self._stop.set()
+        if self._thread != None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'SamplingProfiler':
+        """
+        Starts sampling at the start of a with statement
+
+        """
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """
+        Stops sampling at the end of a with statement
+
+        """
+        self.stop()
+
+    def get_samples(self) -> dict[tuple[str, ...], int]:
+        """
+        Returns the samples taken so far
+
+        Returns:
+            dict: stack, outermost frame first and led by its
+            phase, -> number of samples
+        """
+        return dict(self._samples)
+
+    def get_phase_totals(self) -> dict[str, int]:
+        """
+        Returns the number of samples taken in each phase
+
+        Returns:
+            dict[str, int]: phase -> samples
+        """
+        totals = {}
+        for stack, count in self._samples.items():
+            # Stacks are rooted at their phase's name in brackets
+            phase = stack[0][1:-1]
+            totals[phase] = totals.get(phase, 0) + count
+        return totals
+
+    def write_collapsed(self, filename: str) -> None:
+        """
+        Writes the samples in collapsed stack format, one line of
+        semicolon separated frames and a count per stack, as read
+        by flamegraph tools. Each stack's root is its phase
+
+        Args:
+            filename (str): path of the file to write
+
+        """
+        with open(filename, 'w') as file:
+            for stack, count in sorted(self._samples.items()):
+                file.write(f"{';'.join(stack)} {count}\n")
+
+    def _run(self) -> None:
+        """
+        Takes samples until stopped
+
+        """
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame == None:
+                continue
+            stack = []
+            phase = None
+            while frame != None:
+                code = frame.f_code
+                name = getattr(code, 'co_qualname', code.co_name)
+                found = PHASE_FUNCTIONS.get(name)
+                if found != None and (phase == None
+                                      or found in ENCLOSING_PHASES):
+                    phase = found
+                stack.append(f'{name} '
+                             f'({os.path.basename(code.co_filename)})')
+                frame = frame.f_back
+            stack.append(f'[{phase or OTHER_PHASE}]')
+            stack.reverse()
+            key = tuple(stack)
+            self._samples[key] = self._samples.get(key, 0) + 1
+
+
+def profile_call(output_prefix: str, function, *args,
+                 interval: float = 0.01, tracing: bool = False, **kwargs):
+    """
+    Calls a function under one of two profilers. By default the
+    sampling profiler runs, writing its samples to
+    output_prefix.collapsed and printing the share of samples per
+    phase to stderr. With tracing, cProfile runs instead, writing
+    its stats to output_prefix.pstats and printing the slowest
+    functions to stderr. They never run together, since cProfile
+    slows every call and would skew where the samples land
+
+    Args:
+        output_prefix: path the output files start with
+        function: the function to profile
+        args: positional arguments for the function
+        interval: seconds between samples
+        tracing: whether to trace every call with cProfile
+        instead of sampling
+        kwargs: keyword arguments for the function
+
+    Returns:
+        whatever the function returns
+
+    Example:
+    >>> profile_call('total', sum, range(10))
+    45
+    """
+    if tracing:
+        return _trace_call(output_prefix, function, args, kwargs)
+    sampler = SamplingProfiler(interval)
+    sampler.start()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        sampler.stop()
+        sampler.write_collapsed(f'{output_prefix}.collapsed')
+        totals = sampler.get_phase_totals()
+        samples = sum(totals.values())
+        print(f'\n{samples} samples written to {output_prefix}.collapsed',
+              file=sys.stderr)
+        for phase, count in sorted(totals.items(), key=lambda item: -item[1]):
+            print(f'  {phase:<12} {count / samples:>7.1%}', file=sys.stderr)
+
+
+def _trace_call(output_prefix: str, function, args: tuple, kwargs: dict):
+    """
+    Calls a function under cProfile for profile_call
+
+    Args:
+        output_prefix: path the output file starts with
+        function: the function to profile
+        args: positional arguments for the function
+        kwargs: keyword arguments for the function
+
+    Returns:
+        whatever the function returns
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return function(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f'{output_prefix}.pstats')
+        print(f'\ncProfile stats written to {output_prefix}.pstats',
+              file=sys.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats(
+            'cumulative').print_stats(15)
@@ -0,0 +1,200 @@
+import sys
+
+from a2 import *
+
+CLEAR_SCREEN = '\x1b[H\x1b[2J'
+CLEAR_LINE = '\x1b[K'
+CLEAR_BELOW = '\x1b[J'
+ENTER_ALTERNATE_SCREEN = '\x1b[?1049h'
+LEAVE_ALTERNATE_SCREEN = '\x1b[?1049l'
+
+
+class NullRenderer():
+    """
+    Renderer for headless play, which draws nothing
+    """
+    def render(self, encounter: Encounter) -> None:
+        """
+        Ignores the encounter
+
+        Args:
+            encounter: the encounter that would be drawn
+
+        """
+
+    def reset(self) -> None:
+        """
+        Does nothing, as there is nothing drawn to forget
+
+        """
+
+    def close(self) -> None:
+        """
+        Does nothing, as the screen was never touched
+
+        """
+
+
+class BufferedRenderer():
+    """
+    Draws encounters as display_encounter does, but builds each
+    frame in one buffer and writes it with a single call. Each
+    monster's lines are kept and only rebuilt once its HP changes,
+    since nothing else shown for a monster can change
+    """
+    def __init__(self, stream=None) -> None:
+        """
+        Initialises a renderer
+
+        Args:
+            stream (optional): file to write frames to. Defaults to
+            whatever sys.stdout is when a frame is written
+
+        """
+        self._stream = stream
+        # monster ID -> (HP, rendered lines)
+        self._monster_lines = {}
+
+    def render(self, encounter: Encounter) -> None:
+        """
+        Draws the encounter
+
+        Args:
+            encounter: the encounter to draw
+
+        """
+        self._write(self.format(encounter))
+
+    def reset(self) -> None:
+        """
+        Forgets the monsters drawn so far, for example when
+        a new encounter starts
+
+        """
+        self._monster_lines.clear()
+
+    def close(self) -> None:
+        """
+        Does nothing, as frames are written to the normal screen
+        and left there
+
+        """
+
+    def format(self, encounter: Encounter) -> str:
+        """
+        Builds the text of a frame, which is the same as
+        display_encounter's
+
+        Args:
+            encounter: the encounter to draw
+
+        Returns:
+            str: the frame, ending in a newline
+        """
+        parts = ['MONSTERS\n']
+        seen = {}
+        for monster in encounter.get_monsters():
+            monster_id = monster.get_id()
+            cached = self._monster_lines.get(monster_id)
+            if cached is None or cached[0] != monster.get_hp():
+                cached = (monster.get_hp(), format_monster(monster))
+            seen[monster_id] = cached
+            parts.append(cached[1])
+        # Only keeps monsters still on screen, so the cache
+        # never outgrows one encounter
+        self._monster_lines = seen
+        parts.append('\n\n\nPLAYER\n')
+        parts.append(format_player(encounter.get_player()))
+        return ''.join(parts)
+
+    def _write(self, text: str) -> None:
+        """
+        Writes text to the stream in one call
+
+        Args:
+            text: the text to write
+
+        """
+        stream = self._stream if self._stream is not None else sys.stdout
+        stream.write(text)
+        stream.flush()
+
+
+class DiffRenderer(BufferedRenderer):
+    """
+    Renderer for a terminal whose screen it owns. Frames are drawn
+    on the terminal's alternate screen, which does not scroll back,
+    at fixed rows from its top. The first frame clears the screen
+    and is drawn in full, and each later frame only rewrites the
+    lines that changed, moving the cursor with ANSI escape codes.
+    Every frame also clears everything below it, where the cursor
+    is left, so prompts and messages printed between frames never
+    build up far enough to scroll the frame off its rows. Text
+    printed between two frames must fit below the frame
+    """
+    def __init__(self, stream=None) -> None:
+        """
+        Initialises a renderer with a blank screen
+
+        Args:
+            stream (optional): terminal to write frames to. Defaults
+            to whatever sys.stdout is when a frame is written
+
+        """
+        super().__init__(stream)
+        self._lines = None
+        self._alternate = False
+
+    def render(self, encounter: Encounter) -> None:
+        """
+        Updates the screen to show the encounter
+
+        Args:
+            encounter: the encounter to draw
+
+        """
+        lines = self.format(encounter).split('\n')[:-1]
+        previous = self._lines
+        self._lines = lines
+        if previous is None:
+            start = '' if self._alternate else ENTER_ALTERNATE_SCREEN
+            self._alternate = True
+            self._write(start + CLEAR_SCREEN + '\n'.join(lines) + '\n')
+            return
+
+        parts = []
+        for row, line in enumerate(lines):
+            if row >= len(previous) or previous[row] != line:
+                parts.append(f'\x1b[{row + 1};1H{line}{CLEAR_LINE}')
+        # Leaves the cursor below the frame, clearing whatever
+        # was printed there since the last frame
+        parts.append(f'\x1b[{len(lines) + 1};1H{CLEAR_BELOW}')
+        self._write(''.join(parts))
+
+    def reset(self) -> None:
+        """
+        Forgets what is on screen, so the next frame is
+        drawn in full
+
+        """
+        super().reset()
+        self._lines = None
+
+    def close(self) -> None:
+        """
+        Returns the terminal to its normal screen, showing
+        what was there before the first frame
+
+        """
+        if self._alternate:
+            self._write(LEAVE_ALTERNATE_SCREEN)
+            self._alternate = False
+        self.reset()
+
+
+# Renderers the command line can choose between, by name
+RENDERERS = {
+    'buffered': BufferedRenderer,
+    'diff': DiffRenderer,
+    'null': NullRenderer,
+}
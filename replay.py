@@ -0,0 +1,484 @@
+"""
+Compact binary replays of headless games. Games are recorded
+through ReplayRecorder, which plays them on a GameSession, so
+simulate_game and anything else driving a GameSession can be
+recorded. Games played with play_move, the interactive game and
+the server, cannot be recorded, since their moves never pass
+through a recorder
+"""
+import argparse
+import random
+import struct
+import sys
+import time
+
+from a2 import *
+from batch import PLAYER_TYPES, POLICIES, policy_for_game
+from game_cache import file_digest, load_game_file
+
+# File layout, all little endian:
+#   header      magic, version, player type, seed, SHA-256 of the game file
+#   result      won, turns, HP, cards played, encounters won, player hash
+#   commands    one byte per command until the end of the file. 0 ends
+#               the turn, otherwise the low bits are the card's code and
+#               TARGETED means the target's position follows as a varint
+# Version 2 hashes the player's max HP along with the rest of its state
+MAGIC = b'STSR'
+VERSION = 2
+HEADER = struct.Struct('<4sBBxxQ32s')
+RESULT = struct.Struct('<BIIIIQ')
+PLAYER_NAMES = tuple(PLAYER_TYPES)
+CARD_NAMES = ('Strike', 'Defend', 'Bash', 'Neutralize', 'Survivor')
+CARD_CODES = {name: code for code, name in enumerate(CARD_NAMES, start=1)}
+END_TURN = 0
+TARGETED = 0x80
+
+
+class Replay():
+    """
+    A recorded game: what is needed to play it again, which is
+    the player type, the seed of its random stream and the game
+    file, followed by the commands that changed the game. Targets
+    are stored as positions in the encounter's monster list, since
+    monster IDs differ between processes. The final state is stored
+    too, so replaying can check the game still ends the same way
+    """
+    def __init__(self, player_type: str, seed: int, digest: bytes,
+                 commands: bytes, result: tuple) -> None:
+        """
+        Initialises a replay
+
+        Args:
+            player_type (str): key of the player in PLAYER_TYPES
+            seed (int): seed of the player's random stream
+            digest (bytes): SHA-256 of the game file
+            commands (bytes): the packed command stream
+            result (tuple): final state from final_state
+
+        """
+        self._player_type = player_type
+        self._seed = seed
+        self._digest = digest
+        self._commands = bytes(commands)
+        self._result = result
+        self._decoded = None
+
+    def get_player_type(self) -> str:
+        """
+        Returns the type of player the game was played as
+
+        Returns:
+            str: key of the player in PLAYER_TYPES
+        """
+        return self._player_type
+
+    def get_seed(self) -> int:
+        """
+        Returns the seed of the player's random stream
+
+        Returns:
+            int: the seed
+        """
+        return self._seed
+
+    def get_digest(self) -> bytes:
+        """
+        Returns the SHA-256 of the game file that was played
+
+        Returns:
+            bytes: the raw digest
+        """
+        return self._digest
+
+    def get_result(self) -> tuple:
+        """
+        Returns the recorded final state
+
+        Returns:
+            tuple: won, turns, HP, cards played, encounters
+            won and the player's hash
+        """
+        return self._result
+
+    def get_commands(self) -> list[tuple[str, int | None] | None]:
+        """
+        Decodes the command stream. The decoded commands are
+        kept, so replaying a replay again skips decoding
+
+        Returns:
+            list: (card_name, target_position) pairs,
+            with None for ending the turn
+
+        Example:
+        >>> replay = record_game('ironclad', 'games/game1.txt',
+        ...                      first_playable_policy, seed=3)
+        >>> replay.get_commands()[:3]
+        [('Strike', 0), ('Defend', None), ('Strike', 0)]
+        """
+        if self._decoded is not None:
+            return self._decoded
+        commands = []
+        data = self._commands
+        position = 0
+        while position < len(data):
+            opcode = data[position]
+            position += 1
+            if opcode == END_TURN:
+                commands.append(None)
+                continue
+            target = None
+            if opcode & TARGETED:
+                target, position = _read_varint(data, position)
+            commands.append((CARD_NAMES[(opcode & ~TARGETED) - 1], target))
+        self._decoded = commands
+        return commands
+
+    def to_bytes(self) -> bytes:
+        """
+        Packs the replay into its binary form
+
+        Returns:
+            bytes: the packed replay
+        """
+        return (HEADER.pack(MAGIC, VERSION,
+                            PLAYER_NAMES.index(self._player_type),
+                            self._seed, self._digest)
+                + RESULT.pack(*self._result) + self._commands)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Replay':
+        """
+        Unpacks a replay from its binary form
+
+        Args:
+            data (bytes): a replay packed by to_bytes
+
+        Returns:
+            Replay: the unpacked replay
+
+        Raises:
+            ValueError: if the data is not a replay of
+            a supported version
+        """
+        if len(data) < HEADER.size + RESULT.size:
+            raise ValueError('not a replay')
+        magic, version, player, seed, digest = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'not a version {VERSION} replay')
+        if player >= len(PLAYER_NAMES):
+            raise ValueError(f'unknown player type {player}')
+        won, *rest = RESULT.unpack_from(data, HEADER.size)
+        return cls(PLAYER_NAMES[player], seed, digest,
+                   data[HEADER.size + RESULT.size:], (bool(won), *rest))
+
+    def save(self, filename: str) -> None:
+        """
+        Writes the replay to a file
+
+        Args:
+            filename (str): path of the file to write
+
+        """
+        with open(filename, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, filename: str) -> 'Replay':
+        """
+        Reads a replay from a file
+
+        Args:
+            filename (str): path of the file to read
+
+        Returns:
+            Replay: the replay in the file
+        """
+        with open(filename, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+class ReplayRecorder():
+    """
+    Records a game as it is played. Moves are made through the
+    recorder, which passes them on to its GameSession and packs
+    the ones that changed the game. Rejected moves are not kept,
+    since they change nothing when replayed
+    """
+    def __init__(self, player_type: str, game_file: str, seed: int) -> None:
+        """
+        Starts recording a new game
+
+        Args:
+            player_type (str): key of the player in PLAYER_TYPES
+            game_file (str): path of the game file to play
+            seed (int): seed of the player's random stream,
+            between 0 and 2 ** 64 - 1
+
+        """
+        self._player_type = player_type
+        self._seed = seed
+        self._digest = bytes.fromhex(file_digest(game_file))
+        self._commands = bytearray()
+        player = PLAYER_TYPES[player_type](random.Random(seed))
+        self._session = GameSession(player, load_game_file(game_file))
+
+    def get_session(self) -> GameSession:
+        """
+        Returns the game being recorded. Moves made on it
+        directly are not recorded
+
+        Returns:
+            GameSession: the game being played
+        """
+        return self._session
+
+    def play_card(self, card_name: str, target_id: int | None = None) -> bool:
+        """
+        Plays a card and records it if it was played
+
+        Args:
+            card_name (str): name of the card to play
+            target_id (int | None, optional): ID of the
+            targeted monster
+
+        Returns:
+            bool: if the card was played
+        """
+        code = CARD_CODES.get(card_name)
+        encounter = self._session.get_encounter()
+        if code is None or encounter is None:
+            return self._session.play_card(card_name, target_id)
+        card = self._session.get_player().get_card(card_name)
+        position = None
+        if (card is not None and card.requires_target()
+                and target_id is not None):
+            for index, monster in enumerate(encounter.get_monsters()):
+                if monster.get_id() == target_id:
+                    position = index
+        if not self._session.play_card(card_name, target_id):
+            return False
+        if position is None:
+            self._commands.append(code)
+        else:
+            self._commands.append(code | TARGETED)
+            _write_varint(self._commands, position)
+        return True
+
+    def end_turn(self) -> bool:
+        """
+        Ends the turn and records it
+
+        Returns:
+            bool: False if the game is already over
+        """
+        if not self._session.end_turn():
+            return False
+        self._commands.append(END_TURN)
+        return True
+
+    def get_replay(self) -> Replay:
+        """
+        Returns the game recorded so far, with its current
+        state as the final state
+
+        Returns:
+            Replay: the recorded game
+        """
+        return Replay(self._player_type, self._seed, self._digest,
+                      self._commands, final_state(self._session))
+
+
+def final_state(session: GameSession) -> tuple:
+    """
+    Summarises the state a game ended in
+
+    Args:
+        session: the game to summarise
+
+    Returns:
+        tuple: won, turns, HP, cards played, encounters
+        won and the player's hash
+    """
+    result = session.get_result()
+    return (result.is_won(), result.get_turns(), result.get_hp(),
+            result.get_cards_played(), result.get_encounters_won(),
+            session.get_player().get_hash())
+
+
+def record_game(player_type: str, game_file: str, policy, seed: int = 0,
+                max_turns: int = 1000) -> Replay:
+    """
+    Records a game played by a policy. As in simulate_game, a
+    rejected move ends the turn
+
+    Args:
+        player_type: key of the player in PLAYER_TYPES
+        game_file: path of the game file to play
+        policy: callable choosing the player's moves
+        seed: seed of the player's random stream
+        max_turns: turns after which the game stops
+
+    Returns:
+        Replay: the recorded game
+
+    Example:
+    >>> replay = record_game('ironclad', 'games/game1.txt',
+    ...                      first_playable_policy, seed=3)
+    >>> verify_replay(replay, read_game_file('games/game1.txt'))
+    True
+    """
+    recorder = ReplayRecorder(player_type, game_file, seed)
+    session = recorder.get_session()
+    while not session.is_over() and session.get_turns() <= max_turns:
+        move = policy(session.get_encounter())
+        if move is not None and recorder.play_card(*move):
+            continue
+        recorder.end_turn()
+    return recorder.get_replay()
+
+
+def replay_game(replay: Replay,
+                encounters: list[list[tuple[str, int]]]) -> GameSession:
+    """
+    Plays a replay's commands again without any output
+
+    Args:
+        replay: the replay to play
+        encounters: monsters in each encounter of the
+        replay's game file
+
+    Returns:
+        GameSession: the game after the last command
+
+    Raises:
+        ValueError: if a command targets a monster that is
+        not there or is played after the game ended
+    """
+    session = GameSession(
+        PLAYER_TYPES[replay.get_player_type()](random.Random(replay.get_seed())),
+        encounters)
+    play_card = session.play_card
+    end_turn = session.end_turn
+    for command in replay.get_commands():
+        if command is None:
+            played = end_turn()
+        else:
+            card_name, position = command
+            target_id = None
+            if position is not None:
+                encounter = session.get_encounter()
+                monsters = encounter.get_monsters() if encounter else ()
+                if position >= len(monsters):
+                    raise ValueError(f'no monster at position {position}')
+                target_id = monsters[position].get_id()
+            played = play_card(card_name, target_id)
+        if not played:
+            raise ValueError(f'replayed command {command} was rejected')
+    return session
+
+
+def verify_replay(replay: Replay,
+                  encounters: list[list[tuple[str, int]]]) -> bool:
+    """
+    Checks that a replay still ends in its recorded state
+
+    Args:
+        replay: the replay to check
+        encounters: monsters in each encounter of the
+        replay's game file
+
+    Returns:
+        bool: True if replaying reaches the recorded final state
+    """
+    try:
+        session = replay_game(replay, encounters)
+    except ValueError:
+        return False
+    return final_state(session) == replay.get_result()
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    """
+    Appends an unsigned integer using 7 bits per byte
+
+    Args:
+        buffer: the buffer to append to
+        value: the integer to write
+
+    """
+    while value >= 0x80:
+        buffer.append(value & 0x7f | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data: bytes, position: int) -> tuple[int, int]:
+    """
+    Reads an unsigned integer written by _write_varint
+
+    Args:
+        data: the bytes to read from
+        position: where the integer starts
+
+    Returns:
+        tuple[int, int]: the integer and the position after it
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def main():
+    """
+    Command line entry point for recording and verifying replays
+    """
+    parser = argparse.ArgumentParser(
+        description='Record games as replays and check replays still hold.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help='record games played by a policy')
+    record.add_argument('game_file')
+    record.add_argument('player', choices=PLAYER_TYPES)
+    record.add_argument('output_prefix')
+    record.add_argument('--games', type=int, default=1)
+    record.add_argument('--policy', choices=POLICIES, default='first')
+    record.add_argument('--seed', type=int, default=0)
+    verify = commands.add_parser('verify', help='check replays of a game file')
+    verify.add_argument('game_file')
+    verify.add_argument('replays', nargs='+')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        for index in range(args.games):
+            seed = args.seed + index
+            replay = record_game(args.player, args.game_file,
+                                 policy_for_game(POLICIES[args.policy], seed),
+                                 seed)
+            replay.save(f'{args.output_prefix}{index}.rpl')
+        print(f'Recorded {args.games} replays')
+        return
+
+    encounters = load_game_file(args.game_file)
+    digest = bytes.fromhex(file_digest(args.game_file))
+    replays = [Replay.load(filename) for filename in args.replays]
+    start = time.perf_counter()
+    failed = []
+    for filename, replay in zip(args.replays, replays):
+        if replay.get_digest() != digest or not verify_replay(replay,
+                                                              encounters):
+            failed.append(filename)
+    elapsed = time.perf_counter() - start
+    print(f'Verified {len(replays) - len(failed)}/{len(replays)} replays '
+          f'({len(replays) / max(elapsed, 1e-9):.0f} per second)')
+    for filename in failed:
+        print(f'Mismatch: {filename}')
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
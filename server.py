@@ -0,0 +1,360 @@
+import argparse
+import asyncio
+import os
+import random
+
+from a2 import *
+from batch import PLAYER_TYPES
+from game_cache import load_game_file
+from render import BufferedRenderer
+
+PLAYER_PROMPT = 'Enter a player type: '
+GAME_FILE_PROMPT = 'Enter a game file: '
+MOVE_PROMPT = 'Enter a move: '
+NEW_ENCOUNTER_MESSAGE = 'New encounter!\n'
+CARDS_POSSIBLE = [Strike(), Bash(), Neutralize(), Survivor(), Defend()]
+
+
+class ConsoleSession():
+    """
+    One player's game, driven by the same lines the interactive
+    game reads with input() and answering with the text it would
+    print. Moves go through the game's own command handlers, which
+    write into the reply rather than to stdout, so the server can
+    run any number of sessions on one event loop
+    """
+    def __init__(self, games_dir: str, rng=None) -> None:
+        """
+        Initialises a session waiting for its player type
+
+        Args:
+            games_dir (str): directory the game files are read from
+            rng (optional): random stream for the player.
+            Defaults to a freshly seeded stream
+
+        """
+        self._games_dir = games_dir
+        self._rng = rng if rng is not None else random.Random()
+        self._player = None
+        self._encounters = None
+        self._encounter = None
+        self._finished = False
+        # Builds frames as display_encounter would print them
+        self._renderer = BufferedRenderer()
+        # Pieces of the reply being built by handle_line
+        self._reply = []
+
+    def start(self) -> str:
+        """
+        Returns the text sent when the session opens
+
+        Returns:
+            str: the first prompt
+        """
+        return PLAYER_PROMPT
+
+    def is_finished(self) -> bool:
+        """
+        Returns whether the game has ended
+
+        Returns:
+            bool: True once the game is won or lost
+        """
+        return self._finished
+
+    def handle_line(self, line: str) -> str:
+        """
+        Handles one line from the player
+
+        Args:
+            line (str): the line, without its line ending
+
+        Returns:
+            str: the text to send back, ending with the next
+            prompt while the game is still going
+
+        Example:
+        >>> session = ConsoleSession('games')
+        >>> session.handle_line('ironclad')
+        'Enter a game file: '
+        """
+        self._reply = []
+        if self._finished:
+            pass
+        elif self._player is None:
+            self._choose_player(line.strip())
+        elif self._encounters is None:
+            self._choose_game(line.strip())
+        else:
+            self._move(line)
+        return ''.join(self._reply)
+
+    def _say(self, text: str) -> None:
+        """
+        Adds a line to the reply, as print would write it
+
+        Args:
+            text: the line's text
+
+        """
+        self._reply.append(text + '\n')
+
+    def _render(self, encounter: Encounter) -> None:
+        """
+        Adds the encounter to the reply, as display_encounter
+        would write it
+
+        Args:
+            encounter: the encounter to draw
+
+        """
+        self._reply.append(self._renderer.format(encounter))
+
+    def _choose_player(self, wanted_player: str) -> None:
+        """
+        Creates the player, or asks again for an unknown type
+
+        Args:
+            wanted_player: the player type entered
+
+        """
+        player_class = PLAYER_TYPES.get(wanted_player)
+        if player_class is None:
+            self._reply.append(PLAYER_PROMPT)
+            return
+        self._player = player_class(self._rng)
+        self._reply.append(GAME_FILE_PROMPT)
+
+    def _choose_game(self, game_file: str) -> None:
+        """
+        Starts the game, or asks again for a file that cannot
+        be read. Only files in the games directory can be
+        played, whatever path is entered
+
+        Args:
+            game_file: the game file entered
+
+        """
+        path = os.path.join(self._games_dir, os.path.basename(game_file))
+        try:
+            encounters = load_game_file(path)
+        except (OSError, ValueError):
+            self._reply.append(GAME_FILE_PROMPT)
+            return
+        self._encounters = iter(encounters)
+        self._next_encounter()
+
+    def _move(self, player_move: str) -> None:
+        """
+        Plays a move with play_move, as execute_encounter does,
+        then moves on to the next encounter or ends the game
+        once this one is over
+
+        Args:
+            player_move: the move entered
+
+        """
+        play_move(self._player, self._encounter, CARDS_POSSIBLE,
+                  player_move, self._render, self._say)
+        if self._player.is_defeated():
+            self._finish()
+        elif not self._encounter.is_active():
+            self._say(ENCOUNTER_WIN_MESSAGE)
+            self._next_encounter()
+        else:
+            self._reply.append(MOVE_PROMPT)
+
+    def _next_encounter(self) -> None:
+        """
+        Announces and displays the next encounter as main does,
+        or ends the game once every encounter is won
+
+        """
+        for monsters in self._encounters:
+            self._say(NEW_ENCOUNTER_MESSAGE)
+            self._encounter = Encounter(self._player, monsters)
+            self._renderer.reset()
+            self._render(self._encounter)
+            if self._encounter.is_active():
+                self._reply.append(MOVE_PROMPT)
+                return
+            self._say(ENCOUNTER_WIN_MESSAGE)
+        self._finish()
+
+    def _finish(self) -> None:
+        """
+        Ends the game, telling the player whether they won
+
+        """
+        self._finished = True
+        self._say(GAME_LOSE_MESSAGE if self._player.is_defeated()
+                  else GAME_WIN_MESSAGE)
+
+
+class GameServer():
+    """
+    Hosts many games at once over a line protocol on a TCP or
+    Unix socket. Every connection is one ConsoleSession handled
+    by a coroutine on a single event loop, so idle players cost
+    only their game state and no thread or process of their own
+    """
+    def __init__(self, games_dir: str = 'games', seed: int | None = None,
+                 max_sessions: int = 10000, idle_timeout: float = 600.0,
+                 backlog: int = 1024) -> None:
+        """
+        Initialises a server that is not yet listening
+
+        Args:
+            games_dir (str): directory the game files are read from
+            seed (int | None, optional): seed from which every
+            session's random stream is spawned, or None for
+            unpredictable games
+            max_sessions (int): connections served at once
+            idle_timeout (float): seconds a player may take to
+            send a line before they are disconnected
+            backlog (int): connections the socket queues before they
+            are accepted, which must cover players arriving at once
+
+        """
+        self._games_dir = games_dir
+        self._seed = seed
+        self._max_sessions = max_sessions
+        self._idle_timeout = idle_timeout
+        self._backlog = backlog
+        self._sessions = 0
+        self._started = 0
+
+    def get_session_count(self) -> int:
+        """
+        Returns the number of connected players
+
+        Returns:
+            int: sessions being served
+        """
+        return self._sessions
+
+    async def serve_tcp(self, host: str, port: int) -> asyncio.Server:
+        """
+        Starts listening on a TCP socket
+
+        Args:
+            host: address to listen on
+            port: port to listen on
+
+        Returns:
+            asyncio.Server: the listening server
+        """
+        return await asyncio.start_server(self.handle, host, port,
+                                          backlog=self._backlog)
+
+    async def serve_unix(self, path: str) -> asyncio.Server:
+        """
+        Starts listening on a Unix socket
+
+        Args:
+            path: path of the socket
+
+        Returns:
+            asyncio.Server: the listening server
+        """
+        return await asyncio.start_unix_server(self.handle, path,
+                                               backlog=self._backlog)
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """
+        Plays one connection's game until it ends or the
+        player disconnects
+
+        Args:
+            reader: the connection's input
+            writer: the connection's output
+
+        """
+        if self._sessions >= self._max_sessions:
+            writer.write(b'Server full, try again later.\n')
+            await self._close(writer)
+            return
+        self._sessions += 1
+        rng = (spawn_rng(self._seed, self._started)
+               if self._seed is not None else None)
+        self._started += 1
+        session = ConsoleSession(self._games_dir, rng)
+        try:
+            writer.write(session.start().encode('utf-8'))
+            await writer.drain()
+            while not session.is_finished():
+                line = await asyncio.wait_for(reader.readline(),
+                                              self._idle_timeout)
+                if not line:
+                    break
+                reply = session.handle_line(
+                    line.decode('utf-8', 'replace').rstrip('\r\n'))
+                writer.write(reply.encode('utf-8'))
+                await writer.drain()
+        except (asyncio.TimeoutError, asyncio.LimitOverrunError,
+                ValueError, ConnectionError):
+            pass
+        finally:
+            self._sessions -= 1
+            await self._close(writer)
+
+    @staticmethod
+    async def _close(writer: asyncio.StreamWriter) -> None:
+        """
+        Closes a connection, ignoring one already dropped
+
+        Args:
+            writer: the connection's output
+
+        """
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def _serve(server: GameServer, args: argparse.Namespace) -> None:
+    """
+    Listens on the socket chosen on the command line until cancelled
+
+    Args:
+        server: the game server
+        args: the parsed command line
+
+    """
+    if args.unix is not None:
+        listener = await server.serve_unix(args.unix)
+    else:
+        listener = await server.serve_tcp(args.host, args.port)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    """
+    Command line entry point for running the game server
+    """
+    parser = argparse.ArgumentParser(
+        description='Host many games at once over a line protocol.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None,
+                        help='path of a Unix socket to listen on instead')
+    parser.add_argument('--games-dir', default='games')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--max-sessions', type=int, default=10000)
+    parser.add_argument('--idle-timeout', type=float, default=600.0)
+    parser.add_argument('--backlog', type=int, default=1024)
+    args = parser.parse_args()
+
+    server = GameServer(args.games_dir, args.seed, args.max_sessions,
+                        args.idle_timeout, args.backlog)
+    try:
+        asyncio.run(_serve(server, args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
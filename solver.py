@@ -0,0 +1,451 @@
+import argparse
+import math
+import random
+from fractions import Fraction
+
+from a2 import *
+from game_cache import load_game_file
+
+PLAYER_TYPES = {'ironclad': IronClad, 'silent': Silent}
+MONSTER_TYPES = {'Louse': Louse, 'Cultist': Cultist, 'JawWorm': JawWorm}
+LOUSE_DAMAGES = (5, 6, 7)
+HAND_SIZE = 5
+
+
+class Solver():
+    """
+    Exact solver for small games. Finds the highest chance of
+    winning a game that any way of playing can achieve, following
+    the rules of simulate_game, by trying every move and averaging
+    over every hand that can be drawn and every damage a louse
+    can spawn with.
+
+    States are memoised under canonical keys so each one is only
+    solved once: card piles are kept as counts per card name, since
+    the order of cards never matters, and monsters are kept sorted
+    by their stats, so identical monsters are interchangeable. Moves
+    are applied to throwaway entities built with from_state, so the
+    solver follows the same rules as the real game. Chances are
+    worked out as fractions, so they are exact however many
+    outcomes are summed.
+
+    Keys still include the turn, the player's stats and every
+    pile, so the number of states grows quickly with max_turns.
+    game4 solves in well under a second with either player, but
+    game1 as the Silent needs about 86000 states for just 3 turns
+    and millions by 8. max_states stops a search that has grown
+    too large rather than letting it run for minutes
+    """
+    def __init__(self, player_class, encounters: list[list[tuple[str, int]]],
+                 max_turns: int = 20, max_states: int = 100000) -> None:
+        """
+        Initialises a solver for one game
+
+        Args:
+            player_class: the Player subclass to play as
+            encounters: monsters in each encounter, as
+            returned by read_game_file
+            max_turns (int): turns after which the game counts
+            as lost, as in simulate_game. Keep this small, since
+            the number of states grows with it
+            max_states (int): states solved before giving up
+
+        """
+        player = player_class(random.Random(0))
+        self._max_hp = player.get_max_hp()
+        self._cards = sorted(set(player.get_deck()), key=Card.get_name)
+        self._deck = self._count(player.get_deck())
+        self._encounters = encounters
+        self._max_turns = max_turns
+        self._max_states = max_states
+        self._memo = {}
+        self._draws = {}
+        self._spawns = {}
+
+    def win_probability(self) -> float:
+        """
+        Solves the game from the start
+
+        Returns:
+            float: the chance of winning with perfect play
+
+        Raises:
+            ValueError: if solving needs more than max_states
+            states
+
+        Example:
+        >>> solver = Solver(Silent, read_game_file('games/game4.txt'))
+        >>> solver.win_probability()
+        1.0
+        """
+        return float(self.exact_win_probability())
+
+    def exact_win_probability(self) -> Fraction:
+        """
+        Solves the game from the start, keeping the chance of
+        winning as an exact fraction
+
+        Returns:
+            Fraction: the chance of winning with perfect play
+
+        Raises:
+            ValueError: if solving needs more than max_states
+            states
+        """
+        if not self._encounters:
+            return Fraction(1)
+        empty = (0,) * len(self._cards)
+        stats = (self._max_hp, 0, 0, 0, 0)
+        return self._start_encounter(0, 1, stats, self._deck, empty)
+
+    def get_state_count(self) -> int:
+        """
+        Returns how many distinct states have been solved
+
+        Returns:
+            int: entries in the memo
+        """
+        return len(self._memo)
+
+    def _count(self, cards: list[Card]) -> tuple[int, ...]:
+        """
+        Converts a pile of cards into counts per card name
+
+        Args:
+            cards: the pile to count
+
+        Returns:
+            tuple[int, ...]: how many of each card the pile holds
+        """
+        counts = [0] * len(self._cards)
+        for card in cards:
+            counts[self._cards.index(card)] += 1
+        return tuple(counts)
+
+    def _start_encounter(self, index: int, turns: int, stats: tuple,
+                         deck: tuple, discard: tuple) -> Fraction:
+        """
+        Solves the start of an encounter, averaging over the
+        damage of every louse and the first hand drawn
+
+        Args:
+            index: position of the encounter in the game
+            turns: turns counted so far, including this one
+            stats: the player's stats from get_state
+            deck: counts of the cards in the deck
+            discard: counts of the cards in the discard pile
+
+        Returns:
+            Fraction: the chance of winning from here
+        """
+        # The discard pile is shuffled back in, as in
+        # Player.start_new_encounter
+        deck = tuple(map(sum, zip(deck, discard)))
+        discard = (0,) * len(deck)
+        player = Entity.from_state(self._max_hp, stats)
+        player.new_turn()
+        stats = player.get_state()
+
+        value = Fraction(0)
+        for spawn_chance, monsters in self._spawn(index):
+            for chance, next_deck, hand, next_discard in self._draw(deck,
+                                                                    discard):
+                if not monsters:
+                    # Nothing Encounter knows spawned, so it is
+                    # won as soon as it starts
+                    value += spawn_chance * chance * self._win_encounter(
+                        index, turns, stats, next_deck, hand, next_discard)
+                    continue
+                value += spawn_chance * chance * self._solve(
+                    index, turns, stats, 3, next_deck, hand, next_discard,
+                    monsters)
+        return value
+
+    def _spawn(self, index: int) -> list[tuple[Fraction, tuple]]:
+        """
+        Lists the ways an encounter's monsters can spawn. Only a
+        louse's damage is random, so each louse has one outcome
+        per damage it can deal
+
+        Args:
+            index: position of the encounter in the game
+
+        Returns:
+            list[tuple[Fraction, tuple]]: the chance of each set of
+            monsters, with monsters as sorted (type, max HP, stats)
+        """
+        outcomes = self._spawns.get(index)
+        if outcomes is not None:
+            return outcomes
+        outcomes = {(): Fraction(1)}
+        for monster_type, start_hp in self._encounters[index]:
+            if monster_type not in MONSTER_TYPES:
+                # Encounter skips monsters it does not know
+                continue
+            stats = (start_hp, 0, 0, 0, 0)
+            if monster_type == 'Louse':
+                choices = [stats + (damage,) for damage in LOUSE_DAMAGES]
+            elif monster_type == 'Cultist':
+                choices = [stats + (0, 0)]
+            else:
+                choices = [stats + (0,)]
+            spawned = {}
+            for monsters, chance in outcomes.items():
+                for state in choices:
+                    key = tuple(sorted(monsters
+                                       + ((monster_type, start_hp, state),)))
+                    spawned[key] = (spawned.get(key, 0)
+                                    + chance / len(choices))
+            outcomes = spawned
+        outcomes = [(chance, monsters)
+                    for monsters, chance in outcomes.items()]
+        self._spawns[index] = outcomes
+        return outcomes
+
+    def _draw(self, deck: tuple, discard: tuple) -> list[tuple]:
+        """
+        Lists every hand draw_cards can deal, as card counts,
+        with its chance. Hands holding the same cards are one
+        outcome, however they were drawn
+
+        Args:
+            deck: counts of the cards in the deck
+            discard: counts of the cards in the discard pile
+
+        Returns:
+            list[tuple]: (chance, deck, hand, discard) per outcome
+        """
+        key = (deck, discard)
+        outcomes = self._draws.get(key)
+        if outcomes is not None:
+            return outcomes
+
+        kept = (0,) * len(deck)
+        if sum(deck) < HAND_SIZE:
+            # The rest of the deck is kept and the discard
+            # pile becomes the new deck
+            kept, deck, discard = deck, discard, (0,) * len(deck)
+        amount = min(HAND_SIZE - sum(kept), sum(deck))
+        total = math.comb(sum(deck), amount)
+
+        outcomes = []
+        def choose(position: int, left: int, drawn: list[int],
+                   ways: int) -> None:
+            if position == len(deck):
+                if left == 0:
+                    outcomes.append((
+                        Fraction(ways, total),
+                        tuple(count - taken
+                              for count, taken in zip(deck, drawn)),
+                        tuple(map(sum, zip(kept, drawn))),
+                        discard))
+                return
+            for taken in range(min(left, deck[position]) + 1):
+                drawn.append(taken)
+                choose(position + 1, left - taken, drawn,
+                       ways * math.comb(deck[position], taken))
+                drawn.pop()
+        choose(0, amount, [], 1)
+        self._draws[key] = outcomes
+        return outcomes
+
+    def _solve(self, index: int, turns: int, stats: tuple, energy: int,
+               deck: tuple, hand: tuple, discard: tuple,
+               monsters: tuple) -> Fraction:
+        """
+        Solves a state where the player is choosing a move,
+        taking the best of playing each distinct card at each
+        distinct monster and ending the turn
+
+        Args:
+            index: position of the encounter in the game
+            turns: turns counted so far
+            stats: the player's stats from get_state
+            energy: the player's energy
+            deck: counts of the cards in the deck
+            hand: counts of the cards in the hand
+            discard: counts of the cards in the discard pile
+            monsters: sorted (type, max HP, stats) of living monsters
+
+        Returns:
+            Fraction: the chance of winning from here
+        """
+        if turns > self._max_turns:
+            return Fraction(0)
+        key = (index, turns, stats, energy, deck, hand, discard, monsters)
+        value = self._memo.get(key)
+        if value is not None:
+            return value
+        if len(self._memo) >= self._max_states:
+            raise ValueError(f'more than {self._max_states} states to solve, '
+                             f'try fewer turns')
+
+        value = Fraction(0)
+        for position, count in enumerate(hand):
+            if value == 1:
+                break
+            card = self._cards[position]
+            if count == 0 or card.get_energy_cost() > energy:
+                continue
+            next_hand = hand[:position] + (count - 1,) + hand[position + 1:]
+            next_discard = (discard[:position] + (discard[position] + 1,)
+                            + discard[position + 1:])
+            if card.requires_target():
+                targets = [target for target in range(len(monsters))
+                           if target == 0
+                           or monsters[target] != monsters[target - 1]]
+            else:
+                targets = [None]
+            for target in targets:
+                value = max(value, self._play(
+                    index, turns, stats, energy - card.get_energy_cost(),
+                    deck, next_hand, next_discard, monsters, card, target))
+        if value < 1:
+            value = max(value, self._end_turn(index, turns, stats, deck,
+                                              hand, discard, monsters))
+        self._memo[key] = value
+        return value
+
+    def _play(self, index: int, turns: int, stats: tuple, energy: int,
+              deck: tuple, hand: tuple, discard: tuple, monsters: tuple,
+              card: Card, target: int | None) -> Fraction:
+        """
+        Solves the state after a card is played, applying its
+        effects in the same order as Encounter.player_apply_card
+
+        Args:
+            index: position of the encounter in the game
+            turns: turns counted so far
+            stats: the player's stats before the card
+            energy: the player's energy after paying for the card
+            deck: counts of the cards in the deck
+            hand: counts of the hand without the card
+            discard: counts of the discard pile with the card
+            monsters: sorted (type, max HP, stats) of living monsters
+            card: the card being played
+            target: position of the targeted monster, if any
+
+        Returns:
+            Fraction: the chance of winning from here
+        """
+        player = Entity.from_state(self._max_hp, stats)
+        player.add_block(card.get_block())
+        modifiers = card.get_status_modifiers()
+        player.add_strength(modifiers.get('strength', 0))
+        stats = player.get_state()
+        if target is None:
+            return self._solve(index, turns, stats, energy, deck, hand,
+                               discard, monsters)
+
+        monster_type, max_hp, state = monsters[target]
+        monster = MONSTER_TYPES[monster_type].from_state(max_hp, state)
+        monster.add_weak(modifiers.get('weak', 0))
+        monster.add_vulnerable(modifiers.get('vulnerable', 0))
+        monster.reduce_hp(card.get_damage_amount())
+        rest = monsters[:target] + monsters[target + 1:]
+        if monster.is_defeated():
+            if not rest:
+                return self._win_encounter(index, turns, stats,
+                                           deck, hand, discard)
+            return self._solve(index, turns, stats, energy, deck, hand,
+                               discard, rest)
+        monsters = tuple(sorted(
+            rest + ((monster_type, max_hp, monster.get_state()),)))
+        return self._solve(index, turns, stats, energy, deck, hand,
+                           discard, monsters)
+
+    def _win_encounter(self, index: int, turns: int, stats: tuple,
+                       deck: tuple, hand: tuple, discard: tuple) -> Fraction:
+        """
+        Solves the moment an encounter is won, moving on to
+        the next one as simulate_game does
+
+        Args:
+            index: position of the encounter just won
+            turns: turns counted so far
+            stats: the player's stats
+            deck: counts of the cards in the deck
+            hand: counts of the cards left in the hand
+            discard: counts of the cards in the discard pile
+
+        Returns:
+            Fraction: the chance of winning from here
+        """
+        if index + 1 == len(self._encounters):
+            return Fraction(1)
+        discard = tuple(map(sum, zip(discard, hand)))
+        return self._start_encounter(index + 1, turns + 1, stats,
+                                     deck, discard)
+
+    def _end_turn(self, index: int, turns: int, stats: tuple, deck: tuple,
+                  hand: tuple, discard: tuple, monsters: tuple) -> Fraction:
+        """
+        Solves ending the turn: the monsters act, then the
+        result is averaged over every hand that can be drawn
+
+        Args:
+            index: position of the encounter in the game
+            turns: turns counted so far
+            stats: the player's stats
+            deck: counts of the cards in the deck
+            hand: counts of the cards in the hand
+            discard: counts of the cards in the discard pile
+            monsters: sorted (type, max HP, stats) of living monsters
+
+        Returns:
+            Fraction: the chance of winning from here
+        """
+        discard = tuple(map(sum, zip(discard, hand)))
+        player = Entity.from_state(self._max_hp, stats)
+        acted = []
+        # The monsters' effects on the player add up, so acting
+        # in sorted order gives the same result as spawn order
+        for monster_type, max_hp, state in monsters:
+            monster = MONSTER_TYPES[monster_type].from_state(max_hp, state)
+            monster.new_turn()
+            moves = monster.action()
+            player.add_weak(moves.get('weak', 0))
+            damage = moves.get('damage', 0)
+            if monster.get_strength() > 0:
+                damage += monster.get_strength()
+            player.reduce_hp(damage)
+            acted.append((monster_type, max_hp, monster.get_state()))
+        if player.is_defeated():
+            return Fraction(0)
+
+        player.new_turn()
+        stats = player.get_state()
+        monsters = tuple(sorted(acted))
+        value = Fraction(0)
+        for chance, next_deck, next_hand, next_discard in self._draw(deck,
+                                                                     discard):
+            value += chance * self._solve(index, turns + 1, stats, 3,
+                                          next_deck, next_hand, next_discard,
+                                          monsters)
+        return value
+
+
+def main():
+    """
+    Command line entry point for solving a game exactly
+    """
+    parser = argparse.ArgumentParser(
+        description='Find the best possible chance of winning a game.')
+    parser.add_argument('game_file')
+    parser.add_argument('player', choices=PLAYER_TYPES)
+    parser.add_argument('--max-turns', type=int, default=20)
+    parser.add_argument('--max-states', type=int, default=100000)
+    args = parser.parse_args()
+
+    solver = Solver(PLAYER_TYPES[args.player],
+                    load_game_file(args.game_file), args.max_turns,
+                    args.max_states)
+    try:
+        probability = solver.win_probability()
+    except ValueError as error:
+        parser.error(str(error))
+    print(f'Win probability: {probability:.6f} '
+          f'States: {solver.get_state_count()}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules live at the top of the repository rather than in a package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+GAMES_DIR = os.path.join(ROOT, 'games')
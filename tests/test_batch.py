@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from batch import *
+from conftest import GAMES_DIR
+
+GAME_FILE = os.path.join(GAMES_DIR, 'game1.txt')
+
+
+def totals(batch):
+    return (batch.get_games(), batch.get_wins(), batch.get_mean_turns(),
+            batch.get_mean_hp(), batch.get_cards_played(),
+            batch.get_encounters_won(), batch.get_failed_plays())
+
+
+@pytest.mark.parametrize('player_class', [IronClad, Silent])
+def test_pool_plays_the_same_games_as_one_process(player_class):
+    alone = run_batch(GAME_FILE, player_class, first_playable_policy, 60,
+                      seed=4, workers=0, chunk_size=60)
+    pooled = run_batch(GAME_FILE, player_class, first_playable_policy, 60,
+                       seed=4, workers=2, chunk_size=7)
+    assert totals(pooled) == totals(alone)
+    assert alone.get_games() == 60
+
+
+def test_seed_changes_the_games():
+    first = run_batch(GAME_FILE, Silent, first_playable_policy, 40,
+                      seed=1, workers=0)
+    second = run_batch(GAME_FILE, Silent, first_playable_policy, 40,
+                       seed=2, workers=0)
+    assert totals(first) != totals(second)
+
+
+def test_merged_stats_count_every_game():
+    batch = run_batch(GAME_FILE, IronClad, first_playable_policy, 20,
+                      workers=2, chunk_size=6, stats=True)
+    assert (batch.get_stats().get_count('cards_played')
+            == batch.get_cards_played())
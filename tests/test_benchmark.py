@@ -0,0 +1,54 @@
+import json
+import sys
+
+import pytest
+
+from benchmark import *
+
+FAST = ['reduce_hp', 'select_cards']
+
+
+def run_main(monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['benchmark.py', *FAST,
+                                      '--min-time', '0.001', '--repeat', '1',
+                                      *argv])
+    main()
+
+
+def baseline_file(path, ops_per_sec):
+    results = {name: {'ops_per_sec': ops_per_sec, 'net_bytes_per_op': 0,
+                      'peak_bytes': 0} for name in FAST}
+    path.write_text(json.dumps({'results': results}))
+    return str(path)
+
+
+def test_saved_results_hold_every_benchmark_run(tmp_path, monkeypatch):
+    saved = tmp_path / 'results.json'
+    run_main(monkeypatch, '--save', str(saved))
+    results = json.loads(saved.read_text())
+    assert set(results) == {'python', 'machine', 'results'}
+    assert set(results['results']) == set(FAST)
+    for result in results['results'].values():
+        assert result['ops_per_sec'] > 0
+        assert result['peak_bytes'] >= 0
+
+
+def test_compare_fails_only_on_a_regression(tmp_path, monkeypatch, capsys):
+    run_main(monkeypatch, '--compare', baseline_file(tmp_path / 'slow.json',
+                                                     1))
+    assert 'REGRESSION' not in capsys.readouterr().out
+    with pytest.raises(SystemExit) as exit:
+        run_main(monkeypatch, '--compare',
+                 baseline_file(tmp_path / 'fast.json', 1e15))
+    assert exit.value.code == 1
+    assert capsys.readouterr().out.count('REGRESSION') == len(FAST)
+
+
+def test_compare_applies_the_tolerance(capsys):
+    results = {'results': {'a': {'ops_per_sec': 91}, 'b': {'ops_per_sec': 89},
+                           'new': {'ops_per_sec': 1}}}
+    baseline = {'results': {'a': {'ops_per_sec': 100},
+                            'b': {'ops_per_sec': 100}}}
+    # Benchmarks missing from the baseline are skipped
+    assert compare(results, baseline, 0.1) == ['b']
+    assert compare(results, baseline, 0.2) == []
@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from a2_support import read_game_file
+from campaign import *
+from conftest import GAMES_DIR
+
+GAME_FILES = ['game1.txt', 'game2.txt', 'game3.txt', 'game4.txt']
+
+
+def write(tmp_path, name, encounters):
+    filename = str(tmp_path / name)
+    write_campaign(filename, encounters)
+    return filename
+
+
+@pytest.mark.parametrize('game', GAME_FILES)
+def test_campaign_round_trip(tmp_path, game):
+    game_file = os.path.join(GAMES_DIR, game)
+    filename = str(tmp_path / 'game.stsc')
+    expected = read_game_file(game_file)
+    assert convert_game_file(game_file, filename) == len(expected)
+    assert is_campaign_file(filename)
+    assert not is_campaign_file(game_file)
+    with Campaign(filename) as campaign:
+        assert len(campaign) == len(expected)
+        assert list(campaign) == expected
+        # Any encounter can be read without the ones before it
+        for index in reversed(range(len(expected))):
+            assert campaign[index] == expected[index]
+            assert campaign[index - len(expected)] == expected[index]
+    assert read_encounters(filename) == expected
+    assert read_encounters(game_file) == expected
+
+
+def test_encounters_reads_a_clamped_slice(tmp_path):
+    encounters = [[('Louse', index + 1)] for index in range(10)]
+    with Campaign(write(tmp_path, 'slice.stsc', encounters)) as campaign:
+        assert list(campaign.encounters(3, 6)) == encounters[3:6]
+        assert list(campaign.encounters(-5, 100)) == encounters
+        with pytest.raises(IndexError):
+            campaign[10]
+        with pytest.raises(IndexError):
+            campaign[-11]
+
+
+def test_empty_campaign(tmp_path):
+    with Campaign(write(tmp_path, 'empty.stsc', [])) as campaign:
+        assert len(campaign) == 0
+        assert list(campaign) == []
+
+
+@pytest.mark.parametrize('contents', [b'', b'STSC', b'XXXX' + bytes(40)])
+def test_files_that_are_not_campaigns_are_rejected(tmp_path, contents):
+    filename = tmp_path / 'bad.stsc'
+    filename.write_bytes(contents)
+    with pytest.raises(ValueError):
+        Campaign(str(filename))
+
+
+@pytest.mark.parametrize('cut', [1, 8, 30])
+def test_cut_short_campaign_is_rejected(tmp_path, cut):
+    filename = write(tmp_path, 'game.stsc',
+                     read_game_file(os.path.join(GAMES_DIR, 'game3.txt')))
+    with open(filename, 'rb') as file:
+        data = file.read()
+    with open(filename, 'wb') as file:
+        file.write(data[:-cut])
+    with pytest.raises(ValueError):
+        Campaign(filename)
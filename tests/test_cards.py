@@ -0,0 +1,36 @@
+import pytest
+
+from a2 import *
+
+CARD_TYPES = [Card, Strike, Defend, Bash, Neutralize, Survivor]
+
+
+@pytest.mark.parametrize('card_type', CARD_TYPES)
+def test_every_card_is_one_shared_instance(card_type):
+    assert card_type() is card_type()
+    deck = IronClad().get_deck() + Silent().get_deck()
+    for card in deck:
+        assert card is type(card)()
+
+
+@pytest.mark.parametrize('card_type', CARD_TYPES)
+def test_shared_cards_cannot_be_changed(card_type):
+    card = card_type()
+    before = dict(card.get_status_modifiers())
+    with pytest.raises(TypeError):
+        card.get_status_modifiers()['weak'] = 99
+    with pytest.raises(AttributeError):
+        card._damage = 99
+    with pytest.raises(AttributeError):
+        card.note = 'changed'
+    assert card.get_status_modifiers() == before
+    assert card_type() is card
+
+
+def test_entities_have_no_instance_dict():
+    player = IronClad()
+    louse = Louse(10)
+    for entity in (player, louse):
+        assert not hasattr(entity, '__dict__')
+        with pytest.raises(AttributeError):
+            entity.note = 'changed'
@@ -0,0 +1,64 @@
+import itertools
+import random
+from collections import Counter
+
+import pytest
+
+from a2_support import *
+
+
+@pytest.mark.parametrize('deck_size', range(13))
+def test_undraw_puts_every_pile_back(deck_size):
+    rng = random.Random(deck_size)
+    for discard_size in range(8):
+        if deck_size + discard_size < 5:
+            continue
+        deck = list(range(deck_size))
+        discarded = list(range(100, 100 + discard_size))
+        hand = []
+        before = (deck[:], discarded[:])
+        state = rng.getstate()
+
+        carried = deck_size if deck_size < 5 else 0
+        draw_cards(deck, hand, discarded, rng)
+        undraw_cards(deck, hand, discarded, carried, deck_size < 5, rng,
+                     state)
+        assert (deck, discarded) == before
+        assert hand == []
+        assert rng.getstate() == state
+
+
+class ScriptedRandom():
+    """Returns set answers from randrange, in order"""
+    def __init__(self, picks):
+        self._picks = iter(picks)
+
+    def randrange(self, stop):
+        pick = next(self._picks)
+        assert 0 <= pick < stop
+        return pick
+
+
+@pytest.mark.parametrize('size, amount', [(5, 5), (6, 3), (8, 2), (7, 0)])
+def test_every_ordered_selection_is_equally_likely(size, amount):
+    # Tries every answer randrange could give, so each ordered pick of
+    # amount cards must come up exactly once
+    answers = itertools.product(*[range(size - i) for i in range(amount)])
+    seen = Counter()
+    for picks in answers:
+        cards = list(range(size))
+        selected = select_cards(cards, amount, ScriptedRandom(picks))
+        assert sorted(selected + cards) == list(range(size))
+        seen[tuple(selected)] += 1
+    assert set(seen.values()) == {1}
+    assert len(seen) == len(list(itertools.permutations(range(size), amount)))
+
+
+def test_short_deck_is_drawn_before_the_discard_pile():
+    deck = [1, 2]
+    discarded = [10, 11, 12, 13]
+    hand = ['old']
+    draw_cards(deck, hand, discarded, random.Random(0))
+    assert hand[:2] == [1, 2]
+    assert sorted(hand[2:] + deck) == [10, 11, 12, 13]
+    assert len(hand) == 5 and discarded == []
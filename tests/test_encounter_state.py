@@ -0,0 +1,171 @@
+import random
+
+import pytest
+
+from a2 import *
+
+MONSTERS = [('Louse', 20), ('Cultist', 30), ('JawWorm', 25)]
+
+
+def play_randomly(encounter, rng, steps):
+    """Plays random cards and turns, yielding before every action"""
+    player = encounter.get_player()
+    for _ in range(steps):
+        if not encounter.is_active() or player.is_defeated():
+            return
+        hand = player.get_hand()
+        monsters = encounter.get_monsters()
+        if hand and rng.random() < 0.7:
+            card = rng.choice(hand).get_name()
+            target = rng.choice(monsters).get_id()
+            yield
+            encounter.player_apply_card(card, target)
+        else:
+            yield
+            encounter.end_player_turn()
+            yield
+            encounter.enemy_turn()
+
+
+def full_state(encounter):
+    return (encounter.snapshot(), encounter.get_monsters()[:])
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('hashing', [False, True])
+def test_undo_steps_back_through_every_action(seed, hashing):
+    player = (IronClad, Silent)[seed % 2](random.Random(seed))
+    encounter = Encounter(player, MONSTERS)
+    encounter.set_undo(True)
+    start = full_state(encounter)
+    history = []
+    for _ in play_randomly(encounter, random.Random(-seed), 120):
+        history.append((full_state(encounter),
+                        encounter.get_hash() if hashing else None))
+
+    while encounter.undo():
+        state, hash_value = history.pop()
+        # Failed plays leave nothing to undo
+        while full_state(encounter) != state:
+            state, hash_value = history.pop()
+        if hashing:
+            assert encounter.get_hash() == hash_value
+            assert encounter.clone().get_hash() == hash_value
+    assert full_state(encounter) == start
+
+
+def test_undo_puts_back_a_reshuffled_draw():
+    player = Silent(random.Random(3))
+    encounter = Encounter(player, [('JawWorm', 1000)])
+    encounter.set_undo(True)
+    # Twelve cards leave two in the deck after the second
+    # draw, so the third carries them into the hand and
+    # reshuffles the discard pile
+    encounter.end_player_turn()
+    encounter.enemy_turn()
+    assert len(player.get_deck()) == 2
+    encounter.end_player_turn()
+    saved = encounter.snapshot()
+    encounter.enemy_turn()
+    assert player.get_discarded() == []
+    assert encounter.undo()
+    assert encounter.snapshot() == saved
+
+
+def test_failed_play_records_nothing():
+    player = IronClad(random.Random(0))
+    encounter = Encounter(player, MONSTERS)
+    encounter.set_undo(True)
+    assert not encounter.player_apply_card('Strike')
+    assert not encounter.undo()
+
+
+def test_player_from_state_plays_like_the_original():
+    original = Silent(random.Random(4))
+    original.new_turn()
+    original.play_card('Strike')
+    player = Silent.from_state(original.get_max_hp(), original.get_state(),
+                               random.Random(9))
+    assert player.get_state() == original.get_state()
+    assert player.get_hash() == original.get_hash()
+    assert player.get_card('Defend') is original.get_card('Defend')
+    player.end_turn()
+    player.new_turn()
+    assert len(player.get_hand()) == 5
+    assert repr(player) == 'Silent()'
+
+
+def recomputed_hash(encounter, labels):
+    """Hashes the encounter again from fresh entities built from its state"""
+    player = encounter.get_player()
+    value = type(player).from_state(player.get_max_hp(),
+                                    player.get_state()).get_hash()
+    for monster in encounter.get_monsters():
+        fresh = type(monster).from_state(monster.get_max_hp(),
+                                         monster.get_state())
+        fresh.set_hash_label(labels[monster.get_id()])
+        value ^= fresh.get_hash()
+    # A snapshot's third field is whose turn it is
+    if encounter.snapshot(include_rng=False)[2]:
+        value ^= PLAYER_TURN_KEY
+    return value
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_kept_hash_survives_restore_clone_and_undo(seed):
+    player = (IronClad, Silent)[seed % 2](random.Random(seed))
+    encounter = Encounter(player, MONSTERS)
+    labels = {monster.get_id(): f'{monster.get_name()}:{position}'
+              for position, monster in enumerate(encounter.get_monsters())}
+    encounter.set_undo(True)
+    # The first call starts keeping the hashes up to date
+    encounter.get_hash()
+    rng = random.Random(-seed)
+    snapshots = [encounter.snapshot()]
+    for _ in play_randomly(encounter, rng, 150):
+        assert encounter.get_hash() == recomputed_hash(encounter, labels)
+        choice = rng.random()
+        if choice < 0.15:
+            snapshots.append(encounter.snapshot())
+        elif choice < 0.3:
+            encounter.restore(rng.choice(snapshots))
+        elif choice < 0.45:
+            encounter.undo()
+        elif choice < 0.55:
+            twin = encounter.clone()
+            assert twin.get_hash() == encounter.get_hash()
+        assert encounter.get_hash() == recomputed_hash(encounter, labels)
+
+
+def test_restore_puts_back_statuses_and_monster_counters():
+    player = Silent(random.Random(5))
+    encounter = Encounter(player, MONSTERS)
+    monsters = encounter.get_monsters()
+    louse, cultist, jaw_worm = monsters
+    cultist.action()
+    saved = encounter.snapshot()
+    states = [monster.get_state() for monster in monsters]
+    player_state = player.get_state()
+    draw = player.get_rng().random()
+
+    # The snapshot shares these objects, so every field set_state
+    # misses would show up here
+    for entity in (player, *monsters):
+        entity.add_strength(2)
+        entity.add_weak(3)
+        entity.add_vulnerable(1)
+        entity.add_block(4)
+        entity.reduce_hp(6)
+    for _ in range(3):
+        for monster in monsters:
+            monster.action()
+    encounter.player_apply_card('Neutralize', cultist.get_id())
+    encounter.end_player_turn()
+    encounter.enemy_turn()
+
+    encounter.restore(saved)
+    assert encounter.get_monsters() == monsters
+    assert [monster.get_state() for monster in monsters] == states
+    assert cultist.action() == {'damage': 7, 'weak': 1}
+    assert player.get_state() == player_state
+    assert player.get_rng().random() == draw
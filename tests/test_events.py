@@ -0,0 +1,92 @@
+import os
+import random
+
+import pytest
+
+from a2 import *
+from conftest import GAMES_DIR
+
+
+def five_strikes():
+    return Player(30, [Strike(), Strike(), Strike(), Strike(), Strike()])
+
+
+def test_encounter_sends_every_event():
+    sent = []
+    subscribers = {event: [lambda *args, event=event: sent.append(
+                       (event, args))]
+                   for event in Encounter.EVENTS}
+    encounters = read_game_file(os.path.join(GAMES_DIR, 'game1.txt'))
+    result = simulate_game(IronClad(random.Random(0)), encounters,
+                           first_playable_policy, subscribers=subscribers)
+    assert result.is_won()
+    assert {event for event, _ in sent} == set(Encounter.EVENTS)
+    won = [args for event, args in sent if event == 'encounter_won']
+    assert len(won) == result.get_encounters_won()
+    # Damage taken is HP lost after block, so it adds up to the HP
+    # the player ends the game without
+    taken = sum(args[2] for event, args in sent if event == 'damage_taken')
+    assert taken == IronClad().get_max_hp() - result.get_hp()
+
+
+def test_unsubscribe_stops_the_callback():
+    encounter = Encounter(five_strikes(), [('JawWorm', 100)])
+    played = []
+
+    def callback(encounter, card, target):
+        played.append(card)
+    encounter.subscribe('card_played', callback)
+    target = encounter.get_monsters()[0].get_id()
+    encounter.player_apply_card('Strike', target)
+    encounter.unsubscribe('card_played', callback)
+    encounter.player_apply_card('Strike', target)
+    assert played == [Strike()]
+    # Unsubscribing twice, or something never subscribed, is harmless
+    encounter.unsubscribe('card_played', callback)
+    encounter.unsubscribe('turn_ended', print)
+
+
+def test_last_unsubscribe_empties_the_table():
+    events = add_subscriber(None, Player.EVENTS, 'card_played', print)
+    events = add_subscriber(events, Player.EVENTS, 'turn_ended', print)
+    events = remove_subscriber(events, 'card_played', print)
+    assert events == {'turn_ended': (print,)}
+    assert remove_subscriber(events, 'turn_ended', print) == None
+
+
+def test_unknown_event_is_rejected():
+    with pytest.raises(ValueError):
+        five_strikes().subscribe('card_discarded', print)
+    with pytest.raises(ValueError):
+        Encounter(five_strikes(), [('Louse', 5)]).subscribe('monster_spawned',
+                                                          print)
+
+
+def test_subscribing_while_an_event_is_sent():
+    player = five_strikes()
+    calls = []
+
+    def late(player, card):
+        calls.append('late')
+
+    def first(player, card):
+        calls.append('first')
+        player.unsubscribe('card_played', first)
+        player.subscribe('card_played', late)
+    player.subscribe('card_played', first)
+    player.new_turn()
+    player.play_card('Strike')
+    player.play_card('Strike')
+    # The table being sent is never changed under it
+    assert calls == ['first', 'late']
+
+
+def test_clone_has_no_subscribers():
+    encounter = Encounter(five_strikes(), [('JawWorm', 100)])
+    played = []
+    encounter.subscribe('card_played', lambda *args: played.append(args))
+    encounter.get_player().subscribe('card_played',
+                                     lambda *args: played.append(args))
+    twin = encounter.clone()
+    twin.player_apply_card('Strike', twin.get_monsters()[0].get_id())
+    assert played == []
@@ -0,0 +1,142 @@
+import os
+
+import pytest
+
+from a2_support import read_game_file
+from conftest import GAMES_DIR
+from game_cache import *
+
+GAME_FILE = os.path.join(GAMES_DIR, 'game2.txt')
+
+
+def unknown_name_code(data):
+    """Points the first monster at a name that is not in the table"""
+    monsters = ENTRY_HEADER.unpack_from(data)[4]
+    codes = len(data) - monsters * 8 - monsters * 2
+    return data[:codes] + b'\xff\xff' + data[codes + 2:]
+
+
+def entry_paths(cache_dir):
+    return [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+            if name.endswith(ENTRY_SUFFIX)]
+
+
+def test_entry_round_trip():
+    encounters = read_game_file(GAME_FILE)
+    assert decode_entry(encode_entry(encounters)) == encounters
+    assert decode_entry(encode_entry([])) == []
+
+
+def test_new_process_reads_disk_instead_of_parsing(tmp_path):
+    expected = read_game_file(GAME_FILE)
+    first = GameFileCache(cache_dir=str(tmp_path))
+    assert first.load(GAME_FILE) == expected
+    assert (first.get_hits(), first.get_misses()) == (0, 1)
+
+    second = GameFileCache(cache_dir=str(tmp_path))
+    assert second.load(GAME_FILE) == expected
+    assert (second.get_hits(), second.get_misses()) == (1, 0)
+
+
+def test_touched_file_is_not_parsed_again(tmp_path):
+    game_file = tmp_path / 'game.txt'
+    game_file.write_bytes(open(GAME_FILE, 'rb').read())
+    cache_dir = str(tmp_path / 'cache')
+    GameFileCache(cache_dir=cache_dir).load(str(game_file))
+    os.utime(game_file, ns=(1, 1))
+
+    cache = GameFileCache(cache_dir=cache_dir)
+    cache.load(str(game_file))
+    assert (cache.get_hits(), cache.get_misses()) == (1, 0)
+
+
+def test_changed_file_is_parsed_again(tmp_path):
+    game_file = tmp_path / 'game.txt'
+    game_file.write_text('Encounter 1\nLouse 5\n')
+    cache = GameFileCache(cache_dir=str(tmp_path / 'cache'))
+    assert cache.load(str(game_file)) == [[('Louse', 5)]]
+    game_file.write_text('Encounter 1\nJawWorm 40\n')
+    os.utime(game_file, ns=(2, 2))
+    assert cache.load(str(game_file)) == [[('JawWorm', 40)]]
+    assert cache.get_misses() == 2
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: b'',
+    lambda data: b'[1, 2]',
+    lambda data: b'{"encounters": []}',
+    lambda data: data[:-3],
+    lambda data: data + b'\0',
+    lambda data: b'XXXX' + data[4:],
+    unknown_name_code,
+])
+def test_damaged_entry_is_a_miss_and_is_replaced(tmp_path, damage):
+    cache_dir = str(tmp_path)
+    GameFileCache(cache_dir=cache_dir).load(GAME_FILE)
+    entry_path, = entry_paths(cache_dir)
+    with open(entry_path, 'rb') as file:
+        data = file.read()
+    with open(entry_path, 'wb') as file:
+        file.write(damage(data))
+
+    cache = GameFileCache(cache_dir=cache_dir)
+    assert cache.load(GAME_FILE) == read_game_file(GAME_FILE)
+    assert cache.get_misses() == 1
+    with open(entry_path, 'rb') as file:
+        assert file.read() == data
+
+
+def test_damaged_entry_raises_value_error():
+    data = encode_entry(read_game_file(GAME_FILE))
+    for damaged in (data[:10], data[:-1], b'STSG' + b'\0' * 40):
+        with pytest.raises(ValueError):
+            decode_entry(damaged)
+
+
+def test_disk_cache_is_bounded(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    cache = GameFileCache(cache_dir=cache_dir, max_disk_entries=2)
+    for index in range(4):
+        game_file = tmp_path / f'game{index}.txt'
+        game_file.write_text(f'Encounter 1\nLouse {index + 1}\n')
+        cache.load(str(game_file))
+    assert len(entry_paths(cache_dir)) == 2
+
+
+def test_eviction_skips_entries_removed_meanwhile(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    cache = GameFileCache(cache_dir=cache_dir, max_disk_entries=1)
+    first = tmp_path / 'first.txt'
+    first.write_text('Encounter 1\nLouse 1\n')
+    cache.load(str(first))
+
+    # Another job evicts every entry between the listing and the stat
+    scandir = os.scandir
+
+    def racing_scandir(path):
+        entries = list(scandir(path))
+        for entry in entries:
+            os.remove(entry.path)
+        return entries
+    monkeypatch.setattr(os, 'scandir', racing_scandir)
+    second = tmp_path / 'second.txt'
+    second.write_text('Encounter 1\nLouse 2\n')
+    assert cache.load(str(second)) == [[('Louse', 2)]]
+
+
+def test_unwritable_cache_is_a_miss(tmp_path, monkeypatch):
+    # A file where the directory should be, so nothing can be written
+    # there even by a user that ignores permissions
+    cache_dir = tmp_path / 'cache'
+    cache_dir.write_text('')
+    cache = GameFileCache(cache_dir=str(cache_dir))
+    assert cache.load(GAME_FILE) == read_game_file(GAME_FILE)
+    assert cache.get_misses() == 1
+
+    # A failed replace leaves no temporary file behind
+    def failing_replace(source, destination):
+        raise OSError('disk full')
+    monkeypatch.setattr(os, 'replace', failing_replace)
+    cache = GameFileCache(cache_dir=str(tmp_path / 'full'))
+    assert cache.load(GAME_FILE) == read_game_file(GAME_FILE)
+    assert os.listdir(tmp_path / 'full') == []
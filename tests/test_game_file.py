@@ -0,0 +1,20 @@
+import pytest
+
+from a2_support import *
+
+
+def test_game_file_is_read_by_encounter(tmp_path):
+    game_file = tmp_path / 'game.txt'
+    game_file.write_text('Encounter 1\nLouse 5\n\nJawWorm 40\n'
+                         'Encounter 2\nCultist 10\n')
+    assert read_game_file(str(game_file)) == [
+        [('Louse', 5), ('JawWorm', 40)], [('Cultist', 10)]]
+
+
+@pytest.mark.parametrize('line', ['Louse 5 6', 'Louse', 'Louse x',
+                                  'Louse -5', 'Louse 5.0', 'Louse ²'])
+def test_bad_monster_line_names_its_line(tmp_path, line):
+    game_file = tmp_path / 'game.txt'
+    game_file.write_text(f'Encounter 1\nLouse 5\n{line}\n', encoding='utf-8')
+    with pytest.raises(ValueError, match=f'{game_file}:3: expected'):
+        read_game_file(str(game_file))
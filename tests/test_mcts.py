@@ -0,0 +1,53 @@
+import os
+import random
+import time
+
+from a2 import *
+from batch import run_batch
+from conftest import GAMES_DIR
+from mcts import MCTSPolicy
+
+
+def test_batch_does_not_depend_on_chunking():
+    game_file = os.path.join(GAMES_DIR, 'game1.txt')
+    policy = MCTSPolicy(iterations=30)
+    results = [str(run_batch(game_file, IronClad, policy, 4, seed=5,
+                             workers=0, chunk_size=chunk_size))
+               for chunk_size in (1, 4)]
+    assert results[0] == results[1]
+
+
+def test_table_tells_apart_encounters_differing_in_max_hp():
+    # A jaw worm's moves depend on its max HP, so the same HP and
+    # statuses under another max HP are another state
+    smaller = Encounter(IronClad(random.Random(0)), [('JawWorm', 40)])
+    larger = Encounter(IronClad(random.Random(0)), [('JawWorm', 60)])
+    larger.get_monsters()[0].reduce_hp(20)
+    assert [monster.get_state() for monster in larger.get_monsters()] == [
+        monster.get_state() for monster in smaller.get_monsters()]
+    assert larger.get_hash() != smaller.get_hash()
+
+    # The table carries over, so old nodes stay alongside new ones
+    policy = MCTSPolicy(iterations=20)
+    policy(smaller)
+    searched = len(policy.get_table())
+    assert policy.get_table().get(larger.get_hash()) == None
+    policy(larger)
+    assert policy.get_table().get(smaller.get_hash()) != None
+    assert len(policy.get_table()) > searched
+
+
+def test_decisions_stay_within_50ms():
+    encounters = read_game_file(os.path.join(GAMES_DIR, 'game3.txt'))
+    policy = MCTSPolicy(seed=1)
+    times = []
+
+    def timed(encounter):
+        start = time.perf_counter()
+        move = policy(encounter)
+        times.append(time.perf_counter() - start)
+        return move
+    simulate_game(IronClad(random.Random(1)), encounters, timed,
+                  max_turns=10)
+    assert times
+    assert max(times) < 0.05
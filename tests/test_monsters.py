@@ -0,0 +1,70 @@
+from a2 import *
+
+MONSTERS = [('Louse', 3), ('JawWorm', 40), ('Louse', 20), ('Cultist', 50),
+            ('Louse', 5)]
+
+
+def make_encounter():
+    player = Player(30, [Strike(), Strike(), Strike(), Strike(), Strike()])
+    return Encounter(player, MONSTERS)
+
+
+def test_monsters_are_targeted_by_id_until_defeated():
+    encounter = make_encounter()
+    louse, jaw_worm = encounter.get_monsters()[:2]
+    for monster in encounter.get_monsters():
+        assert encounter.get_monster(monster.get_id()) is monster
+    assert encounter.get_monster(-1) == None
+    assert not encounter.player_apply_card('Strike', -1)
+
+    assert encounter.player_apply_card('Strike', jaw_worm.get_id())
+    assert jaw_worm.get_hp() == 34
+    assert encounter.player_apply_card('Strike', louse.get_id())
+    assert encounter.get_monster(louse.get_id()) == None
+    hand = len(encounter.get_player().get_hand())
+    assert not encounter.player_apply_card('Strike', louse.get_id())
+    # A failed play keeps the card
+    assert len(encounter.get_player().get_hand()) == hand
+
+
+def test_defeated_monsters_are_swept_keeping_order():
+    encounter = make_encounter()
+    monsters = encounter.get_monsters()
+    before = list(monsters)
+    louse, jaw_worm, big_louse, cultist, last = before
+    defeated = []
+    encounter.subscribe('monster_defeated',
+                        lambda encounter, monster: defeated.append(monster))
+    encounter.set_undo(True)
+
+    # Monsters already at 0 HP are swept with the one a card kills
+    jaw_worm.reduce_hp(40)
+    cultist.reduce_hp(50)
+    assert encounter.player_apply_card('Strike', last.get_id())
+
+    assert encounter.get_monsters() == [louse, big_louse]
+    # Lists handed out earlier see the sweep too
+    assert monsters == [louse, big_louse]
+    assert defeated == [jaw_worm, cultist, last]
+    for monster in (jaw_worm, cultist, last):
+        assert encounter.get_monster(monster.get_id()) == None
+        assert not encounter.player_apply_card('Strike', monster.get_id())
+    assert encounter.get_monster(big_louse.get_id()) is big_louse
+
+    assert encounter.undo()
+    assert encounter.get_monsters() == before
+    for monster in before:
+        assert encounter.get_monster(monster.get_id()) is monster
+
+
+def test_sweeping_every_monster_wins_the_encounter():
+    encounter = make_encounter()
+    first, *rest = encounter.get_monsters()
+    for monster in rest:
+        monster.reduce_hp(monster.get_hp())
+    won = []
+    encounter.subscribe('encounter_won', won.append)
+    assert encounter.player_apply_card('Strike', first.get_id())
+    assert encounter.get_monsters() == []
+    assert not encounter.is_active()
+    assert won == [encounter]
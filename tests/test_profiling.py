@@ -0,0 +1,69 @@
+import os
+import random
+import time
+
+from a2 import *
+from conftest import GAMES_DIR
+from mcts import MCTSPolicy
+from profiling import *
+
+
+def draw_for(seconds):
+    """Deals hands until the time is up, so samples land in draw_cards"""
+    deck = [Strike() for _ in range(10)]
+    hand = []
+    discarded = []
+    rng = random.Random(0)
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        discarded.extend(hand)
+        hand.clear()
+        draw_cards(deck, hand, discarded, rng)
+    return len(hand)
+
+
+def test_samples_are_filed_under_their_phase(tmp_path):
+    with SamplingProfiler(interval=0.001) as sampler:
+        draw_for(0.3)
+    totals = sampler.get_phase_totals()
+    assert totals.get('draw', 0) > sum(totals.values()) / 2
+    for stack in sampler.get_samples():
+        assert stack[0] in {f'[{phase}]' for phase in
+                            [*PHASE_FUNCTIONS.values(), OTHER_PHASE]}
+
+    filename = str(tmp_path / 'draw.collapsed')
+    sampler.write_collapsed(filename)
+    with open(filename) as file:
+        lines = file.read().splitlines()
+    assert len(lines) == len(sampler.get_samples())
+    stack, count = lines[0].rsplit(' ', 1)
+    assert tuple(stack.split(';')) in sampler.get_samples()
+    assert int(count) > 0
+
+
+def test_policy_owns_the_cards_it_plays_out():
+    encounters = read_game_file(os.path.join(GAMES_DIR, 'game1.txt'))
+    with SamplingProfiler(interval=0.001) as sampler:
+        simulate_game(IronClad(random.Random(0)), encounters,
+                      MCTSPolicy(iterations=40), max_turns=3)
+    searching = [stack for stack in sampler.get_samples()
+                 if any(frame.startswith('MCTSPolicy.__call__ ')
+                        for frame in stack)]
+    assert searching
+    assert {stack[0] for stack in searching} == {'[policy]'}
+
+
+def test_profile_call_samples_by_default(tmp_path, capsys):
+    prefix = str(tmp_path / 'run')
+    assert profile_call(prefix, draw_for, 0.05, interval=0.001) == 5
+    assert os.path.exists(f'{prefix}.collapsed')
+    assert not os.path.exists(f'{prefix}.pstats')
+    assert 'draw' in capsys.readouterr().err
+
+
+def test_profile_call_traces_without_sampling(tmp_path, capsys):
+    prefix = str(tmp_path / 'run')
+    assert profile_call(prefix, draw_for, 0.05, tracing=True) == 5
+    assert os.path.exists(f'{prefix}.pstats')
+    assert not os.path.exists(f'{prefix}.collapsed')
+    assert 'draw_cards' in capsys.readouterr().err
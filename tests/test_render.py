@@ -0,0 +1,78 @@
+import io
+import os
+import random
+
+from a2 import *
+from conftest import GAMES_DIR
+from render import *
+
+
+def make_encounter():
+    player = IronClad(random.Random(0))
+    return Encounter(player, [('Louse', 20), ('JawWorm', 30)])
+
+
+def test_buffered_frame_matches_display_encounter():
+    encounter = make_encounter()
+    assert BufferedRenderer().format(encounter) == format_encounter(encounter)
+
+
+def test_diff_frames_stay_on_the_alternate_screen():
+    encounter = make_encounter()
+    stream = io.StringIO()
+    renderer = DiffRenderer(stream)
+    renderer.render(encounter)
+    first = stream.getvalue()
+    assert first.startswith(ENTER_ALTERNATE_SCREEN + CLEAR_SCREEN)
+    rows = format_encounter(encounter).count('\n')
+
+    # Text printed between frames is cleared by the next frame,
+    # even one where nothing changed
+    stream.write('Enter a move: ')
+    renderer.render(encounter)
+    assert stream.getvalue().endswith(f'\x1b[{rows + 1};1H{CLEAR_BELOW}')
+
+    monster = encounter.get_monsters()[0]
+    encounter.player_apply_card('Strike', monster.get_id())
+    start = len(stream.getvalue())
+    renderer.render(encounter)
+    update = stream.getvalue()[start:]
+    assert f'{format_monster(monster).splitlines()[2]}{CLEAR_LINE}' in update
+    assert CLEAR_SCREEN not in update
+
+    renderer.close()
+    assert stream.getvalue().endswith(LEAVE_ALTERNATE_SCREEN)
+
+
+def play_script(tmp_path, *options):
+    path = tmp_path / 'script.txt'
+    path.write_text(f'ironclad\n{os.path.join(GAMES_DIR, "game1.txt")}\n'
+                    'play Strike 0\nend turn\n')
+    cli(['--script', str(path), *options])
+
+
+def test_command_line_renderers(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(Monster, '_id_counter', 0)
+    random.seed(1)
+    play_script(tmp_path)
+    buffered = capsys.readouterr().out
+    assert buffered.count('MONSTERS\n') == 3
+
+    Monster._id_counter = 0
+    random.seed(1)
+    main(display_encounter, io.StringIO(
+        f'ironclad\n{os.path.join(GAMES_DIR, "game1.txt")}\n'
+        'play Strike 0\nend turn\n'))
+    assert capsys.readouterr().out == buffered
+
+    for options in (['--renderer', 'null'], ['--quiet']):
+        play_script(tmp_path, *options)
+        printed = capsys.readouterr().out
+        assert 'New encounter!' in printed
+        assert 'MONSTERS' not in printed
+
+    play_script(tmp_path, '--renderer', 'diff')
+    printed = capsys.readouterr().out
+    assert printed.startswith('New encounter!')
+    assert ENTER_ALTERNATE_SCREEN in printed
+    assert printed.endswith(LEAVE_ALTERNATE_SCREEN)
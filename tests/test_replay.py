@@ -0,0 +1,43 @@
+import os
+import random
+import sys
+
+import pytest
+
+import replay
+from a2 import *
+from conftest import GAMES_DIR
+
+
+def run_main(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['replay.py', *args])
+    replay.main()
+
+
+def test_verify_exits_with_failure_on_mismatch(tmp_path, monkeypatch,
+                                               capsys):
+    game1 = os.path.join(GAMES_DIR, 'game1.txt')
+    game2 = os.path.join(GAMES_DIR, 'game2.txt')
+    prefix = str(tmp_path / 'game')
+    run_main(monkeypatch, 'record', game1, 'ironclad', prefix)
+    run_main(monkeypatch, 'verify', game1, f'{prefix}0.rpl')
+    assert 'Verified 1/1' in capsys.readouterr().out
+
+    with pytest.raises(SystemExit) as exit_info:
+        run_main(monkeypatch, 'verify', game2, f'{prefix}0.rpl')
+    assert exit_info.value.code == 1
+    assert 'Mismatch' in capsys.readouterr().out
+
+
+def test_recorded_game_matches_simulate_game():
+    encounters = read_game_file(os.path.join(GAMES_DIR, 'game2.txt'))
+    for seed in range(10):
+        recorded = replay.record_game('silent',
+                                      os.path.join(GAMES_DIR, 'game2.txt'),
+                                      first_playable_policy, seed)
+        simulated = simulate_game(Silent(random.Random(seed)), encounters,
+                                  first_playable_policy)
+        assert recorded.get_result()[:5] == (
+            simulated.is_won(), simulated.get_turns(), simulated.get_hp(),
+            simulated.get_cards_played(), simulated.get_encounters_won())
+        assert replay.verify_replay(recorded, encounters)
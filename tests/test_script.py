@@ -0,0 +1,24 @@
+import io
+import os
+
+import pytest
+
+from a2 import *
+from conftest import GAMES_DIR
+
+SCRIPT = 'play Strike 0\r\nend turn\n\ndescribe Bash\nplay Defend'
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 5, 1 << 16])
+def test_iter_script_splits_lines_across_chunks(chunk_size):
+    lines = list(iter_script(io.StringIO(SCRIPT), chunk_size))
+    assert lines == ['play Strike 0', 'end turn', '', 'describe Bash',
+                     'play Defend']
+
+
+@pytest.mark.parametrize('target', ['x', '²', '', '-1'])
+def test_play_rejects_targets_that_are_not_numbers(target, capsys):
+    script = io.StringIO(f'ironclad\n{os.path.join(GAMES_DIR, "game1.txt")}\n'
+                         f'play Strike {target}\n')
+    main(lambda encounter: None, script)
+    assert CARD_FAILURE_MESSAGE in capsys.readouterr().out
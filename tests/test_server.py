@@ -0,0 +1,40 @@
+import io
+import random
+
+import pytest
+
+from a2 import *
+from conftest import GAMES_DIR
+from server import GAME_FILE_PROMPT, MOVE_PROMPT, PLAYER_PROMPT, ConsoleSession
+
+MOVES = ['play Strike 0', 'play Strike 1', 'play Bash 0', 'play Defend',
+         'play Survivor', 'play Neutralize 1', 'play Strike x', 'inspect deck',
+         'describe Bash', 'end turn', 'end turn', 'hello']
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_session_replies_as_the_game_prints(seed, capsys, monkeypatch):
+    moves = random.Random(seed)
+    lines = [('ironclad', 'silent')[seed % 2], 'game1.txt']
+    lines += [moves.choice(MOVES) for _ in range(300)]
+
+    # Moves name monsters by ID, so both games number them from 0
+    monkeypatch.setattr(Monster, '_id_counter', 0)
+    random.seed(seed)
+    script = io.StringIO('\n'.join([lines[0], f'{GAMES_DIR}/{lines[1]}']
+                                   + lines[2:]) + '\n')
+    main(display_encounter, script)
+    printed = capsys.readouterr().out
+
+    Monster._id_counter = 0
+    random.seed(seed)
+    session = ConsoleSession(GAMES_DIR, random)
+    replies = [session.start()]
+    for line in lines:
+        if session.is_finished():
+            break
+        replies.append(session.handle_line(line))
+    sent = ''.join(replies)
+    for prompt in (PLAYER_PROMPT, GAME_FILE_PROMPT, MOVE_PROMPT):
+        sent = sent.replace(prompt, '')
+    assert sent == printed
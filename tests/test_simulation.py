@@ -0,0 +1,60 @@
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from a2 import *
+from conftest import GAMES_DIR, ROOT
+
+GAME_FILES = ['game1.txt', 'game2.txt', 'game3.txt', 'game4.txt']
+
+
+def play_games(game, player_class, games=50):
+    encounters = read_game_file(os.path.join(GAMES_DIR, game))
+    return [repr(simulate_game(player_class(random.Random(index)), encounters,
+                               first_playable_policy))
+            for index in range(games)]
+
+
+@pytest.mark.parametrize('game', GAME_FILES)
+@pytest.mark.parametrize('player_class', [IronClad, Silent])
+def test_seeded_games_repeat_exactly(game, player_class):
+    assert play_games(game, player_class) == play_games(game, player_class)
+
+
+def test_stats_and_subscribers_do_not_change_the_game():
+    encounters = read_game_file(os.path.join(GAMES_DIR, 'game2.txt'))
+    seen = []
+    subscribers = {'card_played': [lambda *args: seen.append(args)]}
+    for index in range(20):
+        plain = simulate_game(Silent(random.Random(index)), encounters,
+                              first_playable_policy)
+        watched = simulate_game(Silent(random.Random(index)), encounters,
+                                first_playable_policy,
+                                stats=EncounterStats(),
+                                subscribers=subscribers)
+        assert repr(watched) == repr(plain)
+    assert seen
+
+
+def test_seeded_games_match_across_processes():
+    # String hashing is salted per process, so anything keyed on
+    # it would show up as a difference here
+    script = ('import random\n'
+              'from a2 import *\n'
+              'encounters = read_game_file("games/game3.txt")\n'
+              'for index in range(30):\n'
+              '    player = IronClad(random.Random(index))\n'
+              '    encounter = Encounter(player, encounters[0])\n'
+              '    print(encounter.get_hash(), simulate_game(\n'
+              '        IronClad(random.Random(index)), encounters,\n'
+              '        first_playable_policy))\n')
+    outputs = set()
+    for hash_seed in ('1', '2'):
+        env = dict(os.environ, PYTHONHASHSEED=hash_seed)
+        outputs.add(subprocess.run([sys.executable, '-c', script], cwd=ROOT,
+                                   env=env, capture_output=True, text=True,
+                                   check=True).stdout)
+    assert len(outputs) == 1
@@ -0,0 +1,29 @@
+import os
+from fractions import Fraction
+
+import pytest
+
+from conftest import GAMES_DIR
+from solver import *
+
+
+@pytest.mark.parametrize('player_class', [IronClad, Silent])
+def test_game4_is_always_won(player_class):
+    solver = Solver(player_class,
+                    read_game_file(os.path.join(GAMES_DIR, 'game4.txt')))
+    # Exact, not just close to 1 after summing many chances
+    assert solver.exact_win_probability() == Fraction(1)
+    assert solver.win_probability() == 1.0
+
+
+def test_no_encounters_is_won():
+    assert Solver(IronClad, []).win_probability() == 1.0
+
+
+def test_too_many_states_is_rejected():
+    solver = Solver(Silent,
+                    read_game_file(os.path.join(GAMES_DIR, 'game1.txt')),
+                    max_turns=8, max_states=1000)
+    with pytest.raises(ValueError):
+        solver.win_probability()
+    assert solver.get_state_count() == 1000
@@ -0,0 +1,59 @@
+import io
+import os
+import random
+
+from a2 import *
+from conftest import GAMES_DIR
+
+
+def test_stats_agree_with_the_game():
+    encounters = read_game_file(os.path.join(GAMES_DIR, 'game3.txt'))
+    stats = EncounterStats()
+    actions = []
+    subscribers = {'damage_taken': [lambda *args: actions.append(args)]}
+    result = simulate_game(Silent(random.Random(2)), encounters,
+                           first_playable_policy, stats=stats,
+                           subscribers=subscribers)
+    assert stats.get_count('cards_played') == result.get_cards_played()
+    assert stats.get_count('failed_plays') == result.get_failed_plays()
+    assert (stats.get_count('damage_taken')
+            == Silent().get_max_hp() - result.get_hp())
+    # Every turn, the first of each encounter included, draws once
+    assert stats.get_calls('draw_cards') == stats.get_calls('start_new_turn')
+    assert stats.get_calls('draw_cards') > 0
+    assert stats.get_calls('monster_actions') == len(actions)
+    for phase in EncounterStats.PHASES:
+        assert stats.get_time(phase) >= 0
+
+
+def test_enemy_turn_on_the_players_turn_records_nothing():
+    encounter = Encounter(IronClad(random.Random(0)), [('JawWorm', 40)])
+    stats = EncounterStats()
+    encounter.set_stats(stats)
+    assert encounter.enemy_turn() == None
+    assert stats.get_calls('enemy_turn') == 0
+    assert stats.get_calls('monster_actions') == 0
+
+
+def test_switching_stats_off_puts_the_plain_methods_back():
+    player = IronClad(random.Random(0))
+    stats = EncounterStats()
+    encounter = Encounter(player, [('JawWorm', 40)], stats=stats)
+    assert stats.get_calls('draw_cards') == 1
+    encounter.set_stats(None)
+    assert 'enemy_turn' not in vars(encounter)
+    encounter.end_player_turn()
+    encounter.enemy_turn()
+    assert stats.get_calls('draw_cards') == 1
+    assert stats.get_calls('enemy_turn') == 0
+
+
+def test_summary_is_dumped_periodically():
+    stream = io.StringIO()
+    stats = EncounterStats(dump_interval=0, stream=stream)
+    encounter = Encounter(IronClad(random.Random(0)), [('JawWorm', 400)],
+                          stats=stats)
+    for _ in range(3):
+        encounter.end_player_turn()
+        encounter.enemy_turn()
+    assert stream.getvalue().count('monster_actions:') == 3
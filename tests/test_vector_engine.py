@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from a2 import *
+from batch import BatchResult
+from conftest import GAMES_DIR
+from vector_engine import *
+
+GAMES = 3000
+
+
+@pytest.mark.parametrize('game', ['game1.txt', 'game3.txt'])
+@pytest.mark.parametrize('player_class', [IronClad, Silent])
+def test_vector_stats_match_scalar(game, player_class):
+    encounters = read_game_file(os.path.join(GAMES_DIR, game))
+    scalar = BatchResult()
+    for index in range(GAMES):
+        scalar.add(simulate_game(player_class(spawn_rng(0, index)),
+                                 encounters, first_playable_policy))
+    vector = simulate_batch(player_class, encounters,
+                            first_playable_vector_policy, GAMES, seed=0)
+
+    # The engines draw from different random streams, so only
+    # the aggregates can agree, to within sampling noise
+    assert vector.get_games() == scalar.get_games()
+    assert vector.get_win_rate() == pytest.approx(scalar.get_win_rate(),
+                                                  abs=0.03)
+    assert vector.get_mean_turns() == pytest.approx(scalar.get_mean_turns(),
+                                                    rel=0.03)
+    assert vector.get_mean_hp() == pytest.approx(scalar.get_mean_hp(),
+                                                 abs=1.5)
+
+
+def test_hand_keeps_draw_order():
+    engine = BatchEncounter(IronClad, 50, np.random.default_rng(1))
+    engine.start_encounter([('JawWorm', 1000)])
+    hand = engine.get_hand_order()
+    assert (hand != EMPTY).sum(axis=1).tolist() == [HAND_SIZE] * 50
+    counts = engine.get_hand()
+    for row in range(50):
+        assert counts[row].tolist() == [
+            int((hand[row] == card).sum()) for card in range(len(CARD_TYPES))]
+
+
+def test_played_card_leaves_the_hand_in_order():
+    engine = BatchEncounter(Silent, 20, np.random.default_rng(2))
+    engine.start_encounter([('JawWorm', 1000)])
+    before = engine.get_hand_order().copy()
+    cards = before[:, 2]
+    played = engine.play_cards(cards, np.zeros(20, dtype=np.int64))
+    after = engine.get_hand_order()
+    for row in range(20):
+        expected = list(before[row])
+        if played[row]:
+            expected.remove(cards[row])
+            expected.append(EMPTY)
+        assert list(after[row]) == expected
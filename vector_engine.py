@@ -0,0 +1,537 @@
+import numpy as np
+
+from a2 import *
+from batch import BatchResult
+
+# Card definitions as columns, in the same order main() lists them
+CARD_TYPES = [Strike(), Bash(), Neutralize(), Survivor(), Defend()]
+CARD_NAMES = [card.get_name() for card in CARD_TYPES]
+CARD_DAMAGE = np.array([card.get_damage_amount() for card in CARD_TYPES])
+CARD_BLOCK = np.array([card.get_block() for card in CARD_TYPES])
+CARD_COST = np.array([card.get_energy_cost() for card in CARD_TYPES])
+CARD_WEAK = np.array(
+    [card.get_status_modifiers().get('weak', 0) for card in CARD_TYPES])
+CARD_VULNERABLE = np.array(
+    [card.get_status_modifiers().get('vulnerable', 0) for card in CARD_TYPES])
+CARD_STRENGTH = np.array(
+    [card.get_status_modifiers().get('strength', 0) for card in CARD_TYPES])
+CARD_TARGETED = np.array([card.requires_target() for card in CARD_TYPES])
+
+LOUSE = 0
+CULTIST = 1
+JAW_WORM = 2
+MONSTER_TYPES = {'Louse': LOUSE, 'Cultist': CULTIST, 'JawWorm': JAW_WORM}
+
+HAND_SIZE = 5
+TURN_ENERGY = 3
+# Fills the slots of a pile after its last card
+EMPTY = -1
+
+
+class BatchEncounter():
+    """
+    Plays the same game for K players at once. Every stat of
+    the players and monsters lives in a NumPy array with one
+    row per game, so each step of the game is a handful of
+    array operations instead of a Python loop per entity.
+    Piles of cards are rows of indices into CARD_TYPES, kept
+    in the same order as Player's lists and padded with -1,
+    since the order of the hand decides which card a policy
+    plays first. The rules follow Encounter exactly, except
+    that random draws come from a NumPy generator
+    """
+    def __init__(self, player_class, count: int,
+                 rng: np.random.Generator | None = None) -> None:
+        """
+        Initialises count copies of a player
+
+        Args:
+            player_class: the Player subclass every game plays as
+            count (int): number of games to play at once
+            rng (np.random.Generator | None, optional): random
+            stream for draws and monsters
+
+        """
+        template = player_class()
+        deck = np.array([CARD_NAMES.index(card.get_name())
+                         for card in template.get_deck()], dtype=np.int64)
+
+        self._rng = rng if rng is not None else np.random.default_rng()
+        self._count = count
+        self._hp = np.full(count, template.get_max_hp(), dtype=np.int64)
+        self._block = np.zeros(count, dtype=np.int64)
+        self._strength = np.zeros(count, dtype=np.int64)
+        self._weak = np.zeros(count, dtype=np.int64)
+        self._vulnerable = np.zeros(count, dtype=np.int64)
+        self._energy = np.zeros(count, dtype=np.int64)
+        self._deck = np.tile(deck, (count, 1))
+        self._deck_size = np.full(count, len(deck), dtype=np.int64)
+        self._hand = np.full((count, HAND_SIZE), EMPTY, dtype=np.int64)
+        self._hand_size = np.zeros(count, dtype=np.int64)
+        self._discard = np.full_like(self._deck, EMPTY)
+        self._discard_size = np.zeros(count, dtype=np.int64)
+
+        self._lost = np.zeros(count, dtype=bool)
+        self._turns = np.zeros(count, dtype=np.int64)
+        self._cards_played = np.zeros(count, dtype=np.int64)
+        self._failed_plays = np.zeros(count, dtype=np.int64)
+        self._encounters_won = np.zeros(count, dtype=np.int64)
+        self._encounters_started = 0
+        self._set_monsters([])
+
+    def start_encounter(self, monsters: list[tuple[str, int]]) -> None:
+        """
+        Starts a new encounter against the given monsters in
+        every game that has not been lost yet
+
+        Args:
+            monsters: list of (monster_type, start_hp) tuples
+            as returned by read_game_file
+
+        """
+        self._set_monsters(monsters)
+        self._encounters_started += 1
+        playing = ~self._lost
+        # Like Player.start_new_encounter
+        self._discard_hand(playing)
+        _move_pile(self._discard, self._discard_size,
+                   self._deck, self._deck_size, playing)
+        self._turns += playing
+        self._new_turn(playing)
+
+    def _set_monsters(self, monsters: list[tuple[str, int]]) -> None:
+        """
+        Replaces the monsters of every game
+
+        Args:
+            monsters: list of (monster_type, start_hp) tuples
+
+        """
+        # Like Encounter, unknown monster types are left out
+        monsters = [monster for monster in monsters
+                    if monster[0] in MONSTER_TYPES]
+        shape = (self._count, len(monsters))
+        self._monster_type = np.array(
+            [MONSTER_TYPES[name] for name, _ in monsters], dtype=np.int64)
+        self._monster_max_hp = np.tile(
+            np.array([hp for _, hp in monsters], dtype=np.int64),
+            (self._count, 1))
+        self._monster_hp = self._monster_max_hp.copy()
+        self._monster_block = np.zeros(shape, dtype=np.int64)
+        self._monster_strength = np.zeros(shape, dtype=np.int64)
+        self._monster_weak = np.zeros(shape, dtype=np.int64)
+        self._monster_vulnerable = np.zeros(shape, dtype=np.int64)
+        self._monster_calls = np.zeros(shape, dtype=np.int64)
+        self._monster_damage = np.where(
+            self._monster_type == LOUSE,
+            self._rng.integers(5, 8, size=shape), 0)
+
+    def get_active(self) -> np.ndarray:
+        """
+        Returns which games are still playing the
+        current encounter
+
+        Returns:
+            np.ndarray: boolean mask with one entry per game
+        """
+        return ~self._lost & (self._monster_hp > 0).any(axis=1)
+
+    def get_hp(self) -> np.ndarray:
+        """
+        Returns the HP of every player
+
+        Returns:
+            np.ndarray: HP with one entry per game
+        """
+        return self._hp
+
+    def get_turns(self) -> np.ndarray:
+        """
+        Returns how many turns every player has taken
+
+        Returns:
+            np.ndarray: turns with one entry per game
+        """
+        return self._turns
+
+    def get_energy(self) -> np.ndarray:
+        """
+        Returns the energy of every player
+
+        Returns:
+            np.ndarray: energy with one entry per game
+        """
+        return self._energy
+
+    def get_hand(self) -> np.ndarray:
+        """
+        Returns how many of each card every player holds
+
+        Returns:
+            np.ndarray: counts shaped (games, len(CARD_TYPES))
+        """
+        return (self._hand[:, :, None]
+                == np.arange(len(CARD_TYPES))).sum(axis=1)
+
+    def get_hand_order(self) -> np.ndarray:
+        """
+        Returns every player's hand in the order
+        Player.get_hand would list it
+
+        Returns:
+            np.ndarray: indices into CARD_TYPES shaped
+            (games, HAND_SIZE), with EMPTY after the last card
+        """
+        return self._hand
+
+    def get_monster_hp(self) -> np.ndarray:
+        """
+        Returns the HP of every monster. Monsters with no
+        HP left have been defeated
+
+        Returns:
+            np.ndarray: HP shaped (games, monsters)
+        """
+        return self._monster_hp
+
+    def play_cards(self, cards: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """
+        Plays one card in every game, like Encounter.player_apply_card.
+        Games whose card is -1 or cannot be played are left untouched
+
+        Args:
+            cards (np.ndarray): index into CARD_TYPES for each game
+            targets (np.ndarray): monster slot targeted in each game
+
+        Returns:
+            np.ndarray: mask of the games where the card was played
+        """
+        rows = np.arange(self._count)
+        card = np.maximum(cards, 0)
+        slot = np.clip(targets, 0, max(self._monster_hp.shape[1] - 1, 0))
+        has_monster = self._monster_hp.shape[1] > 0
+        target_alive = (
+            (targets >= 0) & (targets < self._monster_hp.shape[1])
+            & (self._monster_hp[rows, slot] > 0)
+            if has_monster else np.zeros(self._count, dtype=bool))
+
+        held = self._hand == card[:, None]
+        played = (self.get_active() & (cards >= 0)
+                  & held.any(axis=1)
+                  & (~CARD_TARGETED[card] | target_alive)
+                  & (self._energy >= CARD_COST[card]))
+        self._failed_plays += self.get_active() & (cards >= 0) & ~played
+
+        self._block += np.where(played, CARD_BLOCK[card], 0)
+        self._strength += np.where(played, CARD_STRENGTH[card], 0)
+        hit = played & CARD_TARGETED[card]
+        if has_monster and hit.any():
+            hit_rows = rows[hit]
+            hit_slots = slot[hit]
+            self._monster_weak[hit_rows, hit_slots] += CARD_WEAK[card[hit]]
+            self._monster_vulnerable[hit_rows, hit_slots] += \
+                CARD_VULNERABLE[card[hit]]
+            hp, block = _reduce_hp(
+                self._monster_hp[hit_rows, hit_slots],
+                self._monster_block[hit_rows, hit_slots],
+                CARD_DAMAGE[card[hit]])
+            self._monster_hp[hit_rows, hit_slots] = hp
+            self._monster_block[hit_rows, hit_slots] = block
+
+        # Like Player.play_card, the first card in the hand with
+        # that name is taken out and the rest close up behind it
+        position = held.argmax(axis=1)
+        columns = np.arange(HAND_SIZE)
+        shifted = np.minimum(columns + (columns >= position[:, None]),
+                             HAND_SIZE - 1)
+        closed = np.take_along_axis(self._hand, shifted, axis=1)
+        closed[:, -1] = EMPTY
+        self._hand = np.where(played[:, None], closed, self._hand)
+        self._hand_size -= played
+        played_rows = rows[played]
+        self._discard[played_rows, self._discard_size[played]] = card[played]
+        self._discard_size += played
+        self._energy -= np.where(played, CARD_COST[card], 0)
+        self._cards_played += played
+        return played
+
+    def end_turns(self, ending: np.ndarray) -> None:
+        """
+        Ends the player's turn in the masked games and plays
+        the monsters' turn, like Encounter.end_player_turn
+        followed by Encounter.enemy_turn
+
+        Args:
+            ending (np.ndarray): mask of games whose turn ends
+
+        """
+        ending = ending & self.get_active()
+        self._discard_hand(ending)
+        self._monster_block[ending] = 0
+        self._monster_weak[ending] = np.maximum(
+            self._monster_weak[ending] - 1, 0)
+        self._monster_vulnerable[ending] = np.maximum(
+            self._monster_vulnerable[ending] - 1, 0)
+
+        damage, weak = self._monster_actions(ending)
+        self._weak += weak
+        self._hp, self._block = _reduce_hp(
+            self._hp, self._block, np.where(ending, damage, 0))
+        self._lost |= self._hp <= 0
+        self._turns += ending
+        self._new_turn(ending)
+
+    def finish_encounter(self) -> None:
+        """
+        Records the games that won the current encounter and
+        returns their leftover hand to the discard pile
+
+        """
+        won = ~self._lost & ~(self._monster_hp > 0).any(axis=1)
+        self._encounters_won += won
+        self._discard_hand(won)
+
+    def forfeit(self, mask: np.ndarray) -> None:
+        """
+        Marks the masked games as lost
+
+        Args:
+            mask (np.ndarray): games to stop playing
+
+        """
+        self._lost |= mask
+
+    def get_results(self) -> list[GameResult]:
+        """
+        Returns a GameResult for every game. A game is won
+        once it has won every encounter started so far
+
+        Returns:
+            list[GameResult]: one result per game
+        """
+        won = ~self._lost & (self._encounters_won == self._encounters_started)
+        return [GameResult(bool(won[i]), int(self._turns[i]),
+                           int(self._hp[i]), int(self._cards_played[i]),
+                           int(self._encounters_won[i]),
+                           int(self._failed_plays[i]))
+                for i in range(self._count)]
+
+    def _monster_actions(self, acting: np.ndarray) -> tuple[np.ndarray,
+                                                              np.ndarray]:
+        """
+        Runs action() for every living monster in the acting
+        games and returns the damage and weak they give the player
+
+        Args:
+            acting (np.ndarray): mask of games whose monsters act
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: damage and weak per game
+        """
+        acts = acting[:, None] & (self._monster_hp > 0)
+        kind = self._monster_type[None, :]
+
+        calls = self._monster_calls
+        cultist = acts & (kind == CULTIST)
+        cultist_damage = np.where(calls == 0, 0, 6 + calls)
+        # A cultist's first action passes on its own weak, and every
+        # later one overwrites its weak with the amount it applies
+        cultist_weak = np.where(calls == 0, self._monster_weak,
+                                np.where(calls % 2 == 1, 1, 0))
+        self._monster_weak = np.where(cultist & (calls > 0), cultist_weak,
+                                      self._monster_weak)
+        self._monster_calls = calls + cultist
+
+        jaw_worm = acts & (kind == JAW_WORM)
+        lost_hp = self._monster_max_hp - self._monster_hp
+        self._monster_block = np.where(jaw_worm, (lost_hp + 1) // 2,
+                                       self._monster_block)
+
+        damage = np.select(
+            [kind == LOUSE, kind == CULTIST, kind == JAW_WORM],
+            [self._monster_damage, cultist_damage, lost_hp // 2])
+        damage = damage + np.maximum(self._monster_strength, 0)
+        return ((damage * acts).sum(axis=1),
+                (cultist_weak * cultist).sum(axis=1))
+
+    def _new_turn(self, mask: np.ndarray) -> None:
+        """
+        Starts a new turn for the masked players, like
+        Player.new_turn: block resets, weak and vulnerable
+        wear off, energy refills and a new hand is drawn
+
+        Args:
+            mask (np.ndarray): games starting a new turn
+
+        """
+        self._block[mask] = 0
+        self._weak[mask] = np.maximum(self._weak[mask] - 1, 0)
+        self._vulnerable[mask] = np.maximum(self._vulnerable[mask] - 1, 0)
+        self._energy[mask] = TURN_ENERGY
+
+        # Like draw_cards, the hand is emptied, then a short deck
+        # goes into the hand and the discard pile becomes the deck
+        self._hand[mask] = EMPTY
+        self._hand_size[mask] = 0
+        short = mask & (self._deck_size < HAND_SIZE)
+        _move_pile(self._deck, self._deck_size,
+                   self._hand, self._hand_size, short)
+        _move_pile(self._discard, self._discard_size,
+                   self._deck, self._deck_size, short)
+
+        # The rest are picked by select_cards' partial Fisher-Yates
+        # shuffle, which swaps each pick to the end of the deck
+        rows = np.arange(self._count)
+        size = self._deck_size
+        amount = np.where(mask, np.minimum(HAND_SIZE - self._hand_size,
+                                           size), 0)
+        for i in range(HAND_SIZE):
+            drawing = i < amount
+            if not drawing.any():
+                break
+            last = size - 1 - i
+            pick = (self._rng.random(self._count) * (last + 1)).astype(np.int64)
+            pick = np.minimum(pick, last)
+            r, j, k = rows[drawing], pick[drawing], last[drawing]
+            self._deck[r, j], self._deck[r, k] = \
+                self._deck[r, k], self._deck[r, j]
+        # The picked cards join the hand in the order they lie
+        # at the end of the deck, as select_cards returns them
+        start = size - amount
+        for i in range(HAND_SIZE):
+            drawing = i < amount
+            if not drawing.any():
+                break
+            r = rows[drawing]
+            self._hand[r, self._hand_size[drawing] + i] = \
+                self._deck[r, start[drawing] + i]
+            self._deck[r, start[drawing] + i] = EMPTY
+        self._hand_size += amount
+        self._deck_size -= amount
+
+    def _discard_hand(self, mask: np.ndarray) -> None:
+        """
+        Moves the masked players' hands to the end of their
+        discard piles, like Player.end_turn
+
+        Args:
+            mask (np.ndarray): games discarding their hand
+
+        """
+        _move_pile(self._hand, self._hand_size,
+                   self._discard, self._discard_size, mask)
+
+
+def _move_pile(source: np.ndarray, source_size: np.ndarray,
+               target: np.ndarray, target_size: np.ndarray,
+               mask: np.ndarray) -> None:
+    """
+    Moves every card of one pile to the end of another in the
+    masked games, keeping their order, like target.extend(source)
+    followed by source.clear(). The piles are changed in place
+
+    Args:
+        source (np.ndarray): pile the cards leave
+        source_size (np.ndarray): cards in each source pile
+        target (np.ndarray): pile the cards join
+        target_size (np.ndarray): cards in each target pile
+        mask (np.ndarray): games whose piles are moved
+
+    """
+    rows = np.arange(len(mask))
+    moving = np.where(mask, source_size, 0)
+    for i in range(source.shape[1]):
+        copying = i < moving
+        if not copying.any():
+            break
+        target[rows[copying], target_size[copying] + i] = source[copying, i]
+    source[mask] = EMPTY
+    source_size[mask] = 0
+    target_size += moving
+
+
+def _reduce_hp(hp: np.ndarray, block: np.ndarray,
+               amount: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Array version of Entity.reduce_hp. Block absorbs damage
+    first and HP never drops below zero
+
+    Args:
+        hp (np.ndarray): current HP
+        block (np.ndarray): current block
+        amount (np.ndarray): damage taken
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: the new HP and block
+    """
+    remaining = block - amount
+    hp = np.maximum(hp + np.minimum(remaining, 0), 0)
+    return hp, np.maximum(remaining, 0)
+
+
+def first_playable_vector_policy(
+        engine: BatchEncounter) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Array version of first_playable_policy. Plays the first
+    card in each player's hand they can afford, aimed at the
+    first living monster, or -1 to end the turn
+
+    Args:
+        engine: the batch being played
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: card and target per game
+    """
+    hand = engine.get_hand_order()
+    playable = (hand != EMPTY) \
+        & (CARD_COST[hand] <= engine.get_energy()[:, None])
+    first = np.take_along_axis(hand, playable.argmax(axis=1)[:, None],
+                               axis=1)[:, 0]
+    cards = np.where(playable.any(axis=1), first, -1)
+    targets = (engine.get_monster_hp() > 0).argmax(axis=1) \
+        if engine.get_monster_hp().shape[1] else np.zeros_like(cards)
+    return cards, targets
+
+
+def simulate_batch(player_class, encounters: list[list[tuple[str, int]]],
+                   policy, count: int, seed: int | None = None,
+                   max_turns: int = 1000) -> BatchResult:
+    """
+    Plays count games at once with a BatchEncounter, following
+    the same rules as simulate_game. The policy is called with
+    the engine and returns a card index and target slot for
+    every game, with -1 as the card to end the turn. A card
+    that cannot be played ends the turn
+
+    Args:
+        player_class: the Player subclass to play as
+        encounters: monsters in each encounter, as
+        returned by read_game_file
+        policy: callable choosing every game's moves
+        count: number of games to play
+        seed: seed for the NumPy random stream
+        max_turns: turns after which a game counts as lost
+
+    Returns:
+        BatchResult: totals across every game
+
+    Example:
+    >>> batch = simulate_batch(IronClad, read_game_file('games/game1.txt'),
+    ...                        first_playable_vector_policy, 10000)
+    >>> batch.get_games()
+    10000
+    """
+    engine = BatchEncounter(player_class, count, np.random.default_rng(seed))
+    for monsters in encounters:
+        engine.start_encounter(monsters)
+        while engine.get_active().any():
+            engine.forfeit(engine.get_turns() > max_turns)
+            cards, targets = policy(engine)
+            played = engine.play_cards(cards, targets)
+            engine.end_turns(~played)
+        engine.finish_encounter()
+
+    totals = BatchResult()
+    for result in engine.get_results():
+        totals.add(result)
+    return totals